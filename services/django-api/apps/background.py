@@ -0,0 +1,64 @@
+"""
+Lightweight background job execution for Klynaa.
+
+Work that should not run on the request thread (image rendering, fan-out,
+delivery) is submitted to a named thread pool. Jobs submitted with
+``submit_on_commit`` only start once the surrounding transaction commits, so
+they never see rows that are later rolled back.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(pool_name, max_workers=None):
+    """Return the shared executor for ``pool_name``, creating it on first use."""
+    with _executors_lock:
+        executor = _executors.get(pool_name)
+        if executor is None:
+            if max_workers is None:
+                pool_sizes = getattr(settings, 'BACKGROUND_POOL_SIZES', {})
+                max_workers = pool_sizes.get(pool_name, 2)
+            executor = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix=f'klynaa-{pool_name}'
+            )
+            _executors[pool_name] = executor
+        return executor
+
+
+def _run_job(func, args, kwargs):
+    """Run a job with fresh DB connection handling and error logging."""
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception(f"Background job {getattr(func, '__name__', func)} failed")
+        raise
+    finally:
+        close_old_connections()
+
+
+def submit(pool_name, func, *args, **kwargs):
+    """
+    Run ``func`` in the named background pool.
+
+    When ``BACKGROUND_JOBS_EAGER`` is enabled (tests, management commands that
+    want deterministic behaviour) the job runs inline instead.
+    """
+    if getattr(settings, 'BACKGROUND_JOBS_EAGER', False):
+        return func(*args, **kwargs)
+    return get_executor(pool_name).submit(_run_job, func, args, kwargs)
+
+
+def submit_on_commit(pool_name, func, *args, **kwargs):
+    """Run ``func`` in the named pool once the current transaction commits."""
+    transaction.on_commit(lambda: submit(pool_name, func, *args, **kwargs))
@@ -13,6 +13,10 @@ from apps.payments.models import PaymentTransaction
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from apps.broadcaster import broadcaster
+from apps.chat.presence import presence
+from apps.send_queue import send_queue_stats
+from apps.snapshots import snapshot_cache
 
 
 def is_admin(user):
@@ -220,6 +224,27 @@ def admin_recent_activity(request):
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_websocket_metrics(request):
+    """Real-time delivery metrics for this server process: send queues, broadcaster and caches."""
+    if not is_admin(request.user):
+        return Response({'error': 'Admin access required'}, status=403)
+
+    try:
+        limit = min(int(request.query_params.get('limit', 20)), 200)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=400)
+
+    return Response({
+        'send_queues': send_queue_stats(limit=limit),
+        'broadcaster': broadcaster.stats(),
+        'snapshots': snapshot_cache.stats(),
+        'chat_presence': presence.stats(),
+        'timestamp': timezone.now().isoformat()
+    })
+
+
 def _calculate_completion_rate():
     """Calculate pickup completion rate."""
     total_pickups = PickupRequest.objects.count()
@@ -7,3 +7,4 @@ class BinsConfig(AppConfig):
 
     def ready(self):
         import apps.bins.websocket_signals  # noqa: F401
+        import apps.bins.qr_cache  # noqa: F401
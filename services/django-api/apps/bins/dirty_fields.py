@@ -0,0 +1,118 @@
+"""
+Dirty-field tracking for models.
+
+Instances loaded from the database remember the values they were loaded
+with, so signal handlers can ask for the previous value of a field and
+saves can be restricted to the columns that actually changed, without
+re-fetching the row.
+"""
+import copy
+
+_MUTABLE_TYPES = (dict, list, set)
+
+
+def _snapshot_value(value):
+    # JSON fields are mutated in place, so keep an independent copy
+    return copy.deepcopy(value) if isinstance(value, _MUTABLE_TYPES) else value
+
+
+class DirtyFieldsMixin:
+    """
+    Track field changes since an instance was loaded or last saved.
+
+    Usage::
+
+        pickup = PickupRequest.objects.get(pk=1)
+        pickup.status = 'accepted'
+        pickup.changed_fields        # {'status'}
+        pickup.previous('status')    # 'open'
+        pickup.save_changed()        # UPDATE ... SET status = ... only
+    """
+
+    _loaded_values = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._take_snapshot(field_names)
+        return instance
+
+    def _concrete_attnames(self):
+        return [field.attname for field in self._meta.concrete_fields]
+
+    def _take_snapshot(self, attnames=None):
+        """Record current values of ``attnames`` (default: all loaded fields)."""
+        if attnames is None:
+            attnames = [name for name in self._concrete_attnames() if name in self.__dict__]
+        snapshot = dict(self._loaded_values or {})
+        for attname in attnames:
+            if attname in self.__dict__:
+                snapshot[attname] = _snapshot_value(self.__dict__[attname])
+        self._loaded_values = snapshot
+
+    @property
+    def has_snapshot(self):
+        """True when the instance knows the values it was loaded with."""
+        return self._loaded_values is not None
+
+    @property
+    def changed_fields(self):
+        """
+        Names of fields whose value differs from the loaded value.
+
+        Unsaved instances (or ones built without a database load) report
+        every loaded non-primary-key field as changed.
+        """
+        fields = [field for field in self._meta.concrete_fields if not field.primary_key]
+        if self._loaded_values is None:
+            return {field.name for field in fields if field.attname in self.__dict__}
+        return {
+            field.name for field in fields
+            if field.attname in self._loaded_values
+            and field.attname in self.__dict__
+            and self.__dict__[field.attname] != self._loaded_values[field.attname]
+        }
+
+    def previous(self, field_name, default=None):
+        """Value of ``field_name`` when the instance was loaded or last saved."""
+        if self._loaded_values is None:
+            return default
+        attname = self._meta.get_field(field_name).attname
+        return self._loaded_values.get(attname, default)
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None:
+            self._take_snapshot()
+        else:
+            self._take_snapshot([self._meta.get_field(name).attname for name in fields])
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            self._take_snapshot()
+        else:
+            self._take_snapshot([self._meta.get_field(name).attname for name in update_fields])
+
+    def save_changed(self, **kwargs):
+        """
+        Save only the fields that changed since load.
+
+        New instances are saved in full. Returns ``False`` (and skips the
+        write and its signals) when nothing changed.
+        """
+        if self._state.adding or self._loaded_values is None:
+            self.save(**kwargs)
+            return True
+
+        changed = self.changed_fields
+        if not changed:
+            return False
+
+        auto_now = {
+            field.name for field in self._meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+        }
+        self.save(update_fields=sorted(changed | auto_now), **kwargs)
+        return True
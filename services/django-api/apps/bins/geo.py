@@ -0,0 +1,88 @@
+"""Small geographic helpers shared by bins, pickups and proofs."""
+from math import asin, cos, radians, sin, sqrt
+
+EARTH_RADIUS_M = 6371000
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """Great-circle distance in meters between two WGS84 points."""
+    lat1, lng1, lat2, lng2 = map(radians, map(float, (lat1, lng1, lat2, lng2)))
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+    a = sin(dlat / 2) ** 2 + cos(lat1) * cos(lat2) * sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * asin(sqrt(a))
+
+
+# Geohash cells ---------------------------------------------------------------
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash_encode(latitude, longitude, precision=6):
+    """Encode a point as a geohash string of ``precision`` characters."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        target, bounds = (longitude, lng_range) if even else (latitude, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if target >= mid:
+            value = (value << 1) | 1
+            bounds[0] = mid
+        else:
+            value <<= 1
+            bounds[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision):
+    """``(lat_degrees, lng_degrees)`` spanned by one cell at ``precision``."""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def _cells_in_box(latitude, longitude, radius_m, precision):
+    cell_lat, cell_lng = geohash_cell_size(precision)
+    dlat = radius_m / 111320.0
+    dlng = radius_m / max(111320.0 * cos(radians(float(latitude))), 1.0)
+    lat_min, lat_max = max(float(latitude) - dlat, -90.0), min(float(latitude) + dlat, 90.0)
+    lng_min, lng_max = float(longitude) - dlng, float(longitude) + dlng
+
+    cells = set()
+    lat = lat_min
+    while True:
+        lng = lng_min
+        while True:
+            wrapped = ((lng + 180.0) % 360.0) - 180.0
+            cells.add(geohash_encode(lat, wrapped, precision))
+            if lng >= lng_max:
+                break
+            lng = min(lng + cell_lng, lng_max)
+        if lat >= lat_max:
+            break
+        lat = min(lat + cell_lat, lat_max)
+    return cells
+
+
+def covering_cells(latitude, longitude, radius_m, precisions=(4, 5, 6), max_cells=16):
+    """
+    Geohash cells covering a circle, at the finest precision that needs at
+    most ``max_cells`` cells (the coarsest precision otherwise).
+
+    Returns ``(precision, cells)``. The cells cover the circle's bounding
+    box, so callers filter exact distance themselves.
+    """
+    ordered = sorted(precisions, reverse=True)
+    for precision in ordered:
+        cells = _cells_in_box(latitude, longitude, radius_m, precision)
+        if len(cells) <= max_cells:
+            return precision, cells
+    coarsest = ordered[-1]
+    return coarsest, _cells_in_box(latitude, longitude, radius_m, coarsest)
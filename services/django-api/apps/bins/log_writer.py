@@ -0,0 +1,242 @@
+"""
+Buffered bulk writer for serverless log tables.
+
+``NotificationLog``, ``GeoLog`` and ``EscrowLog`` rows are append-only and
+nothing reads them on the request path, so instead of one INSERT per HTTP
+call they are buffered in-process and written with ``bulk_create`` when a
+buffer reaches ``SERVERLESS_LOG_BATCH_SIZE`` rows or every
+``SERVERLESS_LOG_FLUSH_INTERVAL`` seconds, whichever comes first.
+
+Rows are timestamped when they are flushed, so ``created_at`` may lag the
+event by up to one flush interval. Setting the batch size to 0 disables
+buffering and writes each row immediately.
+
+A row the database rejects is dropped on its own; when the database is
+unreachable the unwritten rows go back into the buffer for the next flush,
+up to ``MAX_BUFFERED_BATCHES`` batches per table. A writer that buffered
+anything flushes once more at interpreter exit.
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, DataError, IntegrityError, close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+# Rows kept per table while the database is unavailable, in batches
+MAX_BUFFERED_BATCHES = 20
+
+
+def _validate(instance):
+    """
+    Coerce and validate field values before a row is buffered.
+
+    Mirrors ``Model.clean_fields`` minus blank checks and the foreign-key
+    existence query, so malformed events are rejected at request time
+    instead of failing a whole batch at flush time.
+    """
+    errors = {}
+    for field in instance._meta.concrete_fields:
+        if field.primary_key or field.is_relation or getattr(field, 'auto_now_add', False):
+            continue
+        value = getattr(instance, field.attname)
+        if value is None:
+            if not field.null and not field.has_default():
+                errors[field.name] = ['This field is required.']
+            continue
+        try:
+            value = field.to_python(value)
+            field.run_validators(value)
+            setattr(instance, field.attname, value)
+        except ValidationError as e:
+            errors[field.name] = e.messages
+    if errors:
+        raise ValidationError(errors)
+    return instance
+
+
+def build_notification_log(data):
+    from .models import NotificationLog
+
+    return NotificationLog(
+        pickup_id=data.get('pickup_id'),
+        user_ids=data.get('user_ids', []),
+        notification_type=data.get('notification_type'),
+        title=data.get('title'),
+        body=data.get('body'),
+        success=data.get('success', False),
+        metadata=data.get('metadata', {}),
+        sent_by='serverless'
+    )
+
+
+def build_geo_log(data):
+    from .models import GeoLog
+
+    return GeoLog(
+        pickup_id=data.get('pickup_id'),
+        center_latitude=data.get('center_latitude'),
+        center_longitude=data.get('center_longitude'),
+        radius_km=data.get('radius_km'),
+        workers_found=data.get('workers_found', 0),
+        workers_notified=data.get('workers_notified', 0),
+        metadata=data.get('metadata', {}),
+        processed_by='serverless'
+    )
+
+
+def build_escrow_log(data):
+    from .models import EscrowLog
+
+    return EscrowLog(
+        pickup_id=data.get('pickup_id'),
+        payment_id=data.get('payment_id'),
+        action=data.get('action'),
+        reason=data.get('reason'),
+        amount=data.get('amount'),
+        processed_by=data.get('processed_by', 'serverless'),
+        metadata=data.get('metadata', {})
+    )
+
+
+# Event kinds accepted by the batch endpoint
+LOG_EVENT_BUILDERS = {
+    'notification': build_notification_log,
+    'geo': build_geo_log,
+    'escrow': build_escrow_log,
+}
+
+
+class BufferedLogWriter:
+    """Per-process buffer that flushes log rows with ``bulk_create``."""
+
+    def __init__(self, batch_size=None, flush_interval=None):
+        self.batch_size = batch_size if batch_size is not None else getattr(
+            settings, 'SERVERLESS_LOG_BATCH_SIZE', 500)
+        self.flush_interval = flush_interval or getattr(
+            settings, 'SERVERLESS_LOG_FLUSH_INTERVAL', 2.0)
+        self._buffers = defaultdict(list)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._exit_hook = False
+
+    @property
+    def buffering(self):
+        return self.batch_size > 0
+
+    def write(self, instance):
+        """Validate ``instance`` and queue it for insertion."""
+        _validate(instance)
+        if not self.buffering:
+            instance.save(force_insert=True)
+            return
+
+        with self._lock:
+            buffer = self._buffers[type(instance)]
+            buffer.append(instance)
+            full = len(buffer) >= self.batch_size
+        self._ensure_flusher()
+        if full:
+            self._wakeup.set()
+
+    def pending(self):
+        """Number of buffered rows per table, for monitoring."""
+        with self._lock:
+            return {model._meta.db_table: len(rows) for model, rows in self._buffers.items() if rows}
+
+    def flush(self):
+        """Write all buffered rows now. Returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                buffers, self._buffers = self._buffers, defaultdict(list)
+            written = 0
+            for model, rows in buffers.items():
+                written += self._write_rows(model, rows)
+            return written
+
+    def close(self):
+        """Stop the flush thread and write what is still buffered."""
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join()
+        return self.flush()
+
+    def _write_rows(self, model, rows):
+        if not rows:
+            return 0
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(rows, batch_size=self.batch_size or None)
+            return len(rows)
+        except Exception:
+            logger.exception(f"Bulk insert of {len(rows)} {model.__name__} rows failed; retrying row by row")
+
+        # Isolate bad rows (e.g. a pickup_id that no longer exists)
+        written = 0
+        for index, row in enumerate(rows):
+            row.pk = None
+            try:
+                row.save(force_insert=True)
+                written += 1
+            except (IntegrityError, DataError) as e:
+                logger.error(f"Dropping {model.__name__} log row: {e}")
+            except DatabaseError as e:
+                logger.error(f"Log database unavailable, keeping {len(rows) - index} {model.__name__} rows: {e}")
+                self._requeue(model, rows[index:])
+                break
+            except Exception as e:
+                logger.error(f"Dropping {model.__name__} log row: {e}")
+        return written
+
+    def _requeue(self, model, rows):
+        """Put unwritten rows back in front of the buffer, dropping the oldest past the cap."""
+        limit = max(self.batch_size, 1) * MAX_BUFFERED_BATCHES
+        with self._lock:
+            buffer = self._buffers[model]
+            buffer[:0] = rows
+            overflow = len(buffer) - limit
+            if overflow > 0:
+                del buffer[:overflow]
+        if overflow > 0:
+            logger.error(f"Log buffer for {model.__name__} is full; dropped {overflow} oldest rows")
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if not self._exit_hook:
+                atexit.register(self.flush)
+                self._exit_hook = True
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name='klynaa-log-writer', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._stopping.is_set():
+                break
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Log writer flush failed")
+        close_old_connections()
+
+
+log_writer = BufferedLogWriter()
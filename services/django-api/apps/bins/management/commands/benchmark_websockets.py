@@ -0,0 +1,79 @@
+"""Management command to benchmark the WebSocket consumers in-process."""
+
+import json
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.base.creation import TEST_DATABASE_PREFIX
+
+from apps.ws_benchmark import WebSocketBenchmark
+
+
+class Command(BaseCommand):
+    """Run the in-process WebSocket benchmark and print the results as JSON."""
+
+    help = (
+        'Simulates workers, customers and chat pairs against config.asgi.application and reports '
+        'connect latency, fan-out latency percentiles and messages per second per core as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=50, help='Worker dashboard connections')
+        parser.add_argument('--customers', type=int, default=50,
+                            help='Customers, each with a customer and a pickup connection')
+        parser.add_argument('--chat-pairs', type=int, default=25, help='Chat rooms with two participants')
+        parser.add_argument('--rounds', type=int, default=20, help='Broadcast rounds per scenario')
+        parser.add_argument('--framing', choices=['json', 'msgpack'], default='json',
+                            help='Subprotocol the simulated clients negotiate')
+        parser.add_argument('--ack', action='store_true',
+                            help='Acknowledge state frames so streams are delta-encoded')
+        parser.add_argument('--timeout', type=float, default=5.0, help='Seconds to wait for each frame')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout')
+        parser.add_argument('--keep-fixtures', action='store_true',
+                            help='Leave the generated users, bins, pickups and chat rooms in place')
+        parser.add_argument('--allow-db-writes', action='store_true',
+                            help='Run even though DEBUG is off and the database is not a test database')
+
+    def handle(self, *args, **options):
+        """Create fixtures, run every scenario and emit one JSON document."""
+        if not (settings.DEBUG or self._is_test_database() or options['allow_db_writes']):
+            raise CommandError(
+                f"Refusing to write benchmark fixtures to {connection.settings_dict['NAME']!r}: "
+                'DEBUG is off and it is not a test database. Pass --allow-db-writes to run anyway.'
+            )
+
+        try:
+            benchmark = WebSocketBenchmark(
+                workers=options['workers'],
+                customers=options['customers'],
+                chat_pairs=options['chat_pairs'],
+                rounds=options['rounds'],
+                framing=options['framing'],
+                ack=options['ack'],
+                timeout=options['timeout'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        try:
+            benchmark.create_fixtures()
+            results = async_to_sync(benchmark.run_scenarios)()
+        finally:
+            if not options['keep_fixtures']:
+                benchmark.delete_fixtures()
+
+        report = json.dumps({'environment': benchmark.environment(), 'results': results}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(report + '\n')
+            self.stderr.write(self.style.SUCCESS(f"✓ Results written to {options['output']}"))
+        else:
+            self.stdout.write(report)
+
+    @staticmethod
+    def _is_test_database():
+        name = str(connection.settings_dict['NAME'])
+        test_name = (connection.settings_dict.get('TEST') or {}).get('NAME')
+        return name.startswith(TEST_DATABASE_PREFIX) or name == test_name or 'mode=memory' in name
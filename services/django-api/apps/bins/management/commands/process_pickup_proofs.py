@@ -0,0 +1,58 @@
+"""Management command to build variants for pickup proofs uploaded before processing existed."""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.background import get_executor
+from apps.bins.models import PickupProof
+from apps.bins.proof_processing import process_pickup_proof
+
+
+class Command(BaseCommand):
+    """Process unprocessed pickup proofs on the ``proofs`` pool."""
+
+    help = 'Generates thumbnails, extracts GPS, runs geofence checks and hashes unprocessed pickup proofs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Reprocess proofs that were already processed',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Retry proofs whose image could not be processed before',
+        )
+
+    def handle(self, *args, **options):
+        """Submit each proof to the background pool and wait for completion."""
+        started = time.monotonic()
+        queryset = PickupProof.objects.exclude(image='').order_by('pk')
+        if not options['force']:
+            queryset = queryset.filter(Q(processed_at__isnull=True) | Q(perceptual_hash__isnull=True))
+            if not options['retry_failed']:
+                queryset = queryset.filter(processing_error='')
+
+        pks = list(queryset.values_list('pk', flat=True))
+        if not pks:
+            self.stdout.write(self.style.SUCCESS('✓ All pickup proofs are processed'))
+            return
+
+        executor = get_executor('proofs')
+        force = options['force'] or options['retry_failed']
+        futures = [executor.submit(process_pickup_proof, pk, force=force) for pk in pks]
+        failed = 0
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"✗ {e}")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Processed {len(pks) - failed}/{len(pks)} proofs in {elapsed:.1f}s")
+        )
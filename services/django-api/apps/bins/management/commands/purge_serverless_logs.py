@@ -0,0 +1,72 @@
+"""Management command to apply retention to serverless log tables."""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.bins.retention import RetentionEngine, get_log_models
+
+
+class Command(BaseCommand):
+    """Delete (and optionally archive) expired serverless log rows in chunks."""
+
+    help = 'Purges NotificationLog, GeoLog and EscrowLog rows older than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Retention period in days',
+        )
+        parser.add_argument(
+            '--type',
+            dest='data_types',
+            action='append',
+            choices=sorted(get_log_models()),
+            help='Log table to purge (repeatable, defaults to all)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=None,
+            help='Rows deleted per transaction',
+        )
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            help='Archive rows to gzipped JSON-lines files before deleting',
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0.0,
+            help='Seconds to sleep between chunks to yield to live traffic',
+        )
+
+    def handle(self, *args, **options):
+        """Run the retention engine for each selected table."""
+        if options['days'] < 1:
+            raise CommandError('--days must be at least 1')
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        log_models = get_log_models()
+
+        for data_type in options['data_types'] or sorted(log_models):
+            engine = RetentionEngine(
+                log_models[data_type],
+                chunk_size=options['chunk_size'],
+                archive=options['archive'],
+                pause=options['pause'],
+            )
+            stats = engine.purge(cutoff)
+            line = (
+                f"✓ {data_type}: deleted {stats['deleted_count']} rows in {stats['chunks']} chunks "
+                f"({stats['rows_per_second']} rows/s)"
+            )
+            if stats['archive_path']:
+                line += f", archived to {stats['archive_path']}"
+            self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS('✓ Log retention complete'))
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.24 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bins', '0007_remove_bin_bins_bin_location_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pickupproof',
+            name='display_image',
+            field=models.ImageField(blank=True, null=True, upload_to='pickup_proofs/variants/%Y/%m/%d/'),
+        ),
+        migrations.AddField(
+            model_name='pickupproof',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pickupproof',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to='pickup_proofs/variants/%Y/%m/%d/'),
+        ),
+    ]
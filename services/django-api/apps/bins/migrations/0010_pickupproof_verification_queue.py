@@ -0,0 +1,30 @@
+# Generated by Django 4.2.24 on 2026-10-19 11:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bins', '0009_pickupproof_duplicate_detection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pickupproof',
+            name='claim_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pickupproof',
+            name='claimed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='claimed_proofs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='pickupproof',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['-needs_manual_review', 'confidence_score', 'id'], name='bins_proof_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.24 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bins', '0010_pickupproof_verification_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pickupproof',
+            name='processing_error',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
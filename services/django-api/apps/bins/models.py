@@ -6,15 +6,15 @@ from django.contrib.gis.geos import Point
 from django.contrib.auth import get_user_model
 from decimal import Decimal
 import uuid
-import qrcode
-import io
-import base64
-from django.core.files.base import ContentFile
+
+from apps.background import submit_on_commit
+
+from .dirty_fields import DirtyFieldsMixin
 
 User = get_user_model()
 
 
-class Bin(models.Model):
+class Bin(DirtyFieldsMixin, models.Model):
     """Smart trash bin owned by customers."""
 
     class BinStatus(models.TextChoices):
@@ -65,29 +65,20 @@ class Bin(models.Model):
     def needs_pickup(self):
         return self.status == self.BinStatus.FULL
 
-    def generate_qr_code(self):
-        """Generate QR code for this bin."""
+    def assign_qr_uuid(self):
+        """Assign the QR identifier; cheap enough to do inline on save."""
         if not self.qr_code_uuid:
             self.qr_code_uuid = uuid.uuid4()
+        return self.qr_code_uuid
 
-        qr_data = f"klynaa://bin/{self.qr_code_uuid}"
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(qr_data)
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
+    def generate_qr_code(self):
+        """Render and store the QR code for this bin synchronously."""
+        from .qr import ensure_qr_image
 
-        filename = f"qr_{self.qr_code_uuid}.png"
-        self.qr_code_image.save(filename, ContentFile(buffer.getvalue()), save=False)
-        buffer.close()
+        if not self.pk:
+            self.assign_qr_uuid()
+            return None
+        return ensure_qr_image(self)
 
     def update_location(self):
         """Update PostGIS location from latitude/longitude coordinates."""
@@ -102,17 +93,26 @@ class Bin(models.Model):
                 self.location = None
 
     def save(self, *args, **kwargs):
-        """Override save to generate QR code and update location if needed."""
-        if not self.qr_code_image:
-            self.generate_qr_code()
+        """Override save to assign the QR identifier and update location if needed."""
+        update_fields = kwargs.get('update_fields')
+        full_save = update_fields is None
+        if full_save:
+            self.assign_qr_uuid()
 
         # Update PostGIS location when lat/lng changes
         self.update_location()
+        if not full_save and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'location'}
 
         super().save(*args, **kwargs)
 
+        # QR rendering happens in the background, off the request path
+        if full_save and not self.qr_code_image:
+            from .qr import generate_bin_qr_code
+            submit_on_commit('qr_codes', generate_bin_qr_code, self.pk)
+
 
-class PickupRequest(models.Model):
+class PickupRequest(DirtyFieldsMixin, models.Model):
     """Pickup order/request following Fiverr-like lifecycle."""
 
     class PickupStatus(models.TextChoices):
@@ -124,6 +124,9 @@ class PickupRequest(models.Model):
         CANCELLED = 'cancelled', 'Cancelled'
         DISPUTED = 'disputed', 'Disputed'
 
+    # A worker is on the way or at the bin
+    ACTIVE_STATUSES = (PickupStatus.ACCEPTED, PickupStatus.IN_PROGRESS)
+
     class PaymentMethod(models.TextChoices):
         CASH = 'cash', 'Cash'
         MOBILE_MONEY = 'mobile_money', 'Mobile Money'
@@ -212,6 +215,19 @@ class PickupProof(models.Model):
     pickup = models.ForeignKey(PickupRequest, on_delete=models.CASCADE, related_name='proofs')
     type = models.CharField(max_length=10, choices=ProofType.choices)
     image = models.ImageField(upload_to='pickup_proofs/%Y/%m/%d/')
+    # Resized, metadata-free variants built by apps.bins.proof_processing
+    thumbnail = models.ImageField(upload_to='pickup_proofs/variants/%Y/%m/%d/', null=True, blank=True)
+    display_image = models.ImageField(upload_to='pickup_proofs/variants/%Y/%m/%d/', null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # Why the image could not be processed; such proofs are not retried automatically
+    processing_error = models.CharField(max_length=255, blank=True, default='')
+    # Duplicate detection, see apps.bins.proof_dedup
+    content_sha256 = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    perceptual_hash = models.BigIntegerField(null=True, blank=True)
+    phash_band_0 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    phash_band_1 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    phash_band_2 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
+    phash_band_3 = models.PositiveIntegerField(null=True, blank=True, db_index=True)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     captured_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='captured_proofs')
@@ -227,17 +243,52 @@ class PickupProof(models.Model):
     needs_manual_review = models.BooleanField(default=False)
     geofence_check_passed = models.BooleanField(null=True, blank=True)
 
+    # Verification queue lease, see apps.bins.verification_queue
+    claimed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='claimed_proofs')
+    claim_expires_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['type']),
             models.Index(fields=['pickup', 'status']),
+            # Matches the verification queue ordering so pages are read in index order
+            models.Index(
+                fields=['-needs_manual_review', 'confidence_score', 'id'],
+                name='bins_proof_queue_idx',
+                condition=models.Q(status='pending'),
+            ),
         ]
 
     def __str__(self):
         return f"{self.get_type_display()} proof for Pickup #{self.pickup_id}"
 
+    def save(self, *args, **kwargs):
+        """Schedule variant generation and GPS/geofence checks for new uploads."""
+        adding = self._state.adding
+        if adding and self.image and not self.image._committed:
+            self.reuse_identical_upload()
+        super().save(*args, **kwargs)
+
+        if adding and self.image:
+            from .proof_processing import process_pickup_proof
+            submit_on_commit('proofs', process_pickup_proof, self.pk)
+
+    def reuse_identical_upload(self):
+        """Point a fresh upload at an existing stored file with the same content."""
+        from .proof_dedup import file_sha256
+
+        self.content_sha256 = file_sha256(self.image)
+        existing = (
+            PickupProof.objects.filter(content_sha256=self.content_sha256)
+            .exclude(image='')
+            .values_list('image', flat=True)
+            .first()
+        )
+        if existing:
+            self.image = existing
+
     @property
     def can_be_accepted(self):
         return self.status == self.PickupStatus.OPEN and self.worker is None
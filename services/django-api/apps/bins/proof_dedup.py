@@ -0,0 +1,151 @@
+"""
+Duplicate detection for pickup proof photos.
+
+Every processed proof gets a 64-bit difference hash (dHash) of its image.
+Visually identical photos - the same shot re-uploaded, recompressed or
+resized - hash to values a few bits apart, while unrelated photos differ in
+about half of the bits.
+
+To find near-duplicates without scanning every proof, the hash is also
+stored as four indexed 16-bit bands (multi-index hashing). If two hashes are
+within ``r`` bits of each other, at least one band differs by at most
+``r // 4`` bits, so a lookup only has to probe each band index for the few
+values within that distance and compare full hashes for the candidates.
+
+Byte-identical uploads are detected earlier by ``content_sha256`` and share
+the stored original and its variants.
+"""
+import hashlib
+from itertools import combinations
+
+from django.conf import settings
+from django.db.models import Q
+from PIL import Image
+
+HASH_BITS = 64
+BAND_COUNT = 4
+BAND_BITS = HASH_BITS // BAND_COUNT
+BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def dhash(image):
+    """Return the 64-bit difference hash of a PIL image."""
+    pixels = list(image.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        offset = row * 9
+        for col in range(8):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
+
+
+def to_signed(value):
+    """Map an unsigned 64-bit hash onto a signed ``BigIntegerField`` value."""
+    return value - (1 << HASH_BITS) if value >= (1 << (HASH_BITS - 1)) else value
+
+
+def to_unsigned(value):
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+
+def hamming(a, b):
+    return bin(to_unsigned(a) ^ to_unsigned(b)).count('1')
+
+
+def split_bands(value):
+    """Split a hash into ``BAND_COUNT`` integers, most significant first."""
+    value = to_unsigned(value)
+    return [(value >> (BAND_BITS * (BAND_COUNT - 1 - i))) & BAND_MASK for i in range(BAND_COUNT)]
+
+
+def band_fields(value):
+    """Model field values for the perceptual hash and its index bands."""
+    fields = {'perceptual_hash': to_signed(value)}
+    fields.update({f'phash_band_{i}': band for i, band in enumerate(split_bands(value))})
+    return fields
+
+
+def _neighbours(band, max_flips):
+    """All band values within ``max_flips`` bits of ``band``."""
+    values = {band}
+    for flips in range(1, max_flips + 1):
+        for bits in combinations(range(BAND_BITS), flips):
+            flipped = band
+            for bit in bits:
+                flipped ^= 1 << bit
+            values.add(flipped)
+    return values
+
+
+def max_duplicate_distance():
+    return getattr(settings, 'PROOF_DUPLICATE_MAX_DISTANCE', 6)
+
+
+def find_near_duplicates(value, exclude_pk=None, exclude_pickup=None, max_distance=None):
+    """
+    Return ``[(distance, proof_id, pickup_id)]`` for proofs within ``max_distance`` bits.
+
+    Results are ordered closest first.
+    """
+    from .models import PickupProof
+
+    if max_distance is None:
+        max_distance = max_duplicate_distance()
+    max_flips = max_distance // BAND_COUNT
+
+    probe = Q()
+    for i, band in enumerate(split_bands(value)):
+        probe |= Q(**{f'phash_band_{i}__in': sorted(_neighbours(band, max_flips))})
+
+    candidates = PickupProof.objects.filter(probe)
+    if exclude_pk is not None:
+        candidates = candidates.exclude(pk=exclude_pk)
+    if exclude_pickup is not None:
+        candidates = candidates.exclude(pickup_id=exclude_pickup)
+
+    matches = []
+    for proof_id, pickup_id, candidate_hash in candidates.values_list('pk', 'pickup_id', 'perceptual_hash'):
+        distance = hamming(value, candidate_hash)
+        if distance <= max_distance:
+            matches.append((distance, proof_id, pickup_id))
+    return sorted(matches)
+
+
+def duplicate_review(value, proof):
+    """
+    Review fields for ``proof`` given its perceptual hash.
+
+    Near-duplicates from other pickups force manual review and cap
+    ``confidence_score`` in proportion to how close the closest match is (0
+    for an identical photo). Shots of the same pickup, such as the before and
+    after photos of one bin, are expected to look alike and are ignored.
+    Returns an empty dict when no duplicate exists.
+    """
+    matches = find_near_duplicates(value, exclude_pk=proof.pk, exclude_pickup=proof.pickup_id)
+    if not matches:
+        return {}
+
+    distance, proof_id, pickup_id = matches[0]
+    duplicate_confidence = distance / (max_duplicate_distance() + 1)
+    confidence = proof.confidence_score
+    result = dict(proof.ai_verification_result or {})
+    result['duplicate_check'] = {
+        'duplicate_of': proof_id,
+        'duplicate_pickup': pickup_id,
+        'distance': distance,
+        'matches': len(matches),
+    }
+    return {
+        'needs_manual_review': True,
+        'confidence_score': duplicate_confidence if confidence is None else min(confidence, duplicate_confidence),
+        'ai_verification_result': result,
+    }
+
+
+def file_sha256(field_file):
+    """SHA-256 of an uploaded file's content, leaving the file rewound."""
+    digest = hashlib.sha256()
+    for chunk in field_file.chunks():
+        digest.update(chunk)
+    field_file.seek(0)
+    return digest.hexdigest()
@@ -0,0 +1,188 @@
+"""
+Background processing for pickup proof photos.
+
+Uploads store the camera original as-is and return immediately.
+``PickupProof.save()`` then schedules ``process_pickup_proof`` on the
+``proofs`` pool, which:
+
+* renders a thumbnail and a display-size JPEG, both without EXIF metadata,
+* fills ``latitude``/``longitude`` from the photo's EXIF GPS tags when the
+  client did not report a position, and
+* sets ``geofence_check_passed`` by comparing that position with the bin, and
+* computes the perceptual hash used to flag duplicate photos
+  (see ``apps.bins.proof_dedup``).
+
+Lists and detail views serve the variants; the original is kept untouched
+as verification evidence.
+"""
+import io
+import logging
+import os
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Q
+from django.utils import timezone
+from PIL import ExifTags, Image, ImageOps, UnidentifiedImageError
+
+from .geo import haversine_m
+from .proof_dedup import band_fields, dhash, duplicate_review, to_unsigned
+
+logger = logging.getLogger(__name__)
+
+JPEG_QUALITY = 82
+
+
+def _variant_sizes():
+    return {
+        'thumbnail': getattr(settings, 'PROOF_THUMBNAIL_SIZE', 320),
+        'display_image': getattr(settings, 'PROOF_DISPLAY_SIZE', 1280),
+    }
+
+
+def _dms_to_degrees(dms, ref):
+    degrees, minutes, seconds = (float(part) for part in dms)
+    value = degrees + minutes / 60 + seconds / 3600
+    return -value if ref in ('S', 'W') else value
+
+
+def extract_gps(image):
+    """
+    Return ``(latitude, longitude)`` from an image's EXIF GPS tags.
+
+    Returns ``None`` when the image carries no usable position.
+    """
+    try:
+        gps = image.getexif().get_ifd(ExifTags.IFD.GPSInfo)
+        latitude = _dms_to_degrees(gps[ExifTags.GPS.GPSLatitude], gps.get(ExifTags.GPS.GPSLatitudeRef))
+        longitude = _dms_to_degrees(gps[ExifTags.GPS.GPSLongitude], gps.get(ExifTags.GPS.GPSLongitudeRef))
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def render_variant(image, max_size):
+    """Downscale ``image`` to fit ``max_size`` and encode it as a metadata-free JPEG."""
+    variant = image.copy()
+    variant.thumbnail((max_size, max_size), Image.LANCZOS)
+    if variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    buffer = io.BytesIO()
+    # No exif= argument, so GPS and device tags are not carried over
+    variant.save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def render_proof_variants(image_file, sizes=None):
+    """
+    Decode a proof photo once and build every variant.
+
+    ``sizes`` maps variant field name to its longest edge in pixels and
+    defaults to the configured thumbnail and display sizes. Returns
+    ``(variants, gps, phash)`` where ``variants`` maps field name to JPEG
+    bytes, ``gps`` is the EXIF position or ``None`` and ``phash`` is the
+    image's perceptual hash.
+    """
+    sizes = sizes or _variant_sizes()
+    with Image.open(image_file) as image:
+        gps = extract_gps(image)
+        # Let the JPEG decoder downscale while decoding instead of inflating the full frame
+        largest = max(sizes.values())
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        variants = {field: render_variant(image, size) for field, size in sizes.items()}
+        phash = dhash(image)
+    return variants, gps, phash
+
+
+def _processed_twin(proof):
+    """An already processed proof whose original is byte-identical to ``proof``."""
+    from .models import PickupProof
+
+    if not proof.content_sha256:
+        return None
+    return (
+        PickupProof.objects.filter(content_sha256=proof.content_sha256, perceptual_hash__isnull=False)
+        .exclude(pk=proof.pk)
+        .exclude(Q(thumbnail='') | Q(thumbnail__isnull=True))
+        .exclude(Q(display_image='') | Q(display_image__isnull=True))
+        .only('id', 'thumbnail', 'display_image', 'perceptual_hash')
+        .first()
+    )
+
+
+def check_geofence(latitude, longitude, bin_obj):
+    """True when the position lies within ``PROOF_GEOFENCE_RADIUS_M`` of the bin."""
+    if latitude is None or longitude is None or bin_obj.latitude is None or bin_obj.longitude is None:
+        return None
+    radius = getattr(settings, 'PROOF_GEOFENCE_RADIUS_M', 100)
+    return haversine_m(latitude, longitude, bin_obj.latitude, bin_obj.longitude) <= radius
+
+
+def process_pickup_proof(proof_pk, force=False):
+    """
+    Background job: build variants, extract GPS, run the geofence check and
+    flag near-duplicate photos.
+
+    Results are written with a queryset ``update()`` so processing does not
+    re-trigger ``PickupProof.save()``.
+    """
+    from .models import PickupProof
+
+    try:
+        proof = PickupProof.objects.select_related('pickup__bin').get(pk=proof_pk)
+    except PickupProof.DoesNotExist:
+        logger.warning(f"Skipping processing for missing proof {proof_pk}")
+        return None
+
+    if proof.processed_at and (proof.perceptual_hash is not None or proof.processing_error) and not force:
+        return proof
+    if not proof.image:
+        return proof
+
+    # Identical uploads share the stored variants; only the EXIF header is read
+    twin = None if force else _processed_twin(proof)
+    try:
+        with proof.image.open('rb') as image_file:
+            if twin:
+                with Image.open(image_file) as image:
+                    gps = extract_gps(image)
+                variants, phash = {}, to_unsigned(twin.perceptual_hash)
+            else:
+                variants, gps, phash = render_proof_variants(image_file)
+    except (OSError, UnidentifiedImageError) as e:
+        logger.error(f"Could not process image for proof {proof_pk}: {e}")
+        PickupProof.objects.filter(pk=proof.pk).update(
+            needs_manual_review=True, processed_at=timezone.now(), processing_error=str(e)[:255] or type(e).__name__
+        )
+        return proof
+
+    stem = os.path.splitext(os.path.basename(proof.image.name))[0]
+    updates = {}
+    if twin:
+        updates.update(thumbnail=twin.thumbnail.name, display_image=twin.display_image.name)
+    for field_name, data in variants.items():
+        field_file = getattr(proof, field_name)
+        suffix = 'thumb' if field_name == 'thumbnail' else 'display'
+        field_file.save(f"{stem}_{suffix}.jpg", ContentFile(data), save=False)
+        updates[field_name] = field_file.name
+
+    updates.update(band_fields(phash))
+    updates.update(duplicate_review(phash, proof))
+
+    if gps and (proof.latitude is None or proof.longitude is None):
+        proof.latitude, proof.longitude = (Decimal(f"{value:.6f}") for value in gps)
+        updates.update(latitude=proof.latitude, longitude=proof.longitude)
+
+    proof.geofence_check_passed = check_geofence(proof.latitude, proof.longitude, proof.pickup.bin)
+    proof.processed_at = timezone.now()
+    updates.update(
+        geofence_check_passed=proof.geofence_check_passed,
+        processed_at=proof.processed_at,
+        processing_error='',
+    )
+    PickupProof.objects.filter(pk=proof.pk).update(**updates)
+    return proof
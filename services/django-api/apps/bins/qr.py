@@ -0,0 +1,115 @@
+"""
+QR code rendering and storage for bins.
+
+Rendering a QR PNG is CPU bound, so it is kept off the request path:
+``Bin.save()`` only assigns a ``qr_code_uuid`` and schedules
+``generate_bin_qr_code`` as a background job. Rendered images are cached by
+content - identical payloads are rendered once per process and stored once,
+under a name derived from the payload digest.
+"""
+import hashlib
+import io
+import logging
+from functools import lru_cache
+
+import qrcode
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+QR_UPLOAD_DIR = 'qr_codes'
+QR_RENDER_CACHE_SIZE = 1024
+
+
+def qr_payload(qr_uuid):
+    """Return the data encoded in a bin's QR code."""
+    return f"klynaa://bin/{qr_uuid}"
+
+
+def payload_digest(payload):
+    """Content digest used to deduplicate rendered QR images."""
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def qr_storage_name(payload):
+    """Storage path for the rendered image of ``payload``."""
+    return f"{QR_UPLOAD_DIR}/qr_{payload_digest(payload)[:32]}.png"
+
+
+@lru_cache(maxsize=QR_RENDER_CACHE_SIZE)
+def render_qr_png(payload):
+    """
+    Render ``payload`` as a PNG and return the raw bytes.
+
+    Pure function of the payload, so results are memoised per process and
+    it can be shipped to worker processes for batch pre-generation.
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def store_qr_png(payload, png_bytes=None):
+    """
+    Store the image for ``payload`` unless identical content already exists.
+
+    Returns the storage name to assign to ``Bin.qr_code_image``.
+    """
+    name = qr_storage_name(payload)
+    if default_storage.exists(name):
+        return name
+    if png_bytes is None:
+        png_bytes = render_qr_png(payload)
+    return default_storage.save(name, ContentFile(png_bytes))
+
+
+def ensure_qr_image(bin_obj, force=False):
+    """
+    Make sure ``bin_obj`` has a stored QR image and return its PNG bytes.
+
+    The image column is written with a queryset ``update()`` so that
+    generating a QR code does not re-run ``Bin.save()`` or its signals.
+    """
+    from .models import Bin
+
+    if not bin_obj.qr_code_uuid:
+        bin_obj.assign_qr_uuid()
+        Bin.objects.filter(pk=bin_obj.pk).update(qr_code_uuid=bin_obj.qr_code_uuid)
+
+    payload = qr_payload(bin_obj.qr_code_uuid)
+    png_bytes = render_qr_png(payload)
+
+    if force or not bin_obj.qr_code_image:
+        name = store_qr_png(payload, png_bytes)
+        bin_obj.qr_code_image.name = name
+        Bin.objects.filter(pk=bin_obj.pk).update(qr_code_image=name)
+
+    return png_bytes
+
+
+def generate_bin_qr_code(bin_pk):
+    """Background job: render and store the QR code for a single bin."""
+    from .models import Bin
+
+    try:
+        bin_obj = Bin.objects.only('id', 'qr_code_uuid', 'qr_code_image').get(pk=bin_pk)
+    except Bin.DoesNotExist:
+        logger.warning(f"Skipping QR generation for missing bin {bin_pk}")
+        return None
+
+    if bin_obj.qr_code_image:
+        return bin_obj.qr_code_image.name
+
+    ensure_qr_image(bin_obj)
+    return bin_obj.qr_code_image.name
@@ -0,0 +1,95 @@
+"""
+QR scan resolution cache.
+
+Maps a bin's ``qr_code_uuid`` to a compact record holding what the scan and
+location-validation endpoints need (coordinates plus the serialized bin), so
+repeated scans of the same bin do not touch the database. Entries are evicted
+LRU, expire after ``QR_RESOLUTION_CACHE_TTL`` seconds and are invalidated
+whenever the bin is saved or deleted, immediately and again on commit, so a
+scan that read the old row before the write committed is not kept.
+"""
+import logging
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.caching import LRUCache
+
+from .models import Bin
+
+logger = logging.getLogger(__name__)
+
+# Cached for unknown UUIDs so bad scans retried on flaky networks stay cheap
+NOT_FOUND = {'found': False}
+
+qr_resolution_cache = LRUCache(
+    maxsize=getattr(settings, 'QR_RESOLUTION_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'QR_RESOLUTION_CACHE_TTL', 300),
+)
+
+
+def parse_qr_uuid(qr_data):
+    """
+    Extract the bin UUID from scanned QR data.
+
+    Accepts both ``klynaa://bin/{uuid}`` payloads and bare UUID strings.
+    Raises ``ValueError`` for anything else.
+    """
+    qr_data = str(qr_data).strip()
+    if qr_data.startswith('klynaa://bin/'):
+        qr_data = qr_data.split('/')[-1]
+    return uuid.UUID(qr_data)
+
+
+def build_bin_record(bin_obj):
+    """Compact, cacheable representation of a bin for scan responses."""
+    from .serializers import BinSerializer
+
+    return {
+        'found': True,
+        'id': bin_obj.pk,
+        'bin_id': bin_obj.bin_id,
+        'label': bin_obj.label,
+        'latitude': float(bin_obj.latitude),
+        'longitude': float(bin_obj.longitude),
+        'bin': dict(BinSerializer(bin_obj).data),
+    }
+
+
+def resolve_qr(qr_uuid):
+    """
+    Return the cached record for ``qr_uuid``, loading it on a miss.
+
+    Returns ``None`` when no bin carries that QR code.
+    """
+    key = str(qr_uuid)
+    record = qr_resolution_cache.get(key)
+    if record is None:
+        try:
+            bin_obj = Bin.objects.select_related('owner').get(qr_code_uuid=qr_uuid)
+            record = build_bin_record(bin_obj)
+        except Bin.DoesNotExist:
+            record = NOT_FOUND
+        qr_resolution_cache.set(key, record)
+    return record if record['found'] else None
+
+
+def invalidate_qr(qr_uuid):
+    """Drop the cached record for ``qr_uuid`` now and when the transaction commits."""
+    if qr_uuid:
+        key = str(qr_uuid)
+        qr_resolution_cache.pop(key)
+        transaction.on_commit(lambda: qr_resolution_cache.pop(key))
+
+
+@receiver(post_save, sender=Bin, dispatch_uid='qr_cache_bin_saved')
+def invalidate_on_bin_save(sender, instance, **kwargs):
+    invalidate_qr(instance.qr_code_uuid)
+
+
+@receiver(post_delete, sender=Bin, dispatch_uid='qr_cache_bin_deleted')
+def invalidate_on_bin_delete(sender, instance, **kwargs):
+    invalidate_qr(instance.qr_code_uuid)
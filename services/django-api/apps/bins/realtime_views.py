@@ -193,60 +193,23 @@ def update_worker_location_with_broadcast(request):
                 'error': 'User is not a worker'
             }, status=status.HTTP_403_FORBIDDEN)
 
+        from apps.users.location_store import update_worker_location
+
         worker = request.user
         lat = float(request.data.get('lat'))
         lng = float(request.data.get('lng'))
 
-        with transaction.atomic():
-            worker.latitude = lat
-            worker.longitude = lng
-            worker.save()
-
-            # Broadcast location update to all active pickups
-            active_pickups = PickupRequest.objects.filter(
-                worker=worker,
-                status__in=['assigned', 'in_progress']
-            )
-
-            for pickup in active_pickups:
-                broadcast_pickup_update(
-                    pickup_id=pickup.id,
-                    update_type='worker_location_update',
-                    data={
-                        'worker_location': {
-                            'lat': lat,
-                            'lng': lng
-                        },
-                        'timestamp': timezone.now().isoformat(),
-                        'worker_name': f"{worker.first_name} {worker.last_name}"
-                    }
-                )
-
-                # Also notify customer
-                if pickup.customer:
-                    broadcast_customer_notification(
-                        customer_id=pickup.customer.id,
-                        notification_type='worker_location',
-                        data={
-                            'pickup_id': pickup.id,
-                            'worker_location': {
-                                'lat': lat,
-                                'lng': lng
-                            },
-                            'message': f"Worker location updated",
-                            'timestamp': timezone.now().isoformat(),
-                            'worker_name': f"{worker.first_name} {worker.last_name}"
-                        }
-                    )
+        # Stored in memory and persisted in batches; broadcast only on meaningful moves
+        location, broadcast = update_worker_location(worker.id, lat, lng)
 
         return Response({
             'success': True,
             'location': {
                 'lat': lat,
                 'lng': lng,
-                'updated_at': worker.updated_at.isoformat()
+                'updated_at': location['timestamp']
             },
-            'active_pickups_notified': active_pickups.count()
+            'broadcast': broadcast
         })
 
     except Exception as e:
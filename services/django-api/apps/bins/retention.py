@@ -0,0 +1,134 @@
+"""
+Retention engine for serverless log tables.
+
+Expired rows are deleted in bounded primary-key chunks, each in its own
+short transaction, so cleanup never holds a long table lock or loads the
+whole date range into Python. Rows can optionally be archived to gzipped
+JSON-lines files before they are deleted.
+"""
+import gzip
+import json
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def _archive_root():
+    return getattr(settings, 'LOG_ARCHIVE_ROOT', os.path.join(settings.BASE_DIR, 'archives'))
+
+
+class RetentionEngine:
+    """Delete (and optionally archive) rows older than a cutoff in chunks."""
+
+    def __init__(self, model, date_field='created_at', chunk_size=None,
+                 archive=False, archive_root=None, pause=0.0, using='default'):
+        self.model = model
+        self.date_field = date_field
+        self.chunk_size = chunk_size or getattr(settings, 'LOG_RETENTION_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+        self.archive = archive
+        self.archive_root = archive_root or _archive_root()
+        self.pause = pause
+        self.using = using
+
+    def _expired(self, cutoff):
+        return (
+            self.model._default_manager.using(self.using)
+            .filter(**{f'{self.date_field}__lt': cutoff})
+            .order_by('pk')
+        )
+
+    def _archive_path(self, cutoff):
+        table = self.model._meta.db_table
+        directory = os.path.join(self.archive_root, table)
+        os.makedirs(directory, exist_ok=True)
+        # Unique per run: the file is removed again when the run archives nothing
+        stamp = timezone.now().strftime('%Y%m%dT%H%M%S%f')
+        return os.path.join(directory, f"{table}-before-{cutoff:%Y%m%d}-{stamp}.jsonl.gz")
+
+    def _delete_chunk(self, pks):
+        batch = self.model._default_manager.using(self.using).filter(pk__in=pks)
+        collector = Collector(using=self.using)
+        if collector.can_fast_delete(batch):
+            # No cascades or delete signals: issue a single DELETE without collecting objects
+            return batch._raw_delete(self.using)
+        return batch.delete()[0]
+
+    def purge(self, cutoff):
+        """
+        Remove rows older than ``cutoff`` and return run statistics.
+
+        Each chunk is archived (when enabled) and deleted in its own
+        transaction, so an interrupted run leaves the table consistent and
+        can simply be re-run.
+        """
+        started = time.monotonic()
+        expired = self._expired(cutoff)
+        deleted = archived = chunks = 0
+        archive_path = self._archive_path(cutoff) if self.archive else None
+        archive_file = gzip.open(archive_path, 'xt', encoding='utf-8') if archive_path else None
+        last_pk = None
+
+        try:
+            while True:
+                page = expired if last_pk is None else expired.filter(pk__gt=last_pk)
+                pks = list(page.values_list('pk', flat=True)[:self.chunk_size])
+                if not pks:
+                    break
+
+                with transaction.atomic(using=self.using):
+                    if archive_file:
+                        rows = self.model._default_manager.using(self.using).filter(pk__in=pks).values()
+                        for row in rows:
+                            archive_file.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+                            archived += 1
+                        archive_file.flush()
+                    deleted += self._delete_chunk(pks)
+
+                chunks += 1
+                last_pk = pks[-1]
+                if self.pause:
+                    time.sleep(self.pause)
+        finally:
+            if archive_file:
+                archive_file.close()
+
+        elapsed = time.monotonic() - started
+        stats = {
+            'table': self.model._meta.db_table,
+            'cutoff': cutoff.isoformat(),
+            'deleted_count': deleted,
+            'archived_count': archived,
+            'archive_path': archive_path if archived else None,
+            'chunks': chunks,
+            'chunk_size': self.chunk_size,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(deleted / elapsed, 1) if elapsed > 0 else float(deleted),
+        }
+        if archive_path and not archived:
+            os.remove(archive_path)
+        logger.info(
+            f"Retention purge of {stats['table']}: {deleted} rows in {chunks} chunks "
+            f"({stats['rows_per_second']} rows/s)"
+        )
+        return stats
+
+
+def get_log_models():
+    """Serverless log tables subject to retention, keyed by cleanup ``data_type``."""
+    from .models import EscrowLog, GeoLog, NotificationLog
+
+    return {
+        'notification_logs': NotificationLog,
+        'geo_logs': GeoLog,
+        'escrow_logs': EscrowLog,
+    }
@@ -7,31 +7,61 @@ from .models import Bin, PickupRequest, PickupProof
 from apps.users.models import User
 
 
+def _file_url(field_file, request=None):
+    if field_file and hasattr(field_file, 'url'):
+        url = field_file.url
+        return request.build_absolute_uri(url) if request else url
+    return None
+
+
 class PickupProofSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
     captured_by_name = serializers.SerializerMethodField()
 
     class Meta:
         model = PickupProof
         fields = [
-            'id', 'pickup', 'type', 'image', 'image_url', 'latitude', 'longitude',
+            'id', 'pickup', 'type', 'image', 'image_url', 'thumbnail_url', 'latitude', 'longitude',
             'captured_by', 'captured_by_name', 'status', 'notes',
-            'verified_by', 'created_at', 'verified_at'
+            'verified_by', 'created_at', 'verified_at',
+            'geofence_check_passed', 'processed_at'
+        ]
+        read_only_fields = [
+            'id', 'captured_by', 'status', 'verified_by', 'created_at', 'verified_at',
+            'geofence_check_passed', 'processed_at'
         ]
-        read_only_fields = ['id', 'captured_by', 'status', 'verified_by', 'created_at', 'verified_at']
 
     def get_image_url(self, obj):
-        request = self.context.get('request')
-        if obj.image and hasattr(obj.image, 'url'):
-            url = obj.image.url
-            return request.build_absolute_uri(url) if request else url
-        return None
+        # Serve the display-size variant once processed, the original until then
+        return _file_url(obj.display_image or obj.image, self.context.get('request'))
+
+    def get_thumbnail_url(self, obj):
+        return _file_url(obj.thumbnail or obj.display_image or obj.image, self.context.get('request'))
 
     def get_captured_by_name(self, obj):
         if obj.captured_by:
             return f"{obj.captured_by.first_name} {obj.captured_by.last_name}".strip() or str(obj.captured_by)
         return None
 
+
+class VerificationQueueSerializer(PickupProofSerializer):
+    """Proof as shown in the admin verification queue, including its lease."""
+
+    claimed_by_name = serializers.SerializerMethodField()
+
+    class Meta(PickupProofSerializer.Meta):
+        fields = PickupProofSerializer.Meta.fields + [
+            'needs_manual_review', 'confidence_score', 'claimed_by', 'claimed_by_name', 'claim_expires_at'
+        ]
+        read_only_fields = fields
+
+    def get_claimed_by_name(self, obj):
+        if obj.claimed_by:
+            return f"{obj.claimed_by.first_name} {obj.claimed_by.last_name}".strip() or str(obj.claimed_by)
+        return None
+
+
 User = get_user_model()
 
 
@@ -7,6 +7,7 @@ from .views import (
     ReportsViewSet, AnalyticsViewSet, WorkersViewSet, UsersViewSet, CleanupViewSet
 )
 from .views_qr import QRCodeViewSet
+from .views_verification import ProofVerificationQueueViewSet
 from . import admin_views
 from . import realtime_views
 from . import websocket_views
@@ -23,6 +24,7 @@ router.register(r'workers', WorkersViewSet, basename='workers')
 router.register(r'users', UsersViewSet, basename='users-api')
 router.register(r'cleanup', CleanupViewSet, basename='cleanup')
 router.register(r'qr', QRCodeViewSet, basename='qr-code')
+router.register(r'verification-queue', ProofVerificationQueueViewSet, basename='verification-queue')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -32,11 +34,13 @@ urlpatterns = [
     path('serverless/log-notification/', ServerlessIntegrationViewSet.as_view({'post': 'log_notification'})),
     path('serverless/log-geo-event/', ServerlessIntegrationViewSet.as_view({'post': 'log_geo_event'})),
     path('serverless/log-escrow-event/', ServerlessIntegrationViewSet.as_view({'post': 'log_escrow_event'})),
+    path('serverless/log-batch/', ServerlessIntegrationViewSet.as_view({'post': 'log_batch'})),
 
     # Admin dashboard
     path('admin/dashboard/', admin_views.admin_dashboard, name='admin_dashboard'),
     path('admin/metrics/', admin_views.admin_metrics_api, name='admin_metrics'),
     path('admin/activity/', admin_views.admin_recent_activity, name='admin_activity'),
+    path('admin/websocket-metrics/', admin_views.admin_websocket_metrics, name='admin_websocket_metrics'),
 
     # Analytics endpoints
 
@@ -0,0 +1,174 @@
+"""
+Admin verification queue for pickup proofs.
+
+Pending proofs are served in priority order - flagged for manual review
+first, then least confident first, then oldest id - straight off the
+partial ``bins_proof_queue_idx`` index. Pages are addressed with an opaque
+keyset cursor instead of an offset, so deep pages cost the same as the
+first one.
+
+Admins claim proofs before deciding on them. A claim is a lease: it is
+taken with a conditional ``UPDATE`` that only succeeds if the proof is
+unclaimed, its lease has expired, or it is already held by the same admin,
+so concurrent reviewers never work the same proof. Expired leases return
+the proof to the queue automatically.
+"""
+import base64
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import PickupProof
+
+logger = logging.getLogger(__name__)
+
+QUEUE_ORDERING = (
+    F('needs_manual_review').desc(),
+    F('confidence_score').asc(nulls_last=True),
+    F('id').asc(),
+)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def lease_duration():
+    return timedelta(seconds=getattr(settings, 'PROOF_CLAIM_LEASE_SECONDS', 300))
+
+
+def encode_cursor(proof):
+    position = [proof.needs_manual_review, proof.confidence_score, proof.pk]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        review, confidence, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return bool(review), (None if confidence is None else float(confidence)), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def _after(position):
+    """Rows strictly after ``position`` in ``QUEUE_ORDERING``."""
+    review, confidence, pk = position
+    if confidence is None:
+        # Unscored proofs sort last within their review group
+        later_in_group = Q(confidence_score__isnull=True, id__gt=pk)
+    else:
+        later_in_group = (
+            Q(confidence_score__gt=confidence)
+            | Q(confidence_score__isnull=True)
+            | Q(confidence_score=confidence, id__gt=pk)
+        )
+    group = Q(needs_manual_review=review) & later_in_group
+    return (group | Q(needs_manual_review=False)) if review else group
+
+
+def available(user=None, now=None):
+    """Pending proofs that are unclaimed, past their lease, or held by ``user``."""
+    now = now or timezone.now()
+    free = Q(claimed_by__isnull=True) | Q(claim_expires_at__lte=now)
+    if user is not None:
+        free |= Q(claimed_by=user)
+    return PickupProof.objects.filter(status=PickupProof.VerificationStatus.PENDING).filter(free)
+
+
+def queue_page(user=None, cursor=None, limit=50, include_claimed=False):
+    """
+    Return ``(proofs, next_cursor)`` for one page of the queue.
+
+    Proofs leased to other admins are skipped unless ``include_claimed``.
+    """
+    if include_claimed:
+        queryset = PickupProof.objects.filter(status=PickupProof.VerificationStatus.PENDING)
+    else:
+        queryset = available(user)
+    if cursor:
+        queryset = queryset.filter(_after(decode_cursor(cursor)))
+
+    proofs = list(
+        queryset.select_related('captured_by', 'claimed_by', 'pickup')
+        .order_by(*QUEUE_ORDERING)[:limit + 1]
+    )
+    next_cursor = encode_cursor(proofs[limit - 1]) if len(proofs) > limit else None
+    return proofs[:limit], next_cursor
+
+
+def claim(user, count=1, proof_ids=None):
+    """
+    Lease up to ``count`` proofs (or the given ``proof_ids``) to ``user``.
+
+    Candidates are read in queue order and each is taken with a conditional
+    ``UPDATE``; a proof claimed by someone else in between is simply skipped.
+    Returns the claimed proofs.
+    """
+    now = timezone.now()
+    expires = now + lease_duration()
+    candidates = available(user, now).order_by(*QUEUE_ORDERING)
+    if proof_ids is not None:
+        candidates = candidates.filter(pk__in=proof_ids)
+
+    claimed_ids = []
+    # Over-fetch a little so losing a few races still fills the request
+    for pk in candidates.values_list('pk', flat=True)[:count * 2 if proof_ids is None else None]:
+        taken = available(user, now).filter(pk=pk).update(claimed_by=user, claim_expires_at=expires)
+        if taken:
+            claimed_ids.append(pk)
+            if len(claimed_ids) >= count and proof_ids is None:
+                break
+
+    return list(
+        PickupProof.objects.filter(pk__in=claimed_ids)
+        .select_related('captured_by', 'claimed_by', 'pickup')
+        .order_by(*QUEUE_ORDERING)
+    )
+
+
+def renew(user, proof_id):
+    """Extend ``user``'s lease on a proof. Returns False if the lease was lost."""
+    now = timezone.now()
+    return bool(
+        PickupProof.objects.filter(
+            pk=proof_id, status=PickupProof.VerificationStatus.PENDING,
+            claimed_by=user, claim_expires_at__gt=now
+        ).update(claim_expires_at=now + lease_duration())
+    )
+
+
+def release(user, proof_id):
+    """Give a claimed proof back to the queue."""
+    return bool(
+        PickupProof.objects.filter(pk=proof_id, claimed_by=user)
+        .update(claimed_by=None, claim_expires_at=None)
+    )
+
+
+def decide(user, proof_id, decision, notes=''):
+    """
+    Approve or reject a proof ``user`` currently holds a live lease on.
+
+    Returns the updated proof, or ``None`` when the lease was lost or the
+    proof was already decided.
+    """
+    now = timezone.now()
+    new_status = (
+        PickupProof.VerificationStatus.APPROVED if decision == 'approve'
+        else PickupProof.VerificationStatus.REJECTED
+    )
+    updated = PickupProof.objects.filter(
+        pk=proof_id, status=PickupProof.VerificationStatus.PENDING,
+        claimed_by=user, claim_expires_at__gt=now
+    ).update(
+        status=new_status, notes=notes, verified_by=user, verified_at=now,
+        claimed_by=None, claim_expires_at=None
+    )
+    if not updated:
+        return None
+    logger.info(f"Proof {proof_id} {new_status} by {user.pk}")
+    return PickupProof.objects.select_related('captured_by').get(pk=proof_id)
@@ -4,13 +4,18 @@ from typing import TYPE_CHECKING
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
 from django.db import transaction, models
 from django.utils import timezone
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.parsers import MultiPartParser, FormParser
 
 from .models import Bin, PickupRequest
+from .log_writer import (
+    LOG_EVENT_BUILDERS, build_escrow_log, build_geo_log, build_notification_log, log_writer
+)
 from .serializers import (
     BinSerializer, BinStatusUpdateSerializer, PickupRequestSerializer,
     AcceptPickupSerializer, UpdatePickupStatusSerializer
@@ -29,6 +34,9 @@ WORKER_ROLE = getattr(user_role_enum, 'WORKER', 'worker') if user_role_enum else
 ADMIN_ROLE = getattr(user_role_enum, 'ADMIN', 'admin') if user_role_enum else 'admin'
 CUSTOMER_ROLE = getattr(user_role_enum, 'CUSTOMER', 'customer') if user_role_enum else 'customer'
 
+# Upper bound on events accepted by ServerlessIntegrationViewSet.log_batch
+MAX_LOG_BATCH_EVENTS = 1000
+
 
 def safe_user_attr(user, attr, default=0):
     """Safely get user attribute with fallback."""
@@ -221,10 +229,10 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
                 pickup_request.worker = request.user
                 pickup_request.status = PickupRequest.PickupStatus.ACCEPTED
                 pickup_request.accepted_at = timezone.now()
-                pickup_request.save()
+                pickup_request.save_changed()
 
                 # Update worker's pending count
-                request.user.pending_pickups_count += 1
+                request.user.pending_pickups_count = models.F('pending_pickups_count') + 1
                 request.user.save(update_fields=['pending_pickups_count'])
 
                 # Update bin status
@@ -257,7 +265,7 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
         with transaction.atomic():
             # Update pickup status
             pickup_request.status = PickupRequest.PickupStatus.DELIVERED
-            pickup_request.save()
+            pickup_request.save_changed()
 
             # Handle payment based on method
             if pickup_request.payment_method == PickupRequest.PaymentMethod.CASH:
@@ -269,13 +277,13 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
                 pickup_request.payment_status = PickupRequest.PaymentStatus.PAID
                 # TODO: Integrate with escrow release logic
 
-            pickup_request.save()
+            pickup_request.save_changed()
 
             # Update bin status
             pickup_request.bin.status = Bin.BinStatus.EMPTY
             pickup_request.bin.fill_level = 0
             pickup_request.bin.last_pickup = timezone.now()
-            pickup_request.bin.save()
+            pickup_request.bin.save_changed()
 
         return Response({
             'message': 'Pickup marked as delivered successfully',
@@ -303,14 +311,14 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
                     # Update bin status and worker count
                     pickup_request.bin.status = Bin.BinStatus.EMPTY
                     pickup_request.bin.last_pickup = timezone.now()
-                    pickup_request.bin.save()
+                    pickup_request.bin.save_changed()
 
                     if pickup_request.worker:
                         current_count = safe_user_attr(pickup_request.worker, 'pending_pickups_count', 0)
                         safe_user_attr_set(pickup_request.worker, 'pending_pickups_count', current_count - 1)
                         pickup_request.worker.save(update_fields=['pending_pickups_count'] if hasattr(pickup_request.worker, 'pending_pickups_count') else [])
 
-                pickup_request.save()
+                pickup_request.save_changed()
 
             return Response(PickupRequestSerializer(pickup_request).data)
 
@@ -346,7 +354,7 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
             pickup_request.status = PickupRequest.PickupStatus.COMPLETED
             pickup_request.completed_at = timezone.now()
             pickup_request.payment_status = PickupRequest.PaymentStatus.PAID
-            pickup_request.save()
+            pickup_request.save_changed()
 
             # Update worker's pending count
             if pickup_request.worker:
@@ -578,12 +586,12 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
             # Update pickup status
             pickup_request.status = PickupRequest.PickupStatus.CANCELLED
             pickup_request.cancellation_reason = cancellation_reason
-            pickup_request.save()
+            pickup_request.save_changed()
 
             # Reset bin status if needed
             if pickup_request.bin.status == Bin.BinStatus.PENDING:
                 pickup_request.bin.status = Bin.BinStatus.FULL
-                pickup_request.bin.save()
+                pickup_request.bin.save_changed()
 
             # Update worker's pending count if worker was assigned
             if pickup_request.worker:
@@ -598,7 +606,7 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
                 refund_issued = True
                 # TODO: Integrate with payment provider for actual refund
 
-            pickup_request.save()
+            pickup_request.save_changed()
 
         return Response({
             'message': 'Pickup request cancelled successfully',
@@ -665,11 +673,18 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
         if not getattr(request.user, 'is_admin_user', False):
             return Response({'error': 'Admins only'}, status=status.HTTP_403_FORBIDDEN)
 
-        from .models import PickupProof
-        from .serializers import PickupProofSerializer
-        proofs = PickupProof.objects.filter(status='pending')
-        data = PickupProofSerializer(proofs, many=True, context={'request': request}).data
-        return Response({'proofs': data})
+        from .serializers import VerificationQueueSerializer
+        from .verification_queue import InvalidCursor, queue_page
+
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 50)), 200))
+            proofs, next_cursor = queue_page(
+                cursor=request.query_params.get('cursor'), limit=limit, include_claimed=True
+            )
+        except (InvalidCursor, ValueError):
+            return Response({'error': 'Invalid cursor or limit'}, status=status.HTTP_400_BAD_REQUEST)
+        data = VerificationQueueSerializer(proofs, many=True, context={'request': request}).data
+        return Response({'proofs': data, 'next_cursor': next_cursor})
 
     @action(detail=True, methods=['post'])
     def verify_proof(self, request, pk=None):
@@ -693,11 +708,18 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
         if decision not in ['approve', 'reject']:
             return Response({'error': 'Invalid decision'}, status=status.HTTP_400_BAD_REQUEST)
 
-        proof.status = 'approved' if decision == 'approve' else 'rejected'
-        proof.notes = notes
-        proof.verified_by = request.user
-        proof.verified_at = timezone.now()
-        proof.save()
+        from . import verification_queue as queue
+
+        # Same lease rules as the verification queue: never decide a proof another admin holds
+        decided = None
+        if queue.claim(request.user, proof_ids=[proof.pk]):
+            decided = queue.decide(request.user, proof.pk, decision, notes)
+        if decided is None:
+            return Response(
+                {'error': 'Proof is claimed by another reviewer or already decided'},
+                status=status.HTTP_409_CONFLICT
+            )
+        proof = decided
 
         return Response({'message': f'Proof {decision}d', 'proof': PickupProofSerializer(proof, context={'request': request}).data})
 
@@ -746,7 +768,7 @@ class ServerlessIntegrationViewSet(viewsets.ViewSet):
                 pickup.payment_status = PickupRequest.PaymentStatus.PAID
                 pickup.status = PickupRequest.PickupStatus.COMPLETED
                 pickup.completed_at = timezone.now()
-                pickup.save()
+                pickup.save_changed()
 
                 # Update worker's pending count
                 if pickup.worker:
@@ -769,59 +791,61 @@ class ServerlessIntegrationViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['post'])
     def log_notification(self, request):
         """Log notification events from serverless functions."""
-        from .models import NotificationLog
-
-        try:
-            NotificationLog.objects.create(
-                pickup_id=request.data.get('pickup_id'),
-                user_ids=request.data.get('user_ids', []),
-                notification_type=request.data.get('notification_type'),
-                title=request.data.get('title'),
-                body=request.data.get('body'),
-                success=request.data.get('success', False),
-                metadata=request.data.get('metadata', {}),
-                sent_by='serverless'
-            )
-            return Response({'message': 'Notification logged successfully'})
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return self._log_event(build_notification_log, request.data, 'Notification logged successfully')
 
     @action(detail=False, methods=['post'])
     def log_geo_event(self, request):
         """Log geographic events from serverless functions."""
-        from .models import GeoLog
-
-        try:
-            GeoLog.objects.create(
-                pickup_id=request.data.get('pickup_id'),
-                center_latitude=request.data.get('center_latitude'),
-                center_longitude=request.data.get('center_longitude'),
-                radius_km=request.data.get('radius_km'),
-                workers_found=request.data.get('workers_found', 0),
-                workers_notified=request.data.get('workers_notified', 0),
-                metadata=request.data.get('metadata', {}),
-                processed_by='serverless'
-            )
-            return Response({'message': 'Geo event logged successfully'})
-        except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return self._log_event(build_geo_log, request.data, 'Geo event logged successfully')
 
     @action(detail=False, methods=['post'])
     def log_escrow_event(self, request):
         """Log escrow events from serverless functions."""
-        from .models import EscrowLog
+        return self._log_event(build_escrow_log, request.data, 'Escrow event logged successfully')
 
-        try:
-            EscrowLog.objects.create(
-                pickup_id=request.data.get('pickup_id'),
-                payment_id=request.data.get('payment_id'),
-                action=request.data.get('action'),
-                reason=request.data.get('reason'),
-                amount=request.data.get('amount'),
-                processed_by=request.data.get('processed_by', 'serverless'),
-                metadata=request.data.get('metadata', {})
+    @action(detail=False, methods=['post'])
+    def log_batch(self, request):
+        """
+        Log many serverless events in one request.
+
+        Expects ``{"events": [{"kind": "notification" | "geo" | "escrow", ...}]}``
+        where each event carries the same fields as the single-event endpoints.
+        """
+        events = request.data.get('events')
+        if not isinstance(events, list) or not events:
+            return Response({'error': 'events must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(events) > MAX_LOG_BATCH_EVENTS:
+            return Response(
+                {'error': f'At most {MAX_LOG_BATCH_EVENTS} events per batch'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            return Response({'message': 'Escrow event logged successfully'})
+
+        accepted = 0
+        rejected = []
+        for index, event in enumerate(events):
+            builder = LOG_EVENT_BUILDERS.get(event.get('kind')) if isinstance(event, dict) else None
+            if builder is None:
+                rejected.append({'index': index, 'error': f'kind must be one of {sorted(LOG_EVENT_BUILDERS)}'})
+                continue
+            try:
+                log_writer.write(builder(event))
+                accepted += 1
+            except ValidationError as e:
+                rejected.append({'index': index, 'error': e.message_dict})
+
+        return Response({
+            'message': f'{accepted} events logged',
+            'accepted': accepted,
+            'rejected': rejected
+        }, status=status.HTTP_200_OK if not rejected else status.HTTP_207_MULTI_STATUS)
+
+    def _log_event(self, builder, data, message):
+        """Validate one log event and hand it to the buffered writer."""
+        try:
+            log_writer.write(builder(data))
+            return Response({'message': message})
+        except ValidationError as e:
+            return Response({'error': e.message_dict}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -1062,7 +1086,7 @@ class WorkersViewSet(viewsets.ViewSet):
             available_workers = User.objects.filter(
                 role=WORKER_ROLE,
                 is_available=True,
-                pending_pickups_count__lt=3
+                pending_pickups_count__lt=User.MAX_PENDING_PICKUPS
             )
 
             # Filter by location if coordinates provided
@@ -1172,22 +1196,33 @@ class CleanupViewSet(viewsets.ViewSet):
         if not data_type:
             return Response({'error': 'data_type required'}, status=status.HTTP_400_BAD_REQUEST)
 
+        # This endpoint is unauthenticated: callers may shrink the chunk size but
+        # never exceed the configured one, and archiving is left to purge_serverless_logs
+        max_chunk_size = getattr(settings, 'LOG_RETENTION_CHUNK_SIZE', 1000)
+        try:
+            retention_days = int(retention_days)
+            chunk_size = int(request.data.get('chunk_size') or max_chunk_size)
+        except (TypeError, ValueError):
+            return Response({'error': 'retention_days and chunk_size must be integers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if retention_days < 1:
+            return Response({'error': 'retention_days must be at least 1'}, status=status.HTTP_400_BAD_REQUEST)
+        chunk_size = min(max(chunk_size, 1), max_chunk_size)
+
         try:
             from datetime import timedelta
-            from django.utils import timezone
+            from .retention import RetentionEngine, get_log_models
 
             cutoff_date = timezone.now() - timedelta(days=retention_days)
             deleted_count = 0
-
-            if data_type == 'notification_logs':
-                from .models import NotificationLog
-                deleted_count = NotificationLog.objects.filter(created_at__lt=cutoff_date).delete()[0]
-            elif data_type == 'geo_logs':
-                from .models import GeoLog
-                deleted_count = GeoLog.objects.filter(created_at__lt=cutoff_date).delete()[0]
-            elif data_type == 'escrow_logs':
-                from .models import EscrowLog
-                deleted_count = EscrowLog.objects.filter(created_at__lt=cutoff_date).delete()[0]
+            stats = None
+
+            log_models = get_log_models()
+            if data_type in log_models:
+                # Chunked deletion keeps each transaction (and table lock) short
+                engine = RetentionEngine(log_models[data_type], chunk_size=chunk_size)
+                stats = engine.purge(cutoff_date)
+                deleted_count = stats['deleted_count']
             elif data_type == 'api_logs':
                 # Assuming you have API logging
                 deleted_count = 0  # Placeholder
@@ -1199,7 +1234,8 @@ class CleanupViewSet(viewsets.ViewSet):
                 'message': f'Cleaned up {deleted_count} {data_type} records',
                 'data_type': data_type,
                 'retention_days': retention_days,
-                'deleted_count': deleted_count
+                'deleted_count': deleted_count,
+                'stats': stats
             })
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
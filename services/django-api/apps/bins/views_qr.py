@@ -6,9 +6,10 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.http import HttpResponse
+from .geo import haversine_m
 from .models import Bin
-from .serializers import BinSerializer
-import uuid
+from .qr import ensure_qr_image
+from .qr_cache import parse_qr_uuid, resolve_qr
 
 
 class QRCodeViewSet(viewsets.ViewSet):
@@ -27,33 +28,27 @@ class QRCodeViewSet(viewsets.ViewSet):
 
         # Extract UUID from QR data (format: klynaa://bin/{uuid})
         try:
-            if qr_data.startswith('klynaa://bin/'):
-                qr_uuid = qr_data.split('/')[-1]
-                bin_uuid = uuid.UUID(qr_uuid)
-            else:
-                # Try direct UUID parsing
-                bin_uuid = uuid.UUID(qr_data)
+            bin_uuid = parse_qr_uuid(qr_data)
         except (ValueError, IndexError):
             return Response(
                 {'error': 'Invalid QR code format'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Find bin by QR UUID
-        try:
-            bin_obj = Bin.objects.get(qr_code_uuid=bin_uuid)
-            serializer = BinSerializer(bin_obj)
-            return Response({
-                'success': True,
-                'bin': serializer.data,
-                'message': f'Bin {bin_obj.label} scanned successfully'
-            })
-        except Bin.DoesNotExist:
+        # Resolve through the QR cache; repeat scans never reach the database
+        record = resolve_qr(bin_uuid)
+        if record is None:
             return Response(
                 {'error': 'Bin not found for this QR code'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        return Response({
+            'success': True,
+            'bin': record['bin'],
+            'message': f"Bin {record['label']} scanned successfully"
+        })
+
     @action(detail=False, methods=['get'])
     def generate(self, request):
         """Generate QR code for a specific bin."""
@@ -73,22 +68,20 @@ class QRCodeViewSet(viewsets.ViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Generate QR code if not exists
-        if not bin_obj.qr_code_image:
-            bin_obj.generate_qr_code()
-            bin_obj.save()
-
-        # Return QR code image
-        if bin_obj.qr_code_image:
-            response = HttpResponse(bin_obj.qr_code_image.read(), content_type='image/png')
-            response['Content-Disposition'] = f'inline; filename="qr_{bin_obj.bin_id}.png"'
-            return response
-        else:
+        # Render on demand when the background job has not stored it yet;
+        # rendering is cached by payload so repeat requests are cheap.
+        try:
+            png_bytes = ensure_qr_image(bin_obj)
+        except Exception:
             return Response(
                 {'error': 'Failed to generate QR code'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+        response = HttpResponse(png_bytes, content_type='image/png')
+        response['Content-Disposition'] = f'inline; filename="qr_{bin_obj.bin_id}.png"'
+        return response
+
     @action(detail=False, methods=['post'])
     def validate_location(self, request):
         """Validate that user is at the bin location for scanning."""
@@ -103,30 +96,25 @@ class QRCodeViewSet(viewsets.ViewSet):
             )
 
         try:
-            bin_obj = Bin.objects.get(qr_code_uuid=qr_uuid)
-        except Bin.DoesNotExist:
+            record = resolve_qr(parse_qr_uuid(qr_uuid))
+        except (ValueError, IndexError):
+            record = None
+        if record is None:
             return Response(
                 {'error': 'Bin not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Calculate distance (simple approximation)
-        from math import radians, cos, sin, asin, sqrt
-
-        def haversine(lon1, lat1, lon2, lat2):
-            """Calculate distance between two points on earth."""
-            lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-            dlon = lon2 - lon1
-            dlat = lat2 - lat1
-            a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-            c = 2 * asin(sqrt(a))
-            r = 6371  # Radius of earth in kilometers
-            return c * r * 1000  # Return in meters
-
-        distance = haversine(
-            float(user_lng), float(user_lat),
-            float(bin_obj.longitude), float(bin_obj.latitude)
-        )
+        try:
+            distance = haversine_m(
+                user_lat, user_lng,
+                record['latitude'], record['longitude']
+            )
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'latitude and longitude must be numeric'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
         # Allow 50 meter radius for location validation
         max_distance = 50
@@ -136,5 +124,5 @@ class QRCodeViewSet(viewsets.ViewSet):
             'valid': is_valid,
             'distance_meters': round(distance, 2),
             'max_distance_meters': max_distance,
-            'bin': BinSerializer(bin_obj).data
+            'bin': record['bin']
         })
@@ -0,0 +1,91 @@
+"""Admin verification queue endpoints for pickup proofs."""
+
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from . import verification_queue as queue
+from .serializers import VerificationQueueSerializer
+
+MAX_PAGE_SIZE = 200
+MAX_CLAIM_COUNT = 50
+
+
+def _bounded_int(value, default, maximum):
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        return default
+
+
+class ProofVerificationQueueViewSet(viewsets.ViewSet):
+    """Prioritized, lease-based proof verification queue for admins."""
+    permission_classes = [IsAuthenticated]
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if not getattr(request.user, 'is_admin_user', False):
+            self.permission_denied(request, message='Admins only')
+
+    def _serialize(self, proofs):
+        return VerificationQueueSerializer(proofs, many=True, context={'request': self.request}).data
+
+    def list(self, request):
+        """Page through pending proofs in priority order (``?cursor=&limit=&include_claimed=1``)."""
+        try:
+            proofs, next_cursor = queue.queue_page(
+                user=request.user,
+                cursor=request.query_params.get('cursor'),
+                limit=_bounded_int(request.query_params.get('limit'), 50, MAX_PAGE_SIZE),
+                include_claimed=request.query_params.get('include_claimed') in ('1', 'true'),
+            )
+        except queue.InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': self._serialize(proofs), 'next_cursor': next_cursor})
+
+    @action(detail=False, methods=['post'])
+    def claim(self, request):
+        """Lease the next ``count`` proofs, or the listed ``proof_ids``, to the caller."""
+        proof_ids = request.data.get('proof_ids')
+        if proof_ids is not None and not isinstance(proof_ids, list):
+            return Response({'error': 'proof_ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+        count = _bounded_int(request.data.get('count'), 1, MAX_CLAIM_COUNT)
+        if proof_ids is not None:
+            count = len(proof_ids[:MAX_CLAIM_COUNT])
+            proof_ids = proof_ids[:MAX_CLAIM_COUNT]
+
+        proofs = queue.claim(request.user, count=count, proof_ids=proof_ids)
+        return Response({
+            'claimed': self._serialize(proofs),
+            'lease_seconds': int(queue.lease_duration().total_seconds()),
+        })
+
+    @action(detail=True, methods=['post'])
+    def renew(self, request, pk=None):
+        """Extend the caller's lease on a proof."""
+        if not queue.renew(request.user, pk):
+            return Response({'error': 'Lease lost or proof already decided'}, status=status.HTTP_409_CONFLICT)
+        return Response({'message': 'Lease renewed'})
+
+    @action(detail=True, methods=['post'])
+    def release(self, request, pk=None):
+        """Return a claimed proof to the queue."""
+        if not queue.release(request.user, pk):
+            return Response({'error': 'Proof is not claimed by you'}, status=status.HTTP_409_CONFLICT)
+        return Response({'message': 'Proof released'})
+
+    @action(detail=True, methods=['post'])
+    def decide(self, request, pk=None):
+        """Approve or reject a claimed proof (``decision``: approve | reject)."""
+        decision = request.data.get('decision')
+        if decision not in ['approve', 'reject']:
+            return Response({'error': 'Invalid decision'}, status=status.HTTP_400_BAD_REQUEST)
+
+        proof = queue.decide(request.user, pk, decision, request.data.get('notes', ''))
+        if proof is None:
+            return Response({'error': 'Lease lost or proof already decided'}, status=status.HTTP_409_CONFLICT)
+        return Response({
+            'message': f'Proof {decision}d',
+            'proof': VerificationQueueSerializer(proof, context={'request': request}).data
+        })
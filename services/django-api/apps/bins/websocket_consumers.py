@@ -1,15 +1,73 @@
-import json
 import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from apps.bins.models import PickupRequest
+from apps.framing import CompactFramingMixin
+from apps.send_queue import BoundedSendMixin
+from apps.snapshots import send_initial_snapshot, snapshot_cache
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
 
-class PickupConsumer(AsyncWebsocketConsumer):
+def load_pickup_snapshot(pickup_id):
+    """Pickup status payload for ``PickupConsumer``, or ``None`` if the pickup does not exist"""
+    try:
+        pickup = PickupRequest.objects.select_related(
+            'owner', 'worker', 'bin'
+        ).get(id=pickup_id)
+    except PickupRequest.DoesNotExist:
+        return None
+
+    worker = pickup.worker
+    return {
+        'id': pickup.id,
+        'status': pickup.status,
+        'accepted_at': pickup.accepted_at.isoformat() if pickup.accepted_at else None,
+        'completed_at': pickup.completed_at.isoformat() if pickup.completed_at else None,
+        'customer': {
+            'id': pickup.owner.id,
+            'name': f"{pickup.owner.first_name} {pickup.owner.last_name}",
+        },
+        'worker': {
+            'id': worker.id,
+            'name': f"{worker.first_name} {worker.last_name}",
+            'location': {
+                'lat': float(worker.latitude),
+                'lng': float(worker.longitude)
+            } if worker.latitude and worker.longitude else None
+        } if worker else None,
+        'bin': {
+            'id': pickup.bin.id,
+            'location': {
+                'lat': float(pickup.bin.latitude),
+                'lng': float(pickup.bin.longitude)
+            }
+        }
+    }
+
+
+def load_customer_notifications(customer_id):
+    """Recent pickup notifications for ``CustomerConsumer``"""
+    pickups = PickupRequest.objects.filter(
+        owner_id=customer_id
+    ).select_related('worker', 'bin').order_by('-created_at')[:10]
+
+    return [
+        {
+            'id': pickup.id,
+            'type': 'pickup_update',
+            'status': pickup.status,
+            'message': f"Pickup {pickup.status.replace('_', ' ').title()}",
+            'timestamp': (pickup.completed_at or pickup.accepted_at or pickup.created_at).isoformat(),
+            'worker': f"{pickup.worker.first_name} {pickup.worker.last_name}" if pickup.worker else None
+        }
+        for pickup in pickups
+    ]
+
+
+class PickupConsumer(BoundedSendMixin, CompactFramingMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for real-time pickup status updates.
     Handles pickup progress, worker assignments, and status changes.
@@ -27,13 +85,12 @@ class PickupConsumer(AsyncWebsocketConsumer):
 
         await self.accept()
 
-        # Send initial pickup status
+        # Send initial pickup status, or what changed since the client's last version
         pickup_data = await self.get_pickup_data()
         if pickup_data:
-            await self.send(text_data=json.dumps({
-                'type': 'pickup_status',
-                'data': pickup_data
-            }))
+            await send_initial_snapshot(
+                self, 'pickup_status', 'pickup_status', 'pickup', self.pickup_id, pickup_data
+            )
 
         logger.info(f"WebSocket connected for pickup {self.pickup_id}")
 
@@ -45,120 +102,96 @@ class PickupConsumer(AsyncWebsocketConsumer):
         )
         logger.info(f"WebSocket disconnected for pickup {self.pickup_id}")
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """Handle incoming WebSocket messages"""
         try:
-            text_data_json = json.loads(text_data)
+            text_data_json = self.decode_frame(text_data, bytes_data)
             message_type = text_data_json.get('type')
 
             if message_type == 'get_status':
                 # Send current pickup status
                 pickup_data = await self.get_pickup_data()
                 if pickup_data:
-                    await self.send(text_data=json.dumps({
-                        'type': 'pickup_status',
-                        'data': pickup_data
-                    }))
+                    version = snapshot_cache.record('pickup', self.pickup_id, pickup_data)
+                    await self.send_state(
+                        'pickup_status', 'pickup_status', self.pickup_id, pickup_data, version=version
+                    )
 
             elif message_type == 'update_location' and self.scope['user'].is_authenticated:
                 # Update worker location (if user is worker)
                 location_data = text_data_json.get('data', {})
                 await self.update_worker_location(location_data)
 
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON received: {text_data}")
+        except ValueError:
+            logger.error(f"Invalid frame received: {text_data or bytes_data!r}")
         except Exception as e:
             logger.error(f"Error handling WebSocket message: {e}")
 
     # Receive message from room group
     async def pickup_update(self, event):
         """Send pickup update to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'pickup_update',
-            'data': event['data']
-        }))
+        data = event['data']
+        if data.get('update_type') == 'worker_location_update':
+            await self.send_state('pickup_update', 'location', data.get('worker_id'), data)
+        else:
+            await self.send_state('pickup_update', 'pickup', self.pickup_id, data)
 
     async def worker_location_update(self, event):
         """Send worker location update to WebSocket"""
-        await self.send(text_data=json.dumps({
-            'type': 'worker_location',
-            'data': event['data']
-        }))
+        await self.send_state('worker_location', 'location', event['data'].get('worker_id'), event['data'])
 
     async def pickup_status_change(self, event):
         """Send pickup status change to WebSocket"""
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             'type': 'status_change',
             'data': event['data']
-        }))
+        })
 
-    @database_sync_to_async
-    def get_pickup_data(self):
-        """Get current pickup data from database"""
-        try:
-            pickup = PickupRequest.objects.select_related(
-                'customer', 'worker', 'bin'
-            ).get(id=self.pickup_id)
+    async def get_pickup_data(self):
+        """Current pickup data from the shared snapshot cache, with the worker's live position"""
+        from apps.users.location_store import location_store
 
-            return {
-                'id': pickup.id,
-                'status': pickup.status,
-                'scheduled_time': pickup.scheduled_time.isoformat() if pickup.scheduled_time else None,
-                'completed_time': pickup.completed_time.isoformat() if pickup.completed_time else None,
-                'customer': {
-                    'id': pickup.customer.id,
-                    'name': f"{pickup.customer.first_name} {pickup.customer.last_name}",
-                } if pickup.customer else None,
-                'worker': {
-                    'id': pickup.worker.id,
-                    'name': f"{pickup.worker.user.first_name} {pickup.worker.user.last_name}",
-                    'location': {
-                        'lat': pickup.worker.current_latitude,
-                        'lng': pickup.worker.current_longitude
-                    } if pickup.worker.current_latitude and pickup.worker.current_longitude else None
-                } if pickup.worker else None,
-                'bin': {
-                    'id': pickup.bin.id,
-                    'location': {
-                        'lat': pickup.bin.latitude,
-                        'lng': pickup.bin.longitude
-                    }
-                } if pickup.bin else None
-            }
-        except PickupRequest.DoesNotExist:
-            return None
+        try:
+            pickup_data = await snapshot_cache.load('pickup', self.pickup_id, load_pickup_snapshot)
         except Exception as e:
             logger.error(f"Error getting pickup data: {e}")
             return None
 
+        worker = pickup_data and pickup_data['worker']
+        live_location = location_store.get(worker['id']) if worker else None
+        if live_location:
+            pickup_data = {**pickup_data, 'worker': {**worker, 'location': live_location}}
+        return pickup_data
+
     @database_sync_to_async
     def update_worker_location(self, location_data):
         """Update worker location if user is the assigned worker"""
+        from apps.users.location_store import update_worker_location
+
         try:
-            if not self.scope['user'].is_authenticated:
+            user = self.scope['user']
+            if not user.is_authenticated:
                 return
 
-            pickup = PickupRequest.objects.get(id=self.pickup_id)
-            if pickup.worker and pickup.worker.user_id == self.scope['user'].id:
-                # Update worker location
-                pickup.worker.current_latitude = location_data.get('lat')
-                pickup.worker.current_longitude = location_data.get('lng')
-                pickup.worker.save()
-
-                # Broadcast location update to all pickup consumers
-                return {
-                    'worker_id': pickup.worker.id,
-                    'location': {
-                        'lat': pickup.worker.current_latitude,
-                        'lng': pickup.worker.current_longitude
-                    }
-                }
+            # Assignment is checked once per connection rather than on every ping
+            if not hasattr(self, '_is_assigned_worker'):
+                self._is_assigned_worker = PickupRequest.objects.filter(
+                    id=self.pickup_id, worker_id=user.id
+                ).exists()
+            if not self._is_assigned_worker:
+                return None
+
+            location, _ = update_worker_location(user.id, location_data.get('lat'), location_data.get('lng'))
+            return {
+                'worker_id': user.id,
+                'location': {'lat': location['lat'], 'lng': location['lng']}
+            }
         except Exception as e:
             logger.error(f"Error updating worker location: {e}")
             return None
 
 
-class CustomerConsumer(AsyncWebsocketConsumer):
+class CustomerConsumer(BoundedSendMixin, CompactFramingMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for customer notifications and pickup updates.
     """
@@ -184,61 +217,48 @@ class CustomerConsumer(AsyncWebsocketConsumer):
         )
         logger.info(f"WebSocket disconnected for customer {self.customer_id}")
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """Handle incoming WebSocket messages"""
         try:
-            text_data_json = json.loads(text_data)
+            text_data_json = self.decode_frame(text_data, bytes_data)
             message_type = text_data_json.get('type')
 
             if message_type == 'get_notifications':
                 # Send pending notifications
                 notifications = await self.get_customer_notifications()
-                await self.send(text_data=json.dumps({
+                await self.send_frame({
                     'type': 'notifications',
                     'data': notifications
-                }))
+                })
 
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON received: {text_data}")
+        except ValueError:
+            logger.error(f"Invalid frame received: {text_data or bytes_data!r}")
         except Exception as e:
             logger.error(f"Error handling customer WebSocket message: {e}")
 
     # Receive message from room group
     async def pickup_notification(self, event):
         """Send pickup notification to customer"""
-        await self.send(text_data=json.dumps({
-            'type': 'pickup_notification',
-            'data': event['data']
-        }))
+        data = event['data']
+        if data.get('notification_type') == 'worker_location':
+            await self.send_state('pickup_notification', 'location', data.get('pickup_id'), data)
+        else:
+            await self.send_frame({
+                'type': 'pickup_notification',
+                'data': data
+            })
 
     async def status_update(self, event):
         """Send status update notification to customer"""
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             'type': 'status_update',
             'data': event['data']
-        }))
+        })
 
-    @database_sync_to_async
-    def get_customer_notifications(self):
-        """Get recent notifications for customer"""
+    async def get_customer_notifications(self):
+        """Get recent notifications for customer from the shared snapshot cache"""
         try:
-            # Get customer's recent pickups
-            pickups = PickupRequest.objects.filter(
-                customer_id=self.customer_id
-            ).select_related('worker', 'bin').order_by('-created_at')[:10]
-
-            notifications = []
-            for pickup in pickups:
-                notifications.append({
-                    'id': pickup.id,
-                    'type': 'pickup_update',
-                    'status': pickup.status,
-                    'message': f"Pickup {pickup.status.replace('_', ' ').title()}",
-                    'timestamp': pickup.updated_at.isoformat(),
-                    'worker': f"{pickup.worker.user.first_name} {pickup.worker.user.last_name}" if pickup.worker else None
-                })
-
-            return notifications
+            return await snapshot_cache.load('customer_notifications', self.customer_id, load_customer_notifications)
         except Exception as e:
             logger.error(f"Error getting customer notifications: {e}")
-            return []
\ No newline at end of file
+            return []
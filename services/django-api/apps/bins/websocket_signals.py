@@ -1,19 +1,25 @@
 """
 Real-time WebSocket broadcasting utilities for pickup and worker updates.
+
+Updates are handed to ``apps.broadcaster``, which sends them only after the
+surrounding transaction commits and coalesces repeated updates to the same
+pickup or worker, so saves never wait on the channel layer. The same saves
+invalidate the consumers' connect-time snapshots in ``apps.snapshots``.
 """
-import json
 import logging
-from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
-from django.db.models.signals import post_save, pre_save
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
+from apps.bins.geo import geohash_encode
 from apps.bins.models import PickupRequest
+from apps.broadcaster import broadcaster
+from apps.snapshots import snapshot_cache
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 logger = logging.getLogger(__name__)
-channel_layer = get_channel_layer()
 
 
 def broadcast_pickup_update(pickup_id, update_type, data):
@@ -25,27 +31,19 @@ def broadcast_pickup_update(pickup_id, update_type, data):
         update_type: Type of update ('status_change', 'worker_assigned', etc.)
         data: Update data to broadcast
     """
-    if not channel_layer:
-        logger.warning("Channel layer not configured - WebSocket updates disabled")
-        return
-
-    try:
-        room_group_name = f'pickup_{pickup_id}'
-        async_to_sync(channel_layer.group_send)(
-            room_group_name,
-            {
-                'type': 'pickup_update',
-                'data': {
-                    'update_type': update_type,
-                    'pickup_id': pickup_id,
-                    'timestamp': data.get('timestamp'),
-                    **data
-                }
+    broadcaster.publish_on_commit(
+        f'pickup_{pickup_id}',
+        {
+            'type': 'pickup_update',
+            'data': {
+                'update_type': update_type,
+                'pickup_id': pickup_id,
+                'timestamp': data.get('timestamp'),
+                **data
             }
-        )
-        logger.info(f"Broadcasted pickup update: {update_type} for pickup {pickup_id}")
-    except Exception as e:
-        logger.error(f"Error broadcasting pickup update: {e}")
+        },
+        coalesce_key=update_type
+    )
 
 
 def broadcast_worker_update(worker_id, update_type, data):
@@ -57,27 +55,19 @@ def broadcast_worker_update(worker_id, update_type, data):
         update_type: Type of update ('location_change', 'status_change', etc.)
         data: Update data to broadcast
     """
-    if not channel_layer:
-        logger.warning("Channel layer not configured - WebSocket updates disabled")
-        return
-
-    try:
-        room_group_name = f'worker_{worker_id}'
-        async_to_sync(channel_layer.group_send)(
-            room_group_name,
-            {
-                'type': 'route_update' if update_type == 'location_change' else 'pickup_assignment',
-                'data': {
-                    'update_type': update_type,
-                    'worker_id': worker_id,
-                    'timestamp': data.get('timestamp'),
-                    **data
-                }
+    broadcaster.publish_on_commit(
+        f'worker_{worker_id}',
+        {
+            'type': 'route_update' if update_type == 'location_change' else 'pickup_assignment',
+            'data': {
+                'update_type': update_type,
+                'worker_id': worker_id,
+                'timestamp': data.get('timestamp'),
+                **data
             }
-        )
-        logger.info(f"Broadcasted worker update: {update_type} for worker {worker_id}")
-    except Exception as e:
-        logger.error(f"Error broadcasting worker update: {e}")
+        },
+        coalesce_key=(update_type, data.get('pickup_id'))
+    )
 
 
 def broadcast_customer_notification(customer_id, notification_type, data):
@@ -89,27 +79,57 @@ def broadcast_customer_notification(customer_id, notification_type, data):
         notification_type: Type of notification
         data: Notification data to broadcast
     """
-    if not channel_layer:
-        logger.warning("Channel layer not configured - WebSocket updates disabled")
-        return
-
-    try:
-        room_group_name = f'customer_{customer_id}'
-        async_to_sync(channel_layer.group_send)(
-            room_group_name,
-            {
-                'type': 'pickup_notification',
-                'data': {
-                    'notification_type': notification_type,
-                    'customer_id': customer_id,
-                    'timestamp': data.get('timestamp'),
-                    **data
-                }
+    broadcaster.publish_on_commit(
+        f'customer_{customer_id}',
+        {
+            'type': 'pickup_notification',
+            'data': {
+                'notification_type': notification_type,
+                'customer_id': customer_id,
+                'timestamp': data.get('timestamp'),
+                **data
             }
+        },
+        coalesce_key=(notification_type, data.get('pickup_id'))
+    )
+
+
+def geo_subscription_precisions():
+    """Geohash precisions workers subscribe at and open pickups are published to."""
+    return tuple(getattr(settings, 'GEO_SUBSCRIPTION_PRECISIONS', (4, 5, 6)))
+
+
+def geo_group_name(cell):
+    return f'geo_{cell}'
+
+
+def broadcast_nearby_pickup(pickup):
+    """
+    Publish a newly opened pickup to the geohash cell groups containing its bin.
+
+    Only workers subscribed to those cells receive it, so the cost scales
+    with nearby workers rather than the whole fleet.
+    """
+    bin_obj = pickup.bin
+    latitude, longitude = float(bin_obj.latitude), float(bin_obj.longitude)
+    message = {
+        'type': 'nearby.pickup',
+        'data': {
+            'pickup_id': pickup.id,
+            'lat': latitude,
+            'lng': longitude,
+            'address': bin_obj.address,
+            'waste_type': pickup.waste_type,
+            'expected_fee': float(pickup.expected_fee),
+            'timestamp': timezone.now().isoformat()
+        }
+    }
+    for precision in geo_subscription_precisions():
+        broadcaster.publish_on_commit(
+            geo_group_name(geohash_encode(latitude, longitude, precision)),
+            message,
+            coalesce_key=pickup.id
         )
-        logger.info(f"Broadcasted customer notification: {notification_type} for customer {customer_id}")
-    except Exception as e:
-        logger.error(f"Error broadcasting customer notification: {e}")
 
 
 # Django signals for automatic WebSocket updates
@@ -130,6 +150,14 @@ def pickup_status_changed(sender, instance, created, **kwargs):
             update_type = 'pickup_updated'
             message = f"Pickup information updated"
 
+    timestamp = timezone.now().isoformat()
+
+    # Offer newly opened pickups to workers subscribed nearby
+    if instance.status == PickupRequest.PickupStatus.OPEN and (
+        created or getattr(instance, '_previous_status', None) != instance.status
+    ):
+        broadcast_nearby_pickup(instance)
+
     # Broadcast to pickup consumers
     broadcast_pickup_update(
         pickup_id=instance.id,
@@ -137,23 +165,24 @@ def pickup_status_changed(sender, instance, created, **kwargs):
         data={
             'status': instance.status,
             'message': message,
-            'timestamp': instance.updated_at.isoformat(),
-            'worker_id': instance.worker_id if instance.worker else None,
-            'customer_id': instance.customer_id if instance.customer else None
+            'timestamp': timestamp,
+            'worker_id': instance.worker_id,
+            'customer_id': instance.owner_id
         }
     )
 
-    # Notify customer if applicable
-    if instance.customer_id:
+    # Notify customer (the bin owner)
+    if instance.owner_id:
+        worker = instance.worker if instance.worker_id else None
         broadcast_customer_notification(
-            customer_id=instance.customer_id,
+            customer_id=instance.owner_id,
             notification_type=update_type,
             data={
                 'pickup_id': instance.id,
                 'status': instance.status,
                 'message': message,
-                'timestamp': instance.updated_at.isoformat(),
-                'worker_name': f"{instance.worker.user.first_name} {instance.worker.user.last_name}" if instance.worker else None
+                'timestamp': timestamp,
+                'worker_name': f"{worker.first_name} {worker.last_name}".strip() if worker else None
             }
         )
 
@@ -166,7 +195,7 @@ def pickup_status_changed(sender, instance, created, **kwargs):
                 'pickup_id': instance.id,
                 'status': instance.status,
                 'message': message,
-                'timestamp': instance.updated_at.isoformat()
+                'timestamp': timestamp
             }
         )
 
@@ -175,15 +204,19 @@ def pickup_status_changed(sender, instance, created, **kwargs):
 def track_pickup_status_change(sender, instance, **kwargs):
     """
     Track previous status before save to detect changes.
+
+    Uses the dirty-field snapshot taken when the instance was loaded, so no
+    extra query is needed for the common case.
     """
-    if instance.pk:
-        try:
-            previous = PickupRequest.objects.get(pk=instance.pk)
-            instance._previous_status = previous.status
-        except PickupRequest.DoesNotExist:
-            instance._previous_status = None
-    else:
+    if not instance.pk:
         instance._previous_status = None
+    elif instance.has_snapshot:
+        instance._previous_status = instance.previous('status')
+    else:
+        # Instance was built by hand rather than loaded; fall back to the database
+        instance._previous_status = PickupRequest.objects.filter(
+            pk=instance.pk
+        ).values_list('status', flat=True).first()
 
 
 @receiver(post_save, sender=User)
@@ -209,10 +242,30 @@ def worker_status_changed(sender, instance, created, **kwargs):
         data={
             'is_active': instance.is_available,
             'current_location': {
-                'lat': instance.latitude,
-                'lng': instance.longitude
+                'lat': float(instance.latitude),
+                'lng': float(instance.longitude)
             } if instance.latitude and instance.longitude else None,
             'message': message,
             'timestamp': instance.updated_at.isoformat()
         }
-    )
\ No newline at end of file
+    )
+
+
+@receiver(post_save, sender=PickupRequest, dispatch_uid='snapshots_pickup_saved')
+@receiver(post_delete, sender=PickupRequest, dispatch_uid='snapshots_pickup_deleted')
+def invalidate_pickup_snapshots(sender, instance, **kwargs):
+    """Drop cached consumer snapshots that include this pickup."""
+    snapshot_cache.invalidate('pickup', instance.pk)
+    snapshot_cache.invalidate('customer_notifications', instance.owner_id)
+    # A reassigned pickup changes both workers' active counts
+    for worker_id in {instance.worker_id, instance.previous('worker')}:
+        snapshot_cache.invalidate('worker', worker_id)
+
+
+@receiver(post_save, sender=User, dispatch_uid='snapshots_user_saved')
+def invalidate_worker_snapshot(sender, instance, **kwargs):
+    """
+    Drop the worker's dashboard snapshot. Names embedded in pickup snapshots
+    are left to expire with ``SNAPSHOT_CACHE_TTL``.
+    """
+    snapshot_cache.invalidate('worker', instance.pk)
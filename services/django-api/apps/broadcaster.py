@@ -0,0 +1,176 @@
+"""
+Transaction-aware, coalescing channel-layer broadcaster.
+
+Model signal handlers used to call ``async_to_sync(group_send)`` inline,
+so every save paid channel-layer latency and clients were told about
+changes that were later rolled back. Instead, events are:
+
+1. queued with ``transaction.on_commit``, so nothing is sent for work that
+   does not commit;
+2. held for ``WEBSOCKET_BROADCAST_WINDOW`` seconds, during which a newer
+   event with the same coalescing key replaces the pending one (five quick
+   saves of the same pickup produce one message); and
+3. sent from a background thread, in batches of up to
+   ``WEBSOCKET_BROADCAST_BATCH_SIZE`` concurrent ``group_send`` calls on a
+   long-lived event loop.
+
+Steps 2 and 3 need a channel layer that can be driven from the flusher
+thread's own event loop. ``channels_redis`` keeps a connection pool per
+loop, so it can. ``InMemoryChannelLayer`` queues belong to the consumers'
+loop; a ``group_send`` from another loop can leave a waiting consumer
+asleep. For any layer other than ``channels_redis`` (and with
+``BACKGROUND_JOBS_EAGER``) each event is sent from the on-commit hook with
+``async_to_sync(group_send)``, which runs on the ASGI loop when called from
+a request or ``database_sync_to_async`` thread. Those events are not
+coalesced.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+class Broadcaster:
+    """Buffer channel-layer group messages and flush them in coalesced batches."""
+
+    def __init__(self, window=None, batch_size=None, layer=None, threaded=None):
+        self.window = window if window is not None else getattr(
+            settings, 'WEBSOCKET_BROADCAST_WINDOW', 0.1)
+        self.batch_size = batch_size or getattr(settings, 'WEBSOCKET_BROADCAST_BATCH_SIZE', 100)
+        self._layer = layer
+        self._threaded = threaded
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._unique = itertools.count()
+        self._thread = None
+        self._pid = None
+        self._loop = None
+        self._stats = {'published': 0, 'coalesced': 0, 'sent': 0, 'failed': 0, 'flushes': 0}
+
+    @property
+    def channel_layer(self):
+        return self._layer if self._layer is not None else get_channel_layer()
+
+    @property
+    def threaded(self):
+        """Whether events are buffered and sent from the background flusher thread."""
+        if self._threaded is not None:
+            return self._threaded
+        layer = self.channel_layer
+        return layer is not None and type(layer).__module__.split('.')[0] == 'channels_redis'
+
+    def publish(self, group, message, coalesce_key=None):
+        """
+        Queue ``message`` for ``group`` immediately (outside any transaction hook).
+
+        Messages sharing ``(group, message['type'], coalesce_key)`` replace
+        each other while pending; ``coalesce_key=None`` never coalesces.
+        """
+        if getattr(settings, 'BACKGROUND_JOBS_EAGER', False) or not self.threaded:
+            with self._lock:
+                self._stats['published'] += 1
+            self._send_now([(group, message)])
+            return
+
+        key = (group, message.get('type'), coalesce_key if coalesce_key is not None else next(self._unique))
+        with self._lock:
+            self._stats['published'] += 1
+            if key in self._pending:
+                self._stats['coalesced'] += 1
+            # Keep the original queue position, carry the newest payload
+            self._pending[key] = (group, message)
+        self._ensure_flusher()
+        self._wakeup.set()
+
+    def publish_on_commit(self, group, message, coalesce_key=None):
+        """Queue ``message`` once the current transaction commits (immediately in autocommit)."""
+        transaction.on_commit(lambda: self.publish(group, message, coalesce_key))
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self):
+        """Counters for monitoring endpoints."""
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
+
+    def flush(self):
+        """Send everything pending now. Returns the number of messages sent."""
+        with self._lock:
+            items, self._pending = list(self._pending.values()), OrderedDict()
+        if not items:
+            return 0
+        return self._send_now(items)
+
+    def _send_now(self, items):
+        layer = self.channel_layer
+        if layer is None:
+            logger.warning("Channel layer not configured - WebSocket updates disabled")
+            return 0
+
+        sent = 0
+        for start in range(0, len(items), self.batch_size):
+            batch = items[start:start + self.batch_size]
+            if threading.current_thread() is self._thread:
+                results = self._loop.run_until_complete(self._send_batch(layer, batch))
+            else:
+                results = async_to_sync(self._send_batch)(layer, batch)
+            batch_sent = 0
+            for (group, message), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error broadcasting {message.get('type')} to {group}: {result}")
+                else:
+                    batch_sent += 1
+            sent += batch_sent
+            with self._lock:
+                self._stats['sent'] += batch_sent
+                self._stats['failed'] += len(batch) - batch_sent
+                self._stats['flushes'] += 1
+        return sent
+
+    @staticmethod
+    async def _send_batch(layer, batch):
+        return await asyncio.gather(
+            *(layer.group_send(group, message) for group, message in batch),
+            return_exceptions=True
+        )
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='klynaa-broadcaster', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        # One loop for the thread's lifetime so channel-layer connection pools are reused
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        while True:
+            self._wakeup.wait()
+            # Let further updates arrive and coalesce before sending
+            if self.window:
+                time.sleep(self.window)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Broadcaster flush failed")
+
+
+broadcaster = Broadcaster()
@@ -1,15 +1,21 @@
 import json
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
-from .models import ChatRoom, Message, MessageReadReceipt
-from django.utils import timezone
+from django.db import models
+from .models import ChatRoom, Message
+from . import read_state
+from .history import get_room, serialize_message
+from .presence import TypingThrottle, presence
+from apps.framing import CompactFramingMixin
+from apps.send_queue import BoundedSendMixin
 import uuid
 
 User = get_user_model()
 
 
-class ChatConsumer(AsyncJsonWebsocketConsumer):
+class ChatConsumer(BoundedSendMixin, CompactFramingMixin, AsyncJsonWebsocketConsumer):
     async def connect(self):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
         self.group_name = f"chat_{self.room_id}"
@@ -28,28 +34,54 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
 
+        self.typing = TypingThrottle(self._publish_typing)
+        self.joined = True
+        # Only the user's first connection to the room is a presence change
+        if await sync_to_async(presence.join)(self.room_id, self.scope['user'].id):
+            await self._publish_presence('online')
+
+    async def disconnect(self, code):
+        if not getattr(self, 'joined', False):
+            return
+        self.joined = False
+        await self.typing.close()
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        if await sync_to_async(presence.leave)(self.room_id, self.scope['user'].id):
+            await self._publish_presence('offline')
+
+    async def _publish_presence(self, status):
         await self.channel_layer.group_send(
             self.group_name,
             {
                 'type': 'presence.update',
                 'event': 'presence',
                 'user_id': self.scope['user'].id,
-                'status': 'online'
+                'status': status
             }
         )
 
-    async def disconnect(self, code):
-        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+    async def _publish_typing(self, is_typing):
         await self.channel_layer.group_send(
             self.group_name,
             {
-                'type': 'presence.update',
-                'event': 'presence',
+                'type': 'typing.update',
+                'event': 'typing',
                 'user_id': self.scope['user'].id,
-                'status': 'offline'
+                'is_typing': is_typing
             }
         )
 
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        # Accept msgpack binary frames as well as JSON text frames
+        try:
+            content = self.decode_frame(text_data, bytes_data)
+        except ValueError:
+            return
+        await self.receive_json(content, **kwargs)
+
+    async def send_json(self, content, close=False):
+        await self.send_frame(content, close=close)
+
     async def receive_json(self, content, **kwargs):
         action = content.get('action')
 
@@ -76,27 +108,25 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
 
         elif action == 'read':
             message_ids = content.get('message_ids', [])
-            await self._mark_read(self.scope['user'].id, message_ids)
+            watermark = await self._mark_read(self.scope['user'].id, message_ids)
+            if watermark is None:
+                return
             await self.channel_layer.group_send(
                 self.group_name,
                 {
                     'type': 'message.read',
                     'event': 'read',
                     'message_ids': message_ids,
-                    'user_id': self.scope['user'].id
+                    'user_id': self.scope['user'].id,
+                    # Everything up to and including this message is read
+                    'last_read_message_id': watermark['message_id'],
+                    'last_read_at': watermark['created_at'],
                 }
             )
 
         elif action == 'typing':
-            await self.channel_layer.group_send(
-                self.group_name,
-                {
-                    'type': 'typing.update',
-                    'event': 'typing',
-                    'user_id': self.scope['user'].id,
-                    'is_typing': bool(content.get('is_typing'))
-                }
-            )
+            # Debounced; see apps.chat.presence.TypingThrottle
+            self.typing.update(content.get('is_typing'))
 
     async def message_new(self, event):
         await self.send_json(event)
@@ -105,10 +135,11 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
         await self.send_json(event)
 
     async def typing_update(self, event):
-        await self.send_json(event)
+        # Only the latest typing state per user matters to a lagging client
+        await self.send_frame(event, coalesce_key=('typing', event['user_id']))
 
     async def presence_update(self, event):
-        await self.send_json(event)
+        await self.send_frame(event, coalesce_key=('presence', event['user_id']))
 
     # DB helpers
     @database_sync_to_async
@@ -132,20 +163,11 @@ class ChatConsumer(AsyncJsonWebsocketConsumer):
 
     @database_sync_to_async
     def _serialize_message(self, message_obj):
-        return {
-            'id': str(message_obj.message_id),
-            'content': message_obj.content,
-            'sender_id': message_obj.sender_id,
-            'created_at': message_obj.created_at.isoformat(),
-            'is_read': message_obj.is_read,
-        }
+        return serialize_message(message_obj)
 
     @database_sync_to_async
     def _mark_read(self, user_id, message_ids):
-        qs = Message.objects.filter(message_id__in=message_ids)
-        for msg in qs:
-            if not msg.is_read:  # simple global flag
-                msg.is_read = True
-                msg.read_at = timezone.now()
-                msg.save(update_fields=['is_read', 'read_at'])
-            MessageReadReceipt.objects.get_or_create(message=msg, user_id=user_id)
+        room = get_room(self.room_id)
+        if room is None:
+            return None
+        return read_state.mark_read(room['pk'], user_id, message_ids)
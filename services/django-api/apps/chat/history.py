@@ -0,0 +1,281 @@
+"""
+Chat history paging and the hot-room message cache.
+
+History is read newest first with a keyset cursor on ``(created_at, id)``
+so it walks the ``(chat_room, created_at)`` index; scrolling back costs the
+same at any depth. Each page is returned oldest first, ready to display,
+with a ``next_cursor`` for the page before it.
+
+Opening a room usually needs only the latest page. The last
+``CHAT_RECENT_MESSAGES`` messages of recently active rooms are kept in an
+in-process ring buffer:
+
+* filled from the database the first time a room's latest page is read;
+* appended to when a message is created (by ``ChatConsumer`` or the REST
+  endpoints), updated in place when a message changes (read receipts) and
+  dropped when one is deleted, all from model signals;
+* evicted LRU and after ``CHAT_RECENT_TTL`` seconds.
+
+Each write also bumps a per-room version counter in the Django cache, and
+a buffer is only served while it was built at the current version. A
+message written through another process (or without signals) therefore
+makes the next read here reload the room from the database. With a shared
+cache backend (``CACHE_BACKEND=redis``) this holds across replicas; with
+the default per-process cache only this process's writes are seen, as
+before. A process's own writes move its buffer to the new version in place
+when no other write came in between.
+
+Room lookups for membership checks are cached the same way, against a
+marker replaced on every ``ChatRoom`` save or delete (see
+``apps.users.principal_cache``).
+"""
+import base64
+import json
+import logging
+import random
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.caching import LRUCache
+
+from .models import ChatRoom, Message
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def serialize_message(message):
+    """
+    Wire format shared by the WebSocket consumer and the history endpoint.
+    History responses add ``is_read`` with ``read_state.with_read_state``.
+    """
+    return {
+        'id': str(message.message_id),
+        'content': message.content,
+        'message_type': message.message_type,
+        'image_url': message.image.url if message.image else None,
+        'sender_id': message.sender_id,
+        'client_message_id': message.client_message_id or None,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+def encode_cursor(created_at, pk):
+    position = [created_at if isinstance(created_at, str) else created_at.isoformat(), pk]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(created_at), int(pk)
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+class RecentMessages:
+    """
+    Ring buffer of the latest messages per room, as ``(pk, serialized)``
+    pairs, each tagged with the room version it was built at.
+    """
+
+    def __init__(self, size=None, rooms=None, ttl=None):
+        self.size = size or getattr(settings, 'CHAT_RECENT_MESSAGES', 50)
+        rooms = rooms or getattr(settings, 'CHAT_RECENT_ROOMS', 2000)
+        self.ttl = ttl or getattr(settings, 'CHAT_RECENT_TTL', 300)
+        self._buffers = LRUCache(maxsize=rooms, ttl=self.ttl)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _version_key(room_pk):
+        return f'chat-recent:{room_pk}'
+
+    def _version(self, room_pk):
+        return cache.get(self._version_key(room_pk))
+
+    def _start_version(self, room_pk):
+        # A random start keeps an expired or evicted counter from repeating old versions
+        key = self._version_key(room_pk)
+        cache.add(key, random.getrandbits(62), self.ttl)
+        return key
+
+    def _bump(self, room_pk):
+        """Move the room to a new version and return it, or ``None`` if the counter was lost."""
+        key = self._start_version(room_pk)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            return None
+
+    def latest(self, room_pk, limit):
+        """
+        Return ``(entries, has_more)`` for the newest ``limit`` messages,
+        oldest first, loading the room on a miss or when it changed elsewhere.
+        """
+        limit = min(limit, self.size)
+        version = self._version(room_pk)
+        entry = self._buffers.get(room_pk)
+        if entry is None or version is None or entry[2] != version:
+            if version is None:
+                version = cache.get(self._start_version(room_pk))
+            entry = self._fill(room_pk, version)
+        with self._lock:
+            messages, truncated, _ = entry
+            entries = list(messages)[-limit:]
+            return entries, truncated or len(messages) > limit
+
+    def _fill(self, room_pk, version):
+        rows = list(
+            Message.objects.filter(chat_room_id=room_pk)
+            .order_by('-created_at', '-id')[:self.size + 1]
+        )
+        messages = deque(((m.pk, serialize_message(m)) for m in reversed(rows[:self.size])), maxlen=self.size)
+        entry = (messages, len(rows) > self.size, version)
+        # A write that landed while reading may or may not be in ``rows``
+        if self._version(room_pk) == version:
+            self._buffers.set(room_pk, entry)
+        else:
+            self._buffers.pop(room_pk)
+        return entry
+
+    def _apply(self, room_pk, change):
+        version = self._bump(room_pk)
+        with self._lock:
+            entry = self._buffers.get(room_pk)
+            if entry is None:
+                return
+            messages, truncated, built_at = entry
+            # Only a buffer that already had every earlier write may move forward
+            if version is None or built_at != version - 1:
+                self._buffers.pop(room_pk)
+                return
+            truncated = change(messages) or truncated
+            self._buffers.set(room_pk, (messages, truncated, version))
+
+    def add(self, message):
+        """Append a new message to its room's buffer, if the room is buffered."""
+        def append(messages):
+            truncated = len(messages) == messages.maxlen
+            messages.append((message.pk, serialize_message(message)))
+            return truncated
+        self._apply(message.chat_room_id, append)
+
+    def update(self, message):
+        """Refresh a buffered message after it changed."""
+        def replace(messages):
+            for index, (pk, _) in enumerate(messages):
+                if pk == message.pk:
+                    messages[index] = (pk, serialize_message(message))
+                    break
+        self._apply(message.chat_room_id, replace)
+
+    def discard(self, room_pk):
+        self._bump(room_pk)
+        self._buffers.pop(room_pk)
+
+    def stats(self):
+        """Hit/miss counters for monitoring endpoints."""
+        return self._buffers.stats()
+
+
+recent_messages = RecentMessages()
+
+room_cache = LRUCache(
+    maxsize=getattr(settings, 'CHAT_RECENT_ROOMS', 2000),
+    ttl=getattr(settings, 'CHAT_RECENT_TTL', 300),
+)
+
+
+def _room_marker_key(room_id):
+    return f'chat-room:{room_id}'
+
+
+def get_room(room_id):
+    """
+    Return ``{'pk', 'owner_id', 'worker_id', 'is_active'}`` for the room with
+    UUID ``room_id``, or ``None``.
+    """
+    key = str(room_id)
+    marker = cache.get(_room_marker_key(key))
+    entry = room_cache.get(key)
+    if entry is None or entry[0] != marker:
+        room = ChatRoom.objects.filter(room_id=room_id).values(
+            'pk', 'owner_id', 'worker_id', 'is_active'
+        ).first()
+        if room is None:
+            return None
+        entry = (marker, room)
+        room_cache.set(key, entry)
+    return entry[1]
+
+
+def drop_room(room_id):
+    """Outdate the cached room ``room_id`` in every process, now and when the transaction commits."""
+    def drop():
+        cache.set(_room_marker_key(room_id), uuid.uuid4().hex, room_cache.ttl)
+        room_cache.pop(room_id)
+    drop()
+    transaction.on_commit(drop)
+
+
+def is_participant(room, user_id):
+    return room['is_active'] and user_id in (room['owner_id'], room['worker_id'])
+
+
+def history_page(room_pk, cursor=None, limit=50):
+    """
+    Return ``(entries, next_cursor)`` for one page of a room's history.
+
+    ``entries`` are ``(pk, serialized)`` pairs, oldest first. Without a
+    cursor this is the latest page, served from the ring buffer when
+    ``limit`` fits in it.
+    """
+    if cursor is None and limit <= recent_messages.size:
+        entries, has_more = recent_messages.latest(room_pk, limit)
+    else:
+        queryset = Message.objects.filter(chat_room_id=room_pk)
+        if cursor is not None:
+            created_at, pk = decode_cursor(cursor)
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+        rows = list(queryset.order_by('-created_at', '-id')[:limit + 1])
+        has_more = len(rows) > limit
+        entries = [(m.pk, serialize_message(m)) for m in reversed(rows[:limit])]
+
+    next_cursor = None
+    if has_more and entries:
+        pk, oldest = entries[0]
+        next_cursor = encode_cursor(oldest['created_at'], pk)
+    return entries, next_cursor
+
+
+@receiver(post_save, sender=Message, dispatch_uid='chat_recent_message_saved')
+def cache_saved_message(sender, instance, created, **kwargs):
+    # Buffers only ever show committed messages
+    if created:
+        transaction.on_commit(lambda: recent_messages.add(instance))
+    else:
+        transaction.on_commit(lambda: recent_messages.update(instance))
+
+
+@receiver(post_delete, sender=Message, dispatch_uid='chat_recent_message_deleted')
+def drop_deleted_message(sender, instance, **kwargs):
+    recent_messages.discard(instance.chat_room_id)
+    transaction.on_commit(lambda: recent_messages.discard(instance.chat_room_id))
+
+
+@receiver(post_save, sender=ChatRoom, dispatch_uid='chat_room_cache_saved')
+@receiver(post_delete, sender=ChatRoom, dispatch_uid='chat_room_cache_deleted')
+def drop_cached_room(sender, instance, **kwargs):
+    drop_room(str(instance.room_id))
@@ -0,0 +1,107 @@
+"""
+Chat inbox: a user's active rooms with their last message and unread count.
+
+Everything comes from one query. Each room row carries correlated
+subqueries for its newest message (walking the ``(chat_room, created_at)``
+index backwards, one row per room) and for the number of messages from the
+other participant after the user's read watermark (see
+``apps.chat.read_state``). Participants and the pickup are joined in.
+``total_unread`` sums the same unread counts over all of the user's rooms
+in one aggregate, so it is not limited to the rooms on the page.
+"""
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import (
+    BigIntegerField, Count, DateTimeField, F, IntegerField, OuterRef, Q, Subquery, Sum, Value,
+)
+from django.db.models.functions import Coalesce, Substr
+
+from .models import ChatReadWatermark, ChatRoom, Message
+
+PREVIEW_LENGTH = 120
+
+# Position before any message, for rooms the user has never read
+_NEVER_READ = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _rooms_with_unread(user_id):
+    """Active rooms of ``user_id`` (as owner or worker) annotated with ``unread_count``."""
+    watermark = ChatReadWatermark.objects.filter(chat_room=OuterRef('pk'), user_id=user_id)
+    unread = (
+        Message.objects.filter(chat_room=OuterRef('pk'))
+        .exclude(sender_id=user_id)
+        .filter(
+            Q(created_at__gt=OuterRef('read_at'))
+            | Q(created_at=OuterRef('read_at'), id__gt=OuterRef('read_id'))
+        )
+        .order_by()
+        .values('chat_room')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    return (
+        ChatRoom.objects.filter(is_active=True)
+        .filter(Q(owner_id=user_id) | Q(worker_id=user_id))
+        .annotate(
+            read_at=Coalesce(
+                Subquery(watermark.values('last_read_at')[:1]),
+                Value(_NEVER_READ, output_field=DateTimeField()),
+            ),
+            read_id=Coalesce(
+                Subquery(watermark.values('last_read_id')[:1]),
+                Value(0, output_field=BigIntegerField()),
+            ),
+            unread_count=Coalesce(Subquery(unread, output_field=IntegerField()), 0),
+        )
+    )
+
+
+def inbox_rooms(user_id, limit=50):
+    """Active rooms of ``user_id`` (as owner or worker), most recent activity first."""
+    newest = Message.objects.filter(chat_room=OuterRef('pk')).order_by('-created_at', '-id')
+    return (
+        _rooms_with_unread(user_id)
+        .select_related('owner', 'worker', 'pickup_request')
+        .annotate(
+            last_message_pk=Subquery(newest.values('pk')[:1]),
+            last_message_id=Subquery(newest.values('message_id')[:1]),
+            last_message_at=Subquery(newest.values('created_at')[:1]),
+            last_message_sender_id=Subquery(newest.values('sender_id')[:1]),
+            last_message_type=Subquery(newest.values('message_type')[:1]),
+            last_message_preview=Subquery(newest.annotate(
+                preview=Substr('content', 1, PREVIEW_LENGTH)).values('preview')[:1]),
+        )
+        .order_by(F('last_message_at').desc(nulls_last=True), '-created_at')[:limit]
+    )
+
+
+def total_unread(user_id):
+    """Unread messages across all active rooms of ``user_id``, not just one inbox page."""
+    return _rooms_with_unread(user_id).aggregate(total=Coalesce(Sum('unread_count'), 0))['total']
+
+
+def serialize_inbox_room(room, user_id):
+    counterpart = room.worker if room.owner_id == user_id else room.owner
+    last_message = None
+    if room.last_message_pk is not None:
+        last_message = {
+            'id': str(room.last_message_id),
+            'preview': room.last_message_preview,
+            'message_type': room.last_message_type,
+            'sender_id': room.last_message_sender_id,
+            'created_at': room.last_message_at.isoformat(),
+        }
+    return {
+        'room_id': str(room.room_id),
+        'role': 'owner' if room.owner_id == user_id else 'worker',
+        'counterpart': {
+            'id': counterpart.id,
+            'name': counterpart.get_full_name() or counterpart.username,
+        },
+        'pickup': {
+            'id': room.pickup_request_id,
+            'status': room.pickup_request.status,
+        },
+        'last_message': last_message,
+        'unread_count': room.unread_count,
+    }
@@ -3,6 +3,8 @@ from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import AccessToken
 from channels.auth import AuthMiddlewareStack
 from channels.db import database_sync_to_async
+from apps.framing import SUBPROTOCOL_PREFIX
+from apps.users.principal_cache import principal_cache
 
 User = get_user_model()
 
@@ -23,8 +25,10 @@ class JWTAuthMiddleware:
             # Try headers
             for header_name, header_value in scope.get('headers', []):
                 if header_name == b'sec-websocket-protocol':
-                    # Some clients might send token as subprotocol
-                    token = header_value.decode()
+                    # Some clients might send token as subprotocol, next to
+                    # framing subprotocols such as klynaa.msgpack.v1
+                    offered = [p.strip() for p in header_value.decode().split(',')]
+                    token = next((p for p in offered if p and not p.startswith(SUBPROTOCOL_PREFIX)), None)
         scope['user'] = await self._get_user(token)
         return await self.inner(scope, receive, send)
 
@@ -35,8 +39,10 @@ class JWTAuthMiddleware:
             return AnonymousUser()
         try:
             access = AccessToken(token)
-            user_id = access.get('user_id')
-            return User.objects.get(id=user_id)
+            user = principal_cache.get_user(access.get('user_id'), access.get('jti'))
+            if user is None or not user.is_active:
+                raise User.DoesNotExist
+            return user
         except Exception:
             from django.contrib.auth.models import AnonymousUser
             return AnonymousUser()
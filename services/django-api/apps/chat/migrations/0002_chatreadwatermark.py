@@ -0,0 +1,58 @@
+# Generated by Django 4.2.24 on 2026-10-19 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_watermarks(apps, schema_editor):
+    """Seed each participant's watermark from the newest message they have a receipt for."""
+    MessageReadReceipt = apps.get_model('chat', 'MessageReadReceipt')
+    ChatReadWatermark = apps.get_model('chat', 'ChatReadWatermark')
+
+    watermarks = {}
+    receipts = MessageReadReceipt.objects.values_list(
+        'message__chat_room_id', 'user_id', 'message__created_at', 'message_id'
+    ).iterator(chunk_size=2000)
+    for room_id, user_id, created_at, message_id in receipts:
+        current = watermarks.get((room_id, user_id))
+        if current is None or (created_at, message_id) > current:
+            watermarks[(room_id, user_id)] = (created_at, message_id)
+
+    ChatReadWatermark.objects.bulk_create(
+        [
+            ChatReadWatermark(chat_room_id=room_id, user_id=user_id, last_read_at=created_at, last_read_id=message_id)
+            for (room_id, user_id), (created_at, message_id) in watermarks.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatReadWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_read_at', models.DateTimeField()),
+                ('last_read_id', models.BigIntegerField(help_text='Message primary key')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('chat_room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_watermarks', to='chat.chatroom')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_read_watermarks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'updated_at'], name='chat_watermark_user_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='chatreadwatermark',
+            constraint=models.UniqueConstraint(fields=('chat_room', 'user'), name='unique_read_watermark_per_room'),
+        ),
+        migrations.RunPython(backfill_watermarks, migrations.RunPython.noop),
+    ]
@@ -133,4 +133,31 @@ class MessageReadReceipt(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.user.username} read {self.message.message_id}"
\ No newline at end of file
+        return f"{self.user.username} read {self.message.message_id}"
+
+
+class ChatReadWatermark(models.Model):
+    """
+    How far a participant has read a chat room: every message up to
+    ``(last_read_at, last_read_id)`` counts as read by ``user``.
+    """
+
+    chat_room = models.ForeignKey(ChatRoom, on_delete=models.CASCADE, related_name='read_watermarks')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_read_watermarks')
+
+    # Position of the newest message read, in history order
+    last_read_at = models.DateTimeField()
+    last_read_id = models.BigIntegerField(help_text="Message primary key")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['chat_room', 'user'], name='unique_read_watermark_per_room'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'updated_at'], name='chat_watermark_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} read room {self.chat_room_id} up to {self.last_read_id}"
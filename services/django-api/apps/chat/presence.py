@@ -0,0 +1,194 @@
+"""
+Presence registry and typing throttle for ``ChatConsumer``.
+
+Every connect and disconnect used to broadcast a presence event, and every
+``typing`` action from the client (a keyboard sends several per second) was
+forwarded to the room group as is.
+
+* ``PresenceRegistry`` counts open connections per ``(room, user)`` with
+  atomic ``incr``/``decr`` on a counter in the Django cache. Only a user's
+  first connection to a room announces ``online`` and only the last one to
+  close announces ``offline``; extra tabs, devices and quick reconnects
+  broadcast nothing.
+* ``TypingThrottle`` sits on each connection and only publishes changes of
+  the typing state, at most one per ``CHAT_TYPING_INTERVAL`` seconds (the
+  latest requested state wins). Without a fresh ``typing`` action it
+  publishes "stopped" after ``CHAT_TYPING_TIMEOUT`` seconds, and on
+  disconnect, so a dropped client never appears to type forever.
+
+The counters are only shared between processes when the cache is
+(``CACHE_BACKEND=redis``). With the default per-process cache, each replica
+counts only its own connections, so a user connected to two replicas goes
+``offline`` when either connection closes. Run chat replicas with a shared
+cache. Counters left by a process that died without closing its sockets
+expire ``CHAT_PRESENCE_TTL`` seconds after the last join or leave of that
+user in that room.
+"""
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceRegistry:
+    """
+    Open chat connections per room and user, counted in the Django cache.
+    This process's own connections are also tracked, for ``online`` and
+    ``stats`` and so that a connection never leaves twice.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl or getattr(settings, 'CHAT_PRESENCE_TTL', 86400)
+        self._rooms = defaultdict(dict)
+        self._lock = threading.Lock()
+        self.transitions = 0
+        self.suppressed = 0
+
+    @staticmethod
+    def _key(room_id, user_id):
+        return f'chat-presence:{room_id}:{user_id}'
+
+    def join(self, room_id, user_id):
+        """Register a connection. Returns ``True`` if the user just came online in the room."""
+        key = self._key(room_id, user_id)
+        cache.add(key, 0, self.ttl)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            # Expired between the two calls
+            cache.add(key, 1, self.ttl)
+            count = 1
+        cache.touch(key, self.ttl)
+
+        with self._lock:
+            members = self._rooms[str(room_id)]
+            members[user_id] = members.get(user_id, 0) + 1
+            return self._transition(count == 1)
+
+    def leave(self, room_id, user_id):
+        """Unregister a connection. Returns ``True`` if the user just went offline in the room."""
+        with self._lock:
+            key = str(room_id)
+            members = self._rooms.get(key)
+            if not members or user_id not in members:
+                return False
+            members[user_id] -= 1
+            if members[user_id] == 0:
+                del members[user_id]
+            if not members:
+                del self._rooms[key]
+
+        key = self._key(room_id, user_id)
+        try:
+            count = cache.decr(key)
+        except ValueError:
+            # The counter expired; this was the last connection anyone knew of
+            count = 0
+        if count > 0:
+            cache.touch(key, self.ttl)
+        else:
+            cache.delete(key)
+        with self._lock:
+            return self._transition(count == 0)
+
+    def _transition(self, changed):
+        if changed:
+            self.transitions += 1
+        else:
+            self.suppressed += 1
+        return changed
+
+    def online(self, room_id):
+        """User IDs with at least one open connection to the room in this process."""
+        with self._lock:
+            return list(self._rooms.get(str(room_id), ()))
+
+    def stats(self):
+        """Counters for monitoring endpoints."""
+        with self._lock:
+            return {
+                'rooms': len(self._rooms),
+                'members': sum(len(members) for members in self._rooms.values()),
+                'transitions': self.transitions,
+                'suppressed': self.suppressed,
+                'typing_published': TypingThrottle.published,
+                'typing_suppressed': TypingThrottle.suppressed,
+            }
+
+
+presence = PresenceRegistry()
+
+
+class TypingThrottle:
+    """
+    Debounces one connection's typing actions. ``publish(is_typing)`` is
+    awaited for every state change that gets through.
+    """
+
+    published = 0
+    suppressed = 0
+
+    def __init__(self, publish, interval=None, timeout=None):
+        self.publish = publish
+        self.interval = interval if interval is not None else getattr(settings, 'CHAT_TYPING_INTERVAL', 2.0)
+        self.timeout = timeout if timeout is not None else getattr(settings, 'CHAT_TYPING_TIMEOUT', 6.0)
+        self.state = False
+        self.desired = False
+        self.changed_at = float('-inf')
+        self._pending = None
+        self._expiry = None
+
+    def update(self, is_typing):
+        """Record the client's latest typing state."""
+        loop = asyncio.get_running_loop()
+        self.desired = bool(is_typing)
+        if self._expiry is not None:
+            self._expiry.cancel()
+            self._expiry = None
+        if self.desired:
+            self._expiry = loop.call_later(self.timeout, self.update, False)
+
+        if self._pending is not None or self.desired == self.state:
+            TypingThrottle.suppressed += 1
+            return
+        self._schedule()
+
+    def _schedule(self):
+        delay = self.changed_at + self.interval - asyncio.get_running_loop().time()
+        if delay > 0:
+            self._pending = asyncio.get_running_loop().call_later(delay, self._flush_soon)
+        else:
+            self._flush_soon()
+
+    def _flush_soon(self):
+        self._pending = asyncio.ensure_future(self._flush())
+
+    async def _flush(self):
+        try:
+            if self.desired != self.state:
+                self.state = self.desired
+                self.changed_at = asyncio.get_running_loop().time()
+                TypingThrottle.published += 1
+                await self.publish(self.state)
+        except Exception as e:
+            logger.error(f"Failed to publish typing state: {e}")
+        finally:
+            self._pending = None
+        # The client changed its mind while this change was being published
+        if self.desired != self.state:
+            self._schedule()
+
+    async def close(self):
+        """Stop timers and publish "stopped" if the user was shown as typing."""
+        for handle in (self._pending, self._expiry):
+            if handle is not None:
+                handle.cancel()
+        self._pending = self._expiry = None
+        if self.state:
+            self.state = self.desired = False
+            await self.publish(False)
@@ -0,0 +1,131 @@
+"""
+Per-participant read watermarks for chat rooms.
+
+Marking messages read used to save every message and create a
+``MessageReadReceipt`` per message, three queries each. Read state is now
+one row per ``(room, user)``: the position ``(created_at, id)`` of the
+newest message the user has read, in history order.
+
+* ``mark_read`` resolves the client's message IDs with one query and moves
+  the watermark forward with a single ``INSERT ... ON CONFLICT DO UPDATE``
+  that only ever advances it, so out-of-order or concurrent acks from
+  several devices cannot move it back.
+* A message is read by its recipient when it sits at or before the
+  recipient's watermark; unread counts are the messages after it. The
+  ``Message.is_read`` column is no longer written, so responses derive
+  ``is_read`` with ``with_read_state``/``message_is_read`` instead.
+* ``MessageReadReceipt`` rows are kept only as an audit trail, written in
+  one bulk insert when ``CHAT_READ_RECEIPT_AUDIT`` is enabled.
+"""
+import logging
+import uuid
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ChatReadWatermark, Message, MessageReadReceipt
+
+logger = logging.getLogger(__name__)
+
+
+def _upsert_sql():
+    table = connection.ops.quote_name(ChatReadWatermark._meta.db_table)
+    return (
+        f"INSERT INTO {table} (chat_room_id, user_id, last_read_at, last_read_id, updated_at) "
+        f"VALUES (%s, %s, %s, %s, %s) "
+        f"ON CONFLICT (chat_room_id, user_id) DO UPDATE SET "
+        f"last_read_at = excluded.last_read_at, last_read_id = excluded.last_read_id, "
+        f"updated_at = excluded.updated_at "
+        f"WHERE ({table}.last_read_at, {table}.last_read_id) < (excluded.last_read_at, excluded.last_read_id)"
+    )
+
+
+def _message_uuids(message_ids):
+    uuids = []
+    for message_id in message_ids:
+        try:
+            uuids.append(uuid.UUID(str(message_id)))
+        except ValueError:
+            continue
+    return uuids
+
+
+def mark_read(room_pk, user_id, message_ids):
+    """
+    Advance ``user_id``'s watermark in the room to the newest of
+    ``message_ids``. Returns the message the watermark now points at as
+    ``{'message_id', 'created_at', 'pk'}``, or ``None`` if it did not move
+    (unknown IDs, or all of them already read).
+    """
+    # Only the other participant's messages can be read by this user
+    read = list(
+        Message.objects.filter(chat_room_id=room_pk, message_id__in=_message_uuids(message_ids))
+        .exclude(sender_id=user_id)
+        .values_list('pk', 'message_id', 'created_at')
+    )
+    if not read:
+        return None
+    pk, message_id, created_at = max(read, key=lambda row: (row[2], row[0]))
+
+    adapt = connection.ops.adapt_datetimefield_value
+    with connection.cursor() as cursor:
+        cursor.execute(_upsert_sql(), [room_pk, user_id, adapt(created_at), pk, adapt(timezone.now())])
+        advanced = cursor.rowcount > 0
+
+    if getattr(settings, 'CHAT_READ_RECEIPT_AUDIT', False):
+        MessageReadReceipt.objects.bulk_create(
+            [MessageReadReceipt(message_id=row[0], user_id=user_id) for row in read],
+            ignore_conflicts=True,
+        )
+    if not advanced:
+        return None
+    return {'message_id': str(message_id), 'created_at': created_at.isoformat(), 'pk': pk}
+
+
+def room_watermarks(room_pk):
+    """``{user_id: (last_read_at, last_read_id)}`` for everyone who has read the room."""
+    return {
+        user_id: (last_read_at, last_read_id)
+        for user_id, last_read_at, last_read_id in ChatReadWatermark.objects.filter(
+            chat_room_id=room_pk
+        ).values_list('user_id', 'last_read_at', 'last_read_id')
+    }
+
+
+def after(position):
+    """Filter for messages after watermark ``position`` in history order."""
+    last_read_at, last_read_id = position
+    return Q(created_at__gt=last_read_at) | Q(created_at=last_read_at, id__gt=last_read_id)
+
+
+def unread_count(room_pk, user_id):
+    """Messages from the other participant that ``user_id`` has not read yet."""
+    queryset = Message.objects.filter(chat_room_id=room_pk).exclude(sender_id=user_id)
+    position = room_watermarks(room_pk).get(user_id)
+    if position is not None:
+        queryset = queryset.filter(after(position))
+    return queryset.count()
+
+
+def message_is_read(room, watermarks, sender_id, created_at, pk):
+    """Whether the recipient of a message in ``room`` has read it, given ``room_watermarks``."""
+    recipients = [user_id for user_id in (room['owner_id'], room['worker_id']) if user_id != sender_id]
+    position = watermarks.get(recipients[0]) if recipients else None
+    return position is not None and (created_at, pk) <= position
+
+
+def with_read_state(entries, room, watermarks):
+    """
+    Return history ``(pk, message)`` entries with ``is_read`` derived from
+    the recipient's watermark. Entries are copied, never mutated, since
+    they may be shared with the recent-messages buffer.
+    """
+    return [
+        (pk, dict(message, is_read=message_is_read(
+            room, watermarks, message['sender_id'], datetime.fromisoformat(message['created_at']), pk
+        )))
+        for pk, message in entries
+    ]
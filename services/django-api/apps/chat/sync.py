@@ -0,0 +1,193 @@
+"""
+Batch sync for chat clients coming back online.
+
+A reconnecting client used to refetch each room's whole history and then
+send its queued messages one by one over the socket. ``sync_rooms`` does
+both in one request:
+
+* queued outgoing messages are written per room with one
+  ``bulk_create(ignore_conflicts=True)``. ``unique_client_message_per_room``
+  turns a retried send (the client never saw the previous response) into a
+  no-op, and every queued message is acknowledged with its server ID either
+  way;
+* for each room the client passes the cursor of the newest message it has,
+  and gets back only the messages after it, oldest first, with the cursor
+  to send next time. A room without a cursor gets its latest page.
+
+``created_at`` is set when a message is saved, not when it commits, so a
+message can become visible after the sync that read past its position. So
+deltas also re-send the messages from the ``CHAT_SYNC_SAFETY_WINDOW``
+seconds before the cursor. Clients de-duplicate by ``id``. Re-sent messages
+never move the cursor, so paging always makes progress.
+
+A queued message is acknowledged only if its sender sent it. A
+``client_message_id`` already used by the other participant in the room is
+returned in ``rejected``, and the client should send it again under a new
+ID.
+
+``bulk_create`` sends no ``post_save`` signals, so the room's recent
+messages buffer is dropped and the new messages are broadcast to the room
+group here, after commit.
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+
+from apps.broadcaster import broadcaster
+
+from . import history, read_state
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+SYNC_MESSAGE_TYPES = {Message.MessageType.TEXT, Message.MessageType.QUICK_REPLY}
+
+
+class SyncError(ValueError):
+    pass
+
+
+def _outgoing_messages(room_pk, user_id, outgoing):
+    max_outgoing = getattr(settings, 'CHAT_SYNC_MAX_OUTGOING', 100)
+    if len(outgoing) > max_outgoing:
+        raise SyncError(f'At most {max_outgoing} queued messages per room')
+
+    messages = {}
+    for item in outgoing:
+        if not isinstance(item, dict):
+            raise SyncError('Each queued message must be an object')
+        client_id = str(item.get('client_message_id') or '').strip()
+        content = str(item.get('content') or '').strip()
+        message_type = item.get('message_type') or Message.MessageType.TEXT
+        if not client_id or len(client_id) > 100:
+            raise SyncError('Every queued message needs a client_message_id of up to 100 characters')
+        if not content:
+            raise SyncError(f'Queued message {client_id} has no content')
+        if message_type not in SYNC_MESSAGE_TYPES:
+            raise SyncError(f'Queued message {client_id} has unsupported type {message_type}')
+        messages[client_id] = Message(
+            chat_room_id=room_pk,
+            sender_id=user_id,
+            content=content,
+            message_type=message_type,
+            client_message_id=client_id,
+        )
+    return messages
+
+
+def _store_outgoing(room, room_id, user_id, outgoing):
+    """
+    Insert queued messages. Returns ``({client_message_id: message}, rejected)``
+    where ``rejected`` lists the IDs the other participant already used.
+    """
+    messages = _outgoing_messages(room['pk'], user_id, outgoing)
+    if not messages:
+        return {}, []
+
+    # Scoped to the sender: another participant's message is never acked as ours
+    mine = Message.objects.filter(chat_room_id=room['pk'], sender_id=user_id, client_message_id__in=messages)
+    existing = set(mine.values_list('client_message_id', flat=True))
+    Message.objects.bulk_create(
+        [message for client_id, message in messages.items() if client_id not in existing],
+        ignore_conflicts=True,
+    )
+    stored = {message.client_message_id: message for message in mine.all()}
+    rejected = [client_id for client_id in messages if client_id not in stored]
+
+    created = sorted(
+        (message for client_id, message in stored.items() if client_id not in existing),
+        key=lambda message: (message.created_at, message.pk),
+    )
+    if created:
+        transaction.on_commit(lambda: history.recent_messages.discard(room['pk']))
+        for message in created:
+            broadcaster.publish_on_commit(f'chat_{room_id}', {
+                'type': 'message.new',
+                'event': 'message',
+                'message': history.serialize_message(message),
+            })
+    return stored, rejected
+
+
+def _deltas(room_pk, since, limit):
+    """
+    Messages after cursor ``since`` plus the safety window before it, oldest
+    first, as ``(entries, has_more, cursor)``.
+    """
+    if since is None:
+        entries, _ = history.history_page(room_pk, limit=limit)
+        cursor = history.encode_cursor(entries[-1][1]['created_at'], entries[-1][0]) if entries else None
+        return entries, False, cursor
+
+    created_at, pk = history.decode_cursor(since)
+    position = read_state.after((created_at, pk))
+    messages = Message.objects.filter(chat_room_id=room_pk).order_by('created_at', 'id')
+    window = timedelta(seconds=getattr(settings, 'CHAT_SYNC_SAFETY_WINDOW', 5.0))
+    resent = list(messages.filter(created_at__gt=created_at - window).exclude(position)[:limit])
+    rows = list(messages.filter(position)[:limit + 1])
+
+    cursor = since
+    if rows[:limit]:
+        newest = rows[:limit][-1]
+        cursor = history.encode_cursor(newest.created_at, newest.pk)
+    entries = [(m.pk, history.serialize_message(m)) for m in resent + rows[:limit]]
+    return entries, len(rows) > limit, cursor
+
+
+def sync_rooms(user_id, rooms):
+    """
+    Store queued messages and collect deltas for ``rooms``, a list of
+    ``{'room_id', 'since', 'outgoing'}``. Returns one result per room.
+    Raises ``SyncError`` for malformed input and ``history.InvalidCursor``
+    for a bad ``since``.
+    """
+    max_rooms = getattr(settings, 'CHAT_SYNC_MAX_ROOMS', 50)
+    limit = getattr(settings, 'CHAT_SYNC_PAGE_SIZE', 100)
+    if not isinstance(rooms, list) or len(rooms) > max_rooms:
+        raise SyncError(f'rooms must be a list of at most {max_rooms} entries')
+
+    results = []
+    with transaction.atomic():
+        for item in rooms:
+            if not isinstance(item, dict):
+                raise SyncError('Each room must be an object')
+            room_id = str(item.get('room_id') or '')
+            try:
+                room_id = str(uuid.UUID(room_id))
+                room = history.get_room(room_id)
+            except ValueError:
+                room = None
+            if room is None or not history.is_participant(room, user_id):
+                results.append({'room_id': room_id, 'error': 'Chat room not found'})
+                continue
+
+            outgoing = item.get('outgoing') or []
+            since = item.get('since') or None
+            if not isinstance(outgoing, list):
+                raise SyncError('outgoing must be a list')
+            if since is not None and not isinstance(since, str):
+                raise SyncError('since must be a cursor string')
+            stored, rejected = _store_outgoing(room, room_id, user_id, outgoing)
+
+            entries, has_more, cursor = _deltas(room['pk'], since, limit)
+            entries = read_state.with_read_state(entries, room, read_state.room_watermarks(room['pk']))
+
+            results.append({
+                'room_id': room_id,
+                'messages': [message for _, message in entries],
+                'has_more': has_more,
+                'cursor': cursor,
+                'acked': [
+                    {
+                        'client_message_id': client_id,
+                        'id': str(message.message_id),
+                        'created_at': message.created_at.isoformat(),
+                    }
+                    for client_id, message in stored.items()
+                ],
+                'rejected': rejected,
+            })
+    return results
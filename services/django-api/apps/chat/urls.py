@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import ChatHistoryView, ChatInboxView, ChatSyncView
+
+urlpatterns = [
+    path('inbox/', ChatInboxView.as_view(), name='chat-inbox'),
+    path('rooms/<uuid:room_id>/messages/', ChatHistoryView.as_view(), name='chat-history'),
+    path('sync/', ChatSyncView.as_view(), name='chat-sync'),
+]
@@ -0,0 +1,96 @@
+"""Chat REST endpoints."""
+
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import history, read_state
+from .inbox import inbox_rooms, serialize_inbox_room, total_unread
+from .sync import SyncError, sync_rooms
+
+MAX_PAGE_SIZE = 200
+
+
+def _bounded_int(value, default, maximum):
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        return default
+
+
+class ChatHistoryView(APIView):
+    """
+    GET /api/chat/rooms/{room_id}/messages/?cursor=&limit=
+
+    Latest messages of a room, oldest first. ``next_cursor`` fetches the
+    page of older messages before them.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, room_id):
+        room = history.get_room(room_id)
+        if room is None or not history.is_participant(room, request.user.id):
+            return Response({'error': 'Chat room not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            entries, next_cursor = history.history_page(
+                room['pk'],
+                cursor=request.query_params.get('cursor'),
+                limit=_bounded_int(request.query_params.get('limit'), 50, MAX_PAGE_SIZE),
+            )
+        except history.InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'room_id': str(room_id),
+            'results': [
+                message for _, message in read_state.with_read_state(
+                    entries, room, read_state.room_watermarks(room['pk'])
+                )
+            ],
+            'next_cursor': next_cursor,
+        })
+
+
+class ChatSyncView(APIView):
+    """
+    POST /api/chat/sync/
+
+    Body: ``{"rooms": [{"room_id", "since", "outgoing": [{"client_message_id",
+    "content", "message_type"}]}]}``. Stores the queued messages and returns,
+    per room, the messages after ``since`` (plus a few just before it that
+    may have committed late; de-duplicate by ``id``), the cursor to sync
+    from next time, the server IDs of the queued messages and the
+    ``rejected`` IDs another participant already used.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        try:
+            rooms = sync_rooms(request.user.id, request.data.get('rooms', []))
+        except (SyncError, history.InvalidCursor) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'rooms': rooms})
+
+
+class ChatInboxView(APIView):
+    """
+    GET /api/chat/inbox/?limit=
+
+    The user's active rooms, as owner or worker, most recent activity
+    first, each with a last message preview and unread count.
+    ``total_unread`` counts every active room, not only the listed ones.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        user_id = request.user.id
+        rooms = [
+            serialize_inbox_room(room, user_id)
+            for room in inbox_rooms(user_id, limit=_bounded_int(request.query_params.get('limit'), 50, MAX_PAGE_SIZE))
+        ]
+        return Response({
+            'results': rooms,
+            'total_unread': total_unread(user_id),
+        })
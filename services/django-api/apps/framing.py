@@ -0,0 +1,200 @@
+"""
+Negotiated compact framing for WebSocket consumers.
+
+Clients that offer the ``klynaa.msgpack.v1`` subprotocol get binary
+msgpack frames; everyone else keeps receiving JSON text frames exactly as
+before. Both directions use the same encoding, so a msgpack client also
+sends msgpack.
+
+On top of either encoding, frequently repeated state (a pickup's status
+payload, a worker's position) can be sent as a delta. Each state stream is
+versioned per connection; once the client acknowledges a version with
+``{"type": "ack", "stream": ..., "key": ..., "v": n}`` later frames carry
+only the fields that changed since ``n``::
+
+    {"type": "pickup_status", "stream": "pickup", "key": "42", "v": 7,
+     "base": 5, "delta": {"set": {"status": "in_progress"}, "unset": []}}
+
+Clients that never acknowledge always receive the full ``data`` payload,
+so existing JSON clients are unaffected.
+
+Initial snapshots also carry a ``version`` (see ``apps.snapshots``). A
+client reconnecting with ``?since=<version>`` gets ``"unchanged": true`` or
+a ``delta`` against that version instead of the full payload.
+"""
+import datetime
+import decimal
+import json
+import logging
+import uuid
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack ships with channels_redis
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+SUBPROTOCOL_MSGPACK = 'klynaa.msgpack.v1'
+SUBPROTOCOL_PREFIX = 'klynaa.'
+
+# Sent-but-unacknowledged versions kept per stream to diff against
+MAX_UNACKED_VERSIONS = 8
+
+
+def _msgpack_default(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def offered_subprotocols(scope):
+    """Subprotocols the client offered in its handshake."""
+    return list(scope.get('subprotocols') or [])
+
+
+def diff_state(base, state):
+    """Shallow delta turning ``base`` into ``state``."""
+    return {
+        'set': {key: value for key, value in state.items() if key not in base or base[key] != value},
+        'unset': [key for key in base if key not in state],
+    }
+
+
+class _StateStream:
+    __slots__ = ('version', 'acked', 'sent')
+
+    def __init__(self):
+        self.version = 0
+        self.acked = None
+        self.sent = {}
+
+
+class CompactFramingMixin:
+    """
+    Mixin for ``AsyncWebsocketConsumer`` subclasses adding msgpack/JSON
+    framing and per-connection delta encoding.
+
+    Consumers send with ``send_frame``/``send_state`` and read inbound frames
+    with ``decode_frame``; ``accept()`` negotiates the subprotocol.
+    """
+
+    compact = False
+
+    async def accept(self, subprotocol=None, headers=None):
+        if subprotocol is None and msgpack is not None and SUBPROTOCOL_MSGPACK in offered_subprotocols(self.scope):
+            subprotocol = SUBPROTOCOL_MSGPACK
+        self.compact = subprotocol == SUBPROTOCOL_MSGPACK
+        await super().accept(subprotocol=subprotocol, headers=headers)
+
+    def encode_frame(self, payload):
+        """Return ``(text_data, bytes_data)`` for ``payload`` in the negotiated encoding."""
+        if self.compact:
+            return None, msgpack.packb(payload, use_bin_type=True, default=_msgpack_default)
+        return json.dumps(payload, cls=DjangoJSONEncoder), None
+
+    def decode_frame(self, text_data=None, bytes_data=None):
+        """
+        Decode an inbound frame to a dict.
+
+        Raises ``ValueError`` for undecodable frames.
+        """
+        if bytes_data is not None:
+            if msgpack is None:
+                raise ValueError('Binary frames are not supported')
+            try:
+                payload = msgpack.unpackb(bytes_data, raw=False)
+            except Exception as e:
+                raise ValueError(f'Invalid msgpack frame: {e}') from e
+        else:
+            payload = json.loads(text_data)
+        if not isinstance(payload, dict):
+            raise ValueError('Frame must be an object')
+        if payload.get('type') == 'ack':
+            self._handle_ack(payload)
+        return payload
+
+    async def send_frame(self, payload, close=False, coalesce_key=None):
+        """
+        Send ``payload`` in the negotiated encoding. ``coalesce_key`` marks
+        frames a newer one may replace while queued (see ``apps.send_queue``).
+        """
+        text_data, bytes_data = self.encode_frame(payload)
+        await self.send(text_data=text_data, bytes_data=bytes_data, close=close)
+
+    async def send_state(self, message_type, stream, key, state, version=None):
+        """
+        Send ``state`` for ``(stream, key)``, as a delta when the client has
+        acknowledged an earlier version and as ``data`` otherwise.
+
+        ``version`` optionally tags the frame with the snapshot version a
+        client can resume from after reconnecting.
+        """
+        entry = self._stream(stream, key)
+        entry.version += 1
+        entry.sent[entry.version] = dict(state)
+        if len(entry.sent) > MAX_UNACKED_VERSIONS:
+            entry.sent.pop(min(v for v in entry.sent if v != entry.acked))
+
+        frame = {'type': message_type, 'stream': stream, 'key': str(key), 'v': entry.version}
+        if version is not None:
+            frame['version'] = version
+        base = entry.sent.get(entry.acked) if entry.acked is not None else None
+        if base is not None:
+            frame['base'] = entry.acked
+            frame['delta'] = diff_state(base, state)
+        else:
+            frame['data'] = state
+        await self.send_frame(frame, coalesce_key=('state', stream, str(key)))
+
+    async def send_snapshot(self, message_type, stream, key, state, version, since=None, since_state=None):
+        """
+        Send an initial snapshot to a (re)connecting client.
+
+        ``version`` identifies ``state`` (see ``apps.snapshots``). A client
+        that already holds ``version`` gets ``unchanged``; one holding an
+        older, still known version (``since_state``) gets only the delta.
+        Either way the stream is seeded with ``state`` as acknowledged, so
+        the next ``send_state`` is already a delta.
+        """
+        frame = {'type': message_type, 'stream': stream, 'key': str(key), 'version': version}
+        if since is not None and since == version:
+            frame['unchanged'] = True
+        elif since_state is not None:
+            frame['since'] = since
+            frame['delta'] = diff_state(since_state, state)
+        else:
+            await self.send_state(message_type, stream, key, state, version=version)
+            return
+
+        entry = self._stream(stream, key)
+        entry.version += 1
+        entry.sent = {entry.version: dict(state)}
+        entry.acked = entry.version
+        frame['v'] = entry.version
+        await self.send_frame(frame)
+
+    def _stream(self, stream, key):
+        streams = self.__dict__.setdefault('_state_streams', {})
+        return streams.setdefault((stream, str(key)), _StateStream())
+
+    def _handle_ack(self, payload):
+        streams = self.__dict__.get('_state_streams', {})
+        entry = streams.get((payload.get('stream'), str(payload.get('key'))))
+        try:
+            version = int(payload.get('v'))
+        except (TypeError, ValueError):
+            return
+        if entry is None or version not in entry.sent:
+            return
+        if entry.acked is None or version > entry.acked:
+            entry.acked = version
+            # Older versions can no longer be a delta base
+            for stale in [v for v in entry.sent if v < version]:
+                del entry.sent[stale]
@@ -10,4 +10,4 @@ class NotificationsConfig(AppConfig):
 
     def ready(self):
         """Import signals when app is ready."""
-        from . import signals
+        from . import signals, template_cache  # noqa: F401
@@ -0,0 +1,333 @@
+"""
+Asynchronous, batched notification delivery.
+
+``NotificationService.send_notification`` used to deliver inside the
+caller's request: channel after channel, one provider call per delivery and
+two writes per ``NotificationDelivery``. Sending is now an enqueue:
+
+* ``enqueue`` splits pending deliveries by channel type into batches of the
+  provider's size and submits them, after commit, to that channel's
+  background pool (``notify_push``, ``notify_email``, ...). The pool sizes
+  in ``BACKGROUND_POOL_SIZES`` are the per-provider concurrency limits.
+* A job claims its deliveries with one conditional ``UPDATE`` that leases
+  them through ``next_attempt_at``, hands them to the provider in one call
+  (a push multicast takes up to ``NOTIFICATION_PUSH_BATCH_SIZE`` device
+  tokens) and writes every outcome back with a single ``bulk_update``.
+  Notification statuses follow with two ``UPDATE``s.
+* Failed deliveries are retried with exponential backoff and jitter until
+  ``NOTIFICATION_DELIVERY_MAX_ATTEMPTS``. Retries are re-queued in process
+  by a timer; ``manage.py deliver_notifications`` picks up the retries,
+  expired leases and never-started jobs a restarted process dropped.
+
+The providers are still mock integrations, but batch-shaped: a real FCM,
+email or SMS client replaces one with ``register_provider``.
+"""
+import logging
+import random
+import threading
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.background import submit, submit_on_commit
+
+from .models import Notification, NotificationChannel, NotificationDelivery
+
+logger = logging.getLogger(__name__)
+
+ChannelType = NotificationChannel.ChannelType
+
+
+class ProviderError(Exception):
+    """A provider call failed as a whole; ``retryable`` says whether trying again can help."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+@dataclass
+class DeliveryResult:
+    delivered: bool
+    provider_id: str = ''
+    response: dict = field(default_factory=dict)
+    error: str = ''
+    retryable: bool = True
+
+
+class Provider:
+    """Sends batches of deliveries of one channel type."""
+
+    channel_type = None
+    batch_size_setting = None
+    default_batch_size = 100
+
+    @property
+    def batch_size(self):
+        return getattr(settings, self.batch_size_setting, self.default_batch_size)
+
+    def send_batch(self, deliveries):
+        """One ``DeliveryResult`` per delivery, in order. May raise ``ProviderError``."""
+        raise NotImplementedError
+
+
+class PushProvider(Provider):
+    """Push notifications (placeholder for an FCM/APNS multicast)."""
+
+    channel_type = ChannelType.PUSH
+    batch_size_setting = 'NOTIFICATION_PUSH_BATCH_SIZE'
+    default_batch_size = 500
+
+    def send_batch(self, deliveries):
+        # A multicast carries one payload, so tokens are grouped by content
+        payloads = defaultdict(list)
+        for index, delivery in enumerate(deliveries):
+            payloads[(delivery.notification.title, delivery.notification.message)].append(index)
+
+        results = [None] * len(deliveries)
+        for (title, _), indexes in payloads.items():
+            multicast_id = uuid.uuid4().hex
+            logger.info(f"PUSH multicast {multicast_id}: {title} -> {len(indexes)} devices")
+            for index in indexes:
+                results[index] = DeliveryResult(True, provider_id=multicast_id, response={
+                    'mock': True,
+                    'message': 'Push notification sent successfully',
+                    'device_token': deliveries[index].channel.identifier,
+                })
+        return results
+
+
+class EmailProvider(Provider):
+    """Email (placeholder for a bulk send API)."""
+
+    channel_type = ChannelType.EMAIL
+    batch_size_setting = 'NOTIFICATION_EMAIL_BATCH_SIZE'
+    default_batch_size = 100
+
+    def send_batch(self, deliveries):
+        batch_id = uuid.uuid4().hex
+        logger.info(f"EMAIL batch {batch_id}: {len(deliveries)} messages")
+        return [
+            DeliveryResult(True, provider_id=batch_id, response={
+                'mock': True,
+                'message': 'Email sent successfully',
+                'recipient': delivery.channel.identifier,
+            })
+            for delivery in deliveries
+        ]
+
+
+class SMSProvider(Provider):
+    """SMS (placeholder for Twilio or similar, one gateway session per batch)."""
+
+    channel_type = ChannelType.SMS
+    batch_size_setting = 'NOTIFICATION_SMS_BATCH_SIZE'
+    default_batch_size = 50
+
+    def send_batch(self, deliveries):
+        results = []
+        for delivery in deliveries:
+            logger.info(f"SMS: {delivery.notification.title} -> {delivery.channel.identifier}")
+            results.append(DeliveryResult(True, provider_id=uuid.uuid4().hex, response={
+                'mock': True,
+                'message': 'SMS sent successfully',
+                'phone': delivery.channel.identifier,
+            }))
+        return results
+
+
+class InAppProvider(Provider):
+    """In-app notifications (placeholder for a WebSocket push)."""
+
+    channel_type = ChannelType.IN_APP
+    batch_size_setting = 'NOTIFICATION_IN_APP_BATCH_SIZE'
+    default_batch_size = 500
+
+    def send_batch(self, deliveries):
+        logger.info(f"IN-APP: {len(deliveries)} notifications")
+        return [
+            DeliveryResult(True, response={
+                'mock': True,
+                'message': 'In-app notification delivered',
+                'user_id': delivery.notification.recipient_id,
+            })
+            for delivery in deliveries
+        ]
+
+
+_providers = {
+    provider.channel_type: provider
+    for provider in (PushProvider(), EmailProvider(), SMSProvider(), InAppProvider())
+}
+
+
+def register_provider(provider):
+    """Use ``provider`` for its channel type from now on."""
+    _providers[provider.channel_type] = provider
+
+
+def get_provider(channel_type):
+    return _providers.get(channel_type)
+
+
+def pool_name(channel_type):
+    return f'notify_{channel_type}'
+
+
+def retry_delay(attempts):
+    """Seconds to wait after failed attempt number ``attempts``: exponential backoff with jitter."""
+    base = getattr(settings, 'NOTIFICATION_RETRY_BASE_DELAY', 30)
+    cap = getattr(settings, 'NOTIFICATION_RETRY_MAX_DELAY', 3600)
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def lease_duration():
+    return timedelta(seconds=getattr(settings, 'NOTIFICATION_DELIVERY_LEASE', 300))
+
+
+def pending():
+    return NotificationDelivery.objects.filter(delivered_at__isnull=True, failed_at__isnull=True)
+
+
+def batches(deliveries):
+    """Split ``(delivery_id, channel_type)`` pairs into provider-sized ``(channel_type, ids)`` batches."""
+    by_type = defaultdict(list)
+    for delivery_id, channel_type in deliveries:
+        by_type[channel_type].append(delivery_id)
+    for channel_type, ids in by_type.items():
+        provider = get_provider(channel_type)
+        size = provider.batch_size if provider else Provider.default_batch_size
+        for start in range(0, len(ids), size):
+            yield channel_type, ids[start:start + size]
+
+
+def enqueue(deliveries):
+    """
+    Send ``(delivery_id, channel_type)`` pairs on their channels' pools once
+    the current transaction commits.
+    """
+    for channel_type, ids in batches(deliveries):
+        submit_on_commit(pool_name(channel_type), deliver_batch, channel_type, ids)
+
+
+def due_deliveries(now=None):
+    """
+    ``(delivery_id, channel_type)`` of pending deliveries that are due: retries
+    whose time has come, expired leases, and deliveries whose job never ran.
+    """
+    now = now or timezone.now()
+    return (
+        pending()
+        .filter(
+            Q(next_attempt_at__lte=now)
+            | Q(next_attempt_at__isnull=True, attempted_at__lte=now - lease_duration())
+        )
+        .order_by('pk')
+        .values_list('pk', 'channel__channel_type')
+    )
+
+
+def claim(delivery_ids):
+    """
+    Lease the pending, due deliveries among ``delivery_ids`` to this worker.
+
+    The lease expiry written by the conditional ``UPDATE`` doubles as the
+    claim token; rows another worker holds are not due and stay out.
+    """
+    now = timezone.now()
+    lease = now + lease_duration()
+    claimed = (
+        pending()
+        .filter(pk__in=delivery_ids)
+        .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+        .update(next_attempt_at=lease)
+    )
+    if not claimed:
+        return []
+    return list(
+        pending().filter(pk__in=delivery_ids, next_attempt_at=lease)
+        .select_related('notification', 'channel')
+        .order_by('pk')
+    )
+
+
+def deliver_batch(channel_type, delivery_ids):
+    """Background job: send one batch of a channel's deliveries. Returns the number delivered."""
+    deliveries = claim(delivery_ids)
+    if not deliveries:
+        return 0
+
+    provider = get_provider(channel_type)
+    try:
+        if provider is None:
+            raise ProviderError(f'No provider for channel type {channel_type}', retryable=False)
+        results = provider.send_batch(deliveries)
+    except ProviderError as e:
+        logger.warning(f"{channel_type} provider failed for {len(deliveries)} deliveries: {e}")
+        results = [DeliveryResult(False, error=str(e), retryable=e.retryable)] * len(deliveries)
+    except Exception as e:
+        logger.exception(f"{channel_type} provider failed for {len(deliveries)} deliveries")
+        results = [DeliveryResult(False, error=str(e))] * len(deliveries)
+
+    return record(channel_type, deliveries, results)
+
+
+def record(channel_type, deliveries, results):
+    """Write a batch's outcomes back in bulk and schedule its retries."""
+    now = timezone.now()
+    max_attempts = getattr(settings, 'NOTIFICATION_DELIVERY_MAX_ATTEMPTS', 5)
+    retries = []
+    for delivery, result in zip(deliveries, results):
+        delivery.attempts += 1
+        delivery.provider_id = (result.provider_id or '')[:100]
+        delivery.provider_response = result.response
+        delivery.error_message = result.error
+        delivery.next_attempt_at = None
+        if result.delivered:
+            delivery.delivered_at = now
+        elif result.retryable and delivery.attempts < max_attempts:
+            delivery.next_attempt_at = now + timedelta(seconds=retry_delay(delivery.attempts))
+            retries.append(delivery)
+        else:
+            delivery.failed_at = now
+
+    NotificationDelivery.objects.bulk_update(deliveries, [
+        'attempts', 'next_attempt_at', 'delivered_at', 'failed_at',
+        'error_message', 'provider_id', 'provider_response',
+    ])
+
+    notification_ids = {delivery.notification_id for delivery in deliveries}
+    delivered = {delivery.notification_id for delivery in deliveries if delivery.delivered_at}
+    if delivered:
+        Notification.objects.filter(pk__in=delivered, status=Notification.Status.PENDING).update(
+            status=Notification.Status.SENT, sent_at=now
+        )
+    # Failed once no channel has delivered or is still trying; channels may be in other batches
+    undecided = NotificationDelivery.objects.filter(
+        notification_id__in=notification_ids, failed_at__isnull=True
+    ).values('notification_id')
+    Notification.objects.filter(
+        pk__in=notification_ids - delivered, status=Notification.Status.PENDING
+    ).exclude(pk__in=undecided).update(status=Notification.Status.FAILED)
+
+    if retries:
+        _schedule_retry(channel_type, retries, now)
+    return len(delivered)
+
+
+def _schedule_retry(channel_type, deliveries, now):
+    # Fire once the last of them is due, so the claim takes the whole batch
+    delay = (max(delivery.next_attempt_at for delivery in deliveries) - now).total_seconds()
+    timer = threading.Timer(
+        delay, submit, args=(pool_name(channel_type), deliver_batch, channel_type,
+                             [delivery.pk for delivery in deliveries])
+    )
+    timer.daemon = True
+    timer.start()
+    logger.info(f"Retrying {len(deliveries)} {channel_type} deliveries in {delay:.0f}s")
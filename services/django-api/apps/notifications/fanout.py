@@ -0,0 +1,153 @@
+"""
+Bulk, geo-targeted notification fan-out.
+
+``notify_pickup_request_created`` used to call
+``NotificationService.create_notification`` for every active worker in the
+system: a template lookup, a render, an INSERT and a synchronous send with
+more INSERTs per channel, thousands of queries per new pickup. A fan-out
+now:
+
+1. selects recipients by distance and availability: available workers
+   with spare capacity inside a bounding box around the bin, kept when the
+   bin is within their own ``service_radius_km``, nearest first, at most
+   ``NOTIFICATION_FANOUT_MAX_RECIPIENTS``; workers who turned pickup
+   notifications off are skipped;
+2. takes the compiled template from ``template_cache`` and renders it
+   once per locale;
+3. writes all ``Notification`` rows, then all ``NotificationDelivery`` rows
+   for the recipients' active channels, with ``bulk_create``;
+4. queues the deliveries for the batched delivery pipeline after commit
+   (see ``apps.notifications.delivery``).
+
+Notifications of recipients without an active channel are created as
+failed, matching ``NotificationService.send_notification``.
+"""
+import logging
+from collections import defaultdict
+from math import cos, radians
+
+from django.conf import settings
+from django.db import transaction
+from django.template import Context
+from django.utils import translation
+
+from apps.bins.geo import haversine_m
+
+from . import delivery
+from .models import Notification, NotificationChannel, NotificationDelivery
+from .template_cache import get_template
+
+logger = logging.getLogger(__name__)
+
+
+def nearby_workers(latitude, longitude, max_radius_km=None, limit=None):
+    """
+    Available workers who serve the point ``(latitude, longitude)``, nearest
+    first, as ``(worker, distance_m)``.
+    """
+    from apps.users.models import User
+
+    max_radius_km = max_radius_km or getattr(settings, 'NOTIFICATION_FANOUT_MAX_RADIUS_KM', 15)
+    limit = limit or getattr(settings, 'NOTIFICATION_FANOUT_MAX_RECIPIENTS', 200)
+    latitude, longitude = float(latitude), float(longitude)
+    dlat = max_radius_km * 1000 / 111320.0
+    dlng = max_radius_km * 1000 / max(111320.0 * cos(radians(latitude)), 1.0)
+
+    candidates = (
+        User.objects.filter(
+            role=User.UserRole.WORKER,
+            is_active=True,
+            is_available=True,
+            pending_pickups_count__lt=User.MAX_PENDING_PICKUPS,
+            latitude__range=(latitude - dlat, latitude + dlat),
+            longitude__range=(longitude - dlng, longitude + dlng),
+        )
+        .exclude(notification_preferences__pickup_notifications=False)
+        .only('id', 'username', 'latitude', 'longitude', 'service_radius_km')
+    )
+
+    in_range = []
+    for worker in candidates:
+        distance = haversine_m(latitude, longitude, worker.latitude, worker.longitude)
+        if distance <= min(worker.service_radius_km or max_radius_km, max_radius_km) * 1000:
+            in_range.append((worker, distance))
+    in_range.sort(key=lambda pair: pair[1])
+    return in_range[:limit]
+
+
+def recipient_locale(user):
+    """Locale to render a recipient's notification in."""
+    return getattr(user, 'language', None) or settings.LANGUAGE_CODE
+
+
+def render_once_per_locale(notification_type, context, recipients, default_title, default_message):
+    """
+    ``{locale: (title, message, priority)}`` for the locales of
+    ``recipients``, rendering the cached compiled template once per locale.
+    """
+    template = get_template(notification_type)
+    if template is None:
+        return defaultdict(lambda: (default_title, default_message, None))
+
+    rendered = {}
+    for locale in {recipient_locale(user) for user in recipients}:
+        with translation.override(locale):
+            rendered[locale] = (
+                template.title.render(Context(context))[:100],
+                template.message.render(Context(context)),
+                template.default_priority,
+            )
+    return rendered
+
+
+@transaction.atomic
+def fan_out(recipients, notification_type, context, priority=None, pickup_request=None, bin_obj=None,
+            metadata=None, default_title='Klynaa Notification', default_message='You have a new notification'):
+    """
+    Create one notification per recipient with bulk inserts and queue their
+    deliveries. Returns the created notifications.
+    """
+    recipients = list(recipients)
+    if not recipients:
+        return []
+
+    rendered = render_once_per_locale(notification_type, context, recipients, default_title, default_message)
+    batch_size = getattr(settings, 'NOTIFICATION_FANOUT_BATCH_SIZE', 500)
+
+    channels = defaultdict(list)
+    for channel_id, user_id, channel_type in NotificationChannel.objects.filter(
+        user_id__in=[user.id for user in recipients], is_active=True
+    ).values_list('id', 'user_id', 'channel_type'):
+        channels[user_id].append((channel_id, channel_type))
+
+    notifications = []
+    for user in recipients:
+        title, message, default_priority = rendered[recipient_locale(user)]
+        notifications.append(Notification(
+            recipient=user,
+            notification_type=notification_type,
+            priority=priority or default_priority or Notification.Priority.NORMAL,
+            title=title,
+            message=message,
+            pickup_request=pickup_request,
+            bin=bin_obj,
+            metadata=metadata or {},
+            # Same outcome as send_notification for users without channels
+            status=Notification.Status.PENDING if channels.get(user.id) else Notification.Status.FAILED,
+        ))
+    notifications = Notification.objects.bulk_create(notifications, batch_size=batch_size)
+
+    channel_types = []
+    deliveries = []
+    for notification in notifications:
+        for channel_id, channel_type in channels.get(notification.recipient_id, ()):
+            deliveries.append(NotificationDelivery(notification_id=notification.pk, channel_id=channel_id))
+            channel_types.append(channel_type)
+    deliveries = NotificationDelivery.objects.bulk_create(deliveries, batch_size=batch_size)
+    delivery.enqueue((queued.pk, channel_type) for queued, channel_type in zip(deliveries, channel_types))
+
+    logger.info(
+        f"Fan-out {notification_type}: {len(notifications)} notifications, "
+        f"{len(deliveries)} deliveries queued"
+    )
+    return notifications
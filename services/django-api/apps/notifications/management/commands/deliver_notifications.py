@@ -0,0 +1,40 @@
+"""Management command to send notification deliveries that are due."""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.background import get_executor
+from apps.notifications.delivery import batches, deliver_batch, due_deliveries, pool_name
+
+
+class Command(BaseCommand):
+    """Send due retries and deliveries a restarted process dropped, on the channel pools."""
+
+    help = 'Sends pending notification deliveries whose retry is due or whose job was lost'
+
+    def handle(self, *args, **options):
+        """Submit each due batch to its channel's pool and wait for completion."""
+        started = time.monotonic()
+        due = list(due_deliveries())
+        if not due:
+            self.stdout.write(self.style.SUCCESS('✓ No notification deliveries are due'))
+            return
+
+        futures = [
+            get_executor(pool_name(channel_type)).submit(deliver_batch, channel_type, ids)
+            for channel_type, ids in batches(due)
+        ]
+        delivered = failed = 0
+        for future in futures:
+            try:
+                delivered += future.result()
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f"✗ {e}")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {len(due)} due deliveries in {len(futures) - failed}/{len(futures)} batches, "
+            f"{delivered} notifications delivered in {elapsed:.1f}s"
+        ))
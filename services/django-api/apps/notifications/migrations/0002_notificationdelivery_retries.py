@@ -0,0 +1,30 @@
+# Generated by Django 4.2.24 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationdelivery',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='notificationdelivery',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='notificationdelivery',
+            index=models.Index(
+                condition=models.Q(('delivered_at__isnull', True), ('failed_at__isnull', True)),
+                fields=['next_attempt_at'], name='notif_delivery_pending_idx',
+            ),
+        ),
+    ]
@@ -110,6 +110,9 @@ class NotificationDelivery(models.Model):
     delivered_at = models.DateTimeField(null=True, blank=True)
     failed_at = models.DateTimeField(null=True, blank=True)
     error_message = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Due time of the next attempt while pending; a lease while a worker holds it
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
 
     # Provider response
     provider_id = models.CharField(max_length=100, blank=True, help_text="Provider message/notification ID")
@@ -120,6 +123,10 @@ class NotificationDelivery(models.Model):
         indexes = [
             models.Index(fields=['notification', 'channel']),
             models.Index(fields=['attempted_at']),
+            models.Index(
+                fields=['next_attempt_at'], name='notif_delivery_pending_idx',
+                condition=models.Q(delivered_at__isnull=True, failed_at__isnull=True),
+            ),
         ]
 
     def __str__(self):
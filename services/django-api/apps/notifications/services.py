@@ -1,10 +1,11 @@
 """Notification service for sending real-time updates."""
 
-from django.utils import timezone
-from django.template import Template, Context
+from django.template import Context
 from django.conf import settings
 import logging
-from .models import Notification, NotificationChannel, NotificationDelivery, NotificationTemplate
+from . import delivery
+from .models import Notification, NotificationChannel, NotificationDelivery
+from .template_cache import compile_template, get_template
 from typing import Dict, Any, List, Optional
 try:
     import requests
@@ -32,12 +33,8 @@ class NotificationService:
         """Create a new notification from template."""
         context = context or {}
 
-        try:
-            template = NotificationTemplate.objects.get(
-                notification_type=notification_type,
-                enabled=True
-            )
-        except NotificationTemplate.DoesNotExist:
+        template = get_template(notification_type)
+        if template is None:
             # Fallback to basic notification
             return cls._create_basic_notification(
                 recipient=recipient,
@@ -49,9 +46,9 @@ class NotificationService:
                 bin_obj=bin_obj
             )
 
-        # Render templates with context
-        title = cls._render_template(template.title_template, context)
-        message = cls._render_template(template.message_template, context)
+        # Render the cached, already parsed templates
+        title = template.title.render(Context(context))
+        message = template.message.render(Context(context))
 
         notification = Notification.objects.create(
             recipient=recipient,
@@ -79,173 +76,62 @@ class NotificationService:
     @classmethod
     def _render_template(cls, template_str: str, context: Dict[str, Any]) -> str:
         """Render Django template string with context."""
-        template = Template(template_str)
-        return template.render(Context(context))
+        return compile_template(template_str).render(Context(context))
 
     @classmethod
     def send_notification(cls, notification: Notification) -> bool:
-        """Send notification through all user's active channels."""
-        channels = NotificationChannel.objects.filter(
-            user=notification.recipient,
-            is_active=True
+        """
+        Queue delivery through all of the user's active channels (see
+        ``apps.notifications.delivery``). Returns False if the user has none.
+        """
+        channels = list(
+            NotificationChannel.objects.filter(user_id=notification.recipient_id, is_active=True)
+            .values_list('id', 'channel_type')
         )
 
-        if not channels.exists():
+        if not channels:
             logger.warning(f"No active channels for user {notification.recipient.username}")
             notification.status = Notification.Status.FAILED
             notification.save()
             return False
 
-        success = False
-        for channel in channels:
-            try:
-                delivered = cls._send_via_channel(notification, channel)
-                if delivered:
-                    success = True
-            except Exception as e:
-                logger.error(f"Failed to send via {channel.channel_type}: {str(e)}")
-
-        # Update notification status
-        if success:
-            notification.status = Notification.Status.SENT
-            notification.sent_at = timezone.now()
-        else:
-            notification.status = Notification.Status.FAILED
-
-        notification.save()
-        return success
-
-    @classmethod
-    def _send_via_channel(cls, notification: Notification, channel: NotificationChannel) -> bool:
-        """Send notification via specific channel."""
-        delivery = NotificationDelivery.objects.create(
-            notification=notification,
-            channel=channel
+        deliveries = NotificationDelivery.objects.bulk_create([
+            NotificationDelivery(notification=notification, channel_id=channel_id)
+            for channel_id, _ in channels
+        ])
+        delivery.enqueue(
+            (queued.pk, channel_type) for queued, (_, channel_type) in zip(deliveries, channels)
         )
-
-        try:
-            if channel.channel_type == NotificationChannel.ChannelType.PUSH:
-                success = cls._send_push_notification(notification, channel, delivery)
-            elif channel.channel_type == NotificationChannel.ChannelType.EMAIL:
-                success = cls._send_email_notification(notification, channel, delivery)
-            elif channel.channel_type == NotificationChannel.ChannelType.SMS:
-                success = cls._send_sms_notification(notification, channel, delivery)
-            elif channel.channel_type == NotificationChannel.ChannelType.IN_APP:
-                success = cls._send_in_app_notification(notification, channel, delivery)
-            else:
-                success = False
-
-            if success:
-                delivery.delivered_at = timezone.now()
-            else:
-                delivery.failed_at = timezone.now()
-
-            delivery.save()
-            return success
-
-        except Exception as e:
-            delivery.failed_at = timezone.now()
-            delivery.error_message = str(e)
-            delivery.save()
-            logger.error(f"Channel delivery failed: {str(e)}")
-            return False
-
-    @classmethod
-    def _send_push_notification(cls, notification: Notification, channel: NotificationChannel, delivery: NotificationDelivery) -> bool:
-        """Send push notification (placeholder for FCM/APNS integration)."""
-        # This would integrate with Firebase Cloud Messaging or Apple Push Notification Service
-        logger.info(f"PUSH: {notification.title} -> {channel.identifier}")
-
-        # Mock implementation - replace with actual push service
-        delivery.provider_response = {
-            'mock': True,
-            'message': 'Push notification sent successfully',
-            'device_token': channel.identifier
-        }
         return True
 
-    @classmethod
-    def _send_email_notification(cls, notification: Notification, channel: NotificationChannel, delivery: NotificationDelivery) -> bool:
-        """Send email notification."""
-        try:
-            # Mock email sending - replace with actual email service
-            logger.info(f"EMAIL: {notification.title} -> {channel.identifier}")
-
-            delivery.provider_response = {
-                'mock': True,
-                'message': 'Email sent successfully',
-                'recipient': channel.identifier
-            }
-            return True
-
-        except Exception as e:
-            logger.error(f"Email sending failed: {str(e)}")
-            return False
-
-    @classmethod
-    def _send_sms_notification(cls, notification: Notification, channel: NotificationChannel, delivery: NotificationDelivery) -> bool:
-        """Send SMS notification."""
-        try:
-            # Mock SMS sending - replace with Twilio or similar
-            logger.info(f"SMS: {notification.title} -> {channel.identifier}")
-
-            delivery.provider_response = {
-                'mock': True,
-                'message': 'SMS sent successfully',
-                'phone': channel.identifier
-            }
-            return True
-
-        except Exception as e:
-            logger.error(f"SMS sending failed: {str(e)}")
-            return False
-
-    @classmethod
-    def _send_in_app_notification(cls, notification: Notification, channel: NotificationChannel, delivery: NotificationDelivery) -> bool:
-        """Send in-app notification (WebSocket or similar)."""
-        try:
-            # This would send via WebSocket to connected clients
-            logger.info(f"IN-APP: {notification.title} -> {channel.identifier}")
-
-            delivery.provider_response = {
-                'mock': True,
-                'message': 'In-app notification delivered',
-                'user_id': notification.recipient.id
-            }
-            return True
-
-        except Exception as e:
-            logger.error(f"In-app notification failed: {str(e)}")
-            return False
-
 
 # Convenience functions for common notifications
 def notify_pickup_request_created(pickup_request):
-    """Notify workers about new pickup request."""
-    from apps.users.models import User
+    """Notify available workers near the bin about a new pickup request."""
+    from .fanout import fan_out, nearby_workers
 
-    workers = User.objects.filter(
-        role=User.UserRole.WORKER,
-        is_active=True
-    )
+    bin_obj = pickup_request.bin
+    if bin_obj.latitude is None or bin_obj.longitude is None:
+        logger.warning(f"Pickup {pickup_request.id} has no bin location; no workers notified")
+        return []
 
     context = {
         'pickup_request': pickup_request,
-        'bin': pickup_request.bin,
+        'bin': bin_obj,
         'customer': pickup_request.owner,
-        'address': pickup_request.bin.address,
+        'address': bin_obj.address,
         'price': pickup_request.expected_fee
     }
 
-    for worker in workers:
-        NotificationService.create_notification(
-            recipient=worker,
-            notification_type='pickup_request',
-            context=context,
-            pickup_request=pickup_request,
-            bin_obj=pickup_request.bin,
-            priority='normal'
-        )
+    workers = nearby_workers(bin_obj.latitude, bin_obj.longitude)
+    return fan_out(
+        [worker for worker, _ in workers],
+        notification_type='pickup_request',
+        context=context,
+        priority='normal',
+        pickup_request=pickup_request,
+        bin_obj=bin_obj,
+    )
 
 
 def notify_pickup_assigned(pickup_request):
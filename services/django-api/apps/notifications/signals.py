@@ -58,11 +58,12 @@ def handle_bin_changes(sender, instance, created, **kwargs):
 @receiver(pre_save, sender=Bin)
 def store_previous_bin_status(sender, instance, **kwargs):
     """Store previous fill level for comparison."""
-    if instance.pk:
-        try:
-            previous = Bin.objects.get(pk=instance.pk)
-            instance._previous_fill_level = previous.fill_level
-        except Bin.DoesNotExist:
-            instance._previous_fill_level = 0
-    else:
+    if not instance.pk:
         instance._previous_fill_level = 0
+    elif instance.has_snapshot:
+        instance._previous_fill_level = instance.previous('fill_level', 0)
+    else:
+        # Instance was built by hand rather than loaded; fall back to the database
+        instance._previous_fill_level = Bin.objects.filter(
+            pk=instance.pk
+        ).values_list('fill_level', flat=True).first() or 0
@@ -0,0 +1,136 @@
+"""
+Compiled notification template cache.
+
+``NotificationService.create_notification`` fetched the
+``NotificationTemplate`` row on every call and ``_render_template`` parsed
+the title and message strings into new ``django.template.Template``
+objects each time. Parsing dominates the cost of rendering these short
+templates.
+
+* ``get_template(notification_type)`` returns a ``CompiledTemplate``
+  holding the parsed title and message. Compiled templates are cached by
+  ``(notification_type, updated_at)``, so an edited template (``updated_at``
+  is ``auto_now``) is never served from an old compilation.
+* Which version is current is cached per type for
+  ``NOTIFICATION_TEMPLATE_CACHE_TTL`` seconds and dropped from the
+  ``NotificationTemplate`` signals immediately and on commit; other
+  processes pick up edits within the TTL.
+* ``compile_template`` caches ad-hoc template strings by their source.
+"""
+import logging
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.template import Template
+
+from apps.caching import LRUCache
+
+from .models import Notification, NotificationTemplate
+
+logger = logging.getLogger(__name__)
+
+# Cached "no enabled template for this type"
+_NO_TEMPLATE = 'none'
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    notification_type: str
+    updated_at: object
+    title: Template
+    message: Template
+    default_priority: str
+
+
+class NotificationTemplateCache:
+    """Parsed notification templates keyed by ``(notification_type, updated_at)``."""
+
+    def __init__(self, maxsize=None, ttl=None):
+        maxsize = maxsize or getattr(settings, 'NOTIFICATION_TEMPLATE_CACHE_SIZE', 256)
+        ttl = ttl or getattr(settings, 'NOTIFICATION_TEMPLATE_CACHE_TTL', 300)
+        self._compiled = LRUCache(maxsize=maxsize)
+        # Current version per type; a load that raced an edit is not kept
+        self._current = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._invalidated = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._sources = LRUCache(maxsize=maxsize * 4)
+        self.compiles = 0
+
+    def get(self, notification_type):
+        """The compiled enabled template for ``notification_type``, or ``None``."""
+        current = self._current.get(notification_type)
+        if current == _NO_TEMPLATE:
+            return None
+        if current is not None:
+            compiled = self._compiled.get(current)
+            if compiled is not None:
+                return compiled
+
+        loaded_at = time.monotonic()
+        row = NotificationTemplate.objects.filter(
+            notification_type=notification_type, enabled=True
+        ).values('updated_at', 'title_template', 'message_template', 'default_priority').first()
+        fresh = self._invalidated.get(notification_type, 0) < loaded_at
+        if row is None:
+            if fresh:
+                self._current.set(notification_type, _NO_TEMPLATE)
+            return None
+
+        key = (notification_type, row['updated_at'])
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = CompiledTemplate(
+                notification_type=notification_type,
+                updated_at=row['updated_at'],
+                title=self.compile(row['title_template']),
+                message=self.compile(row['message_template']),
+                default_priority=row['default_priority'],
+            )
+            self._compiled.set(key, compiled)
+        if fresh:
+            self._current.set(notification_type, key)
+        return compiled
+
+    def compile(self, source):
+        """Parse a template string, reusing an earlier parse of the same source."""
+        template = self._sources.get(source)
+        if template is None:
+            template = Template(source)
+            self.compiles += 1
+            self._sources.set(source, template)
+        return template
+
+    def invalidate(self, notification_type):
+        """Forget the current version of ``notification_type`` now and when the transaction commits."""
+        self._drop(notification_type)
+        transaction.on_commit(lambda: self._drop(notification_type))
+
+    def _drop(self, notification_type):
+        self._invalidated.set(notification_type, time.monotonic())
+        self._current.pop(notification_type)
+
+    def stats(self):
+        """Counters for monitoring endpoints."""
+        return dict(self._current.stats(), compiles=self.compiles)
+
+
+template_cache = NotificationTemplateCache()
+
+
+def get_template(notification_type):
+    return template_cache.get(notification_type)
+
+
+def compile_template(source):
+    return template_cache.compile(source)
+
+
+@receiver(post_save, sender=NotificationTemplate, dispatch_uid='notification_template_cache_saved')
+@receiver(post_delete, sender=NotificationTemplate, dispatch_uid='notification_template_cache_deleted')
+def invalidate_notification_template(sender, instance, **kwargs):
+    # There are only a handful of types, and an edit may have changed the type itself
+    for notification_type in Notification.NotificationType.values:
+        template_cache.invalidate(notification_type)
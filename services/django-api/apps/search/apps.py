@@ -0,0 +1,22 @@
+"""Search app configuration."""
+
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def repair_sqlite_search_schema(sender, using='default', **kwargs):
+    from django.db import connections
+
+    from .backends import ensure_sqlite_schema
+
+    if connections[using].vendor == 'sqlite':
+        ensure_sqlite_schema(using)
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.search'
+    verbose_name = 'Search'
+
+    def ready(self):
+        post_migrate.connect(repair_sqlite_search_schema, sender=self, dispatch_uid='search_repair_sqlite_schema')
@@ -0,0 +1,237 @@
+"""
+Indexed full-text search over chat messages and bin addresses.
+
+Support searches used ``icontains``, a full table scan per query. Each
+searchable source now has a full-text index maintained by the database
+itself, so rows written by ``bulk_create``, ``update()`` or raw SQL are
+indexed too:
+
+* SQLite: an FTS5 table per source with external content (the source table
+  holds the text, the FTS table only the index), kept in sync by
+  ``AFTER INSERT/UPDATE/DELETE`` triggers. Ranked with ``bm25``,
+  highlighted with ``snippet``.
+* PostgreSQL: a GIN expression index on ``to_tsvector`` of the searchable
+  columns, which PostgreSQL maintains on every write. Ranked with
+  ``ts_rank``, highlighted with ``ts_headline`` over all searchable
+  columns, as ``snippet`` picks from any column.
+
+Other databases raise ``SearchUnavailable``.
+
+``search`` is the one entry point for both. Queries are reduced to word
+tokens matched as prefixes and ANDed, so user input never reaches the
+FTS5 or tsquery syntax. Highlights are HTML-escaped with matches wrapped
+in ``<mark>``.
+"""
+import html
+import logging
+import re
+
+from django.apps import apps
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Text search configuration the PostgreSQL indexes are built with; queries
+# must use the same one to hit them. 'simple' does no stemming, which suits
+# mixed French/English content and street names.
+SEARCH_CONFIG = 'simple'
+
+SOURCES = {
+    'message': {'model': 'chat.Message', 'fields': ['content']},
+    'bin': {'model': 'bins.Bin', 'fields': ['label', 'address']},
+}
+
+MAX_TOKENS = 8
+
+# Private-use characters marking matches until the text is escaped
+_START, _STOP = '\ue000', '\ue001'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class SearchUnavailable(Exception):
+    pass
+
+
+def fts_table(kind):
+    return f'search_{kind}_fts'
+
+
+def index_name(kind):
+    return f'search_{kind}_tsv_idx'
+
+
+def tokenize(query):
+    return _TOKEN_RE.findall((query or '').lower())[:MAX_TOKENS]
+
+
+def sqlite_schema(kind, table, fields):
+    """Statements creating the FTS5 table and sync triggers for one source."""
+    fts = fts_table(kind)
+    columns = ', '.join(fields)
+    new_values = ', '.join(f'new.{field}' for field in fields)
+    old_values = ', '.join(f'old.{field}' for field in fields)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{columns}, content='{table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def ensure_sqlite_schema(using='default'):
+    """
+    Recreate missing FTS tables or triggers and rebuild their index.
+
+    SQLite drops a table's triggers when a migration rebuilds the table
+    (how it alters columns), so this runs after every ``migrate``.
+    Returns the sources that were repaired.
+    """
+    from django.db import connections
+
+    repaired = []
+    connection_ = connections[using]
+    with connection_.cursor() as cursor:
+        tables = set(connection_.introspection.table_names(cursor))
+        for kind, source in SOURCES.items():
+            table = apps.get_model(source['model'])._meta.db_table
+            if table not in tables:
+                continue
+            fts = fts_table(kind)
+            expected = {fts, f'{fts}_ai', f'{fts}_ad', f'{fts}_au'}
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)", sorted(expected)
+            )
+            if {row[0] for row in cursor.fetchall()} == expected:
+                continue
+            for statement in sqlite_schema(kind, table, source['fields']):
+                cursor.execute(statement)
+            repaired.append(kind)
+    return repaired
+
+
+def sqlite_drop(kind):
+    fts = fts_table(kind)
+    return [f'DROP TRIGGER IF EXISTS {fts}_{suffix}' for suffix in ('ai', 'ad', 'au')] + [
+        f'DROP TABLE IF EXISTS {fts}'
+    ]
+
+
+def search_vector(kind):
+    """The indexed ``to_tsvector`` expression of a source (PostgreSQL)."""
+    from django.contrib.postgres.search import SearchVector
+
+    return SearchVector(*SOURCES[kind]['fields'], config=SEARCH_CONFIG)
+
+
+def search_index(kind):
+    """GIN expression index over ``search_vector`` (PostgreSQL)."""
+    from django.contrib.postgres.indexes import GinIndex
+
+    return GinIndex(search_vector(kind), name=index_name(kind))
+
+
+def _highlight(text):
+    return html.escape(text or '').replace(_START, '<mark>').replace(_STOP, '</mark>')
+
+
+def _search_sqlite(kind, tokens, limit):
+    fts = fts_table(kind)
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    # Column -1 lets snippet() pick the best matching column
+    sql = (
+        f"SELECT rowid, -bm25({fts}), snippet({fts}, -1, %s, %s, '…', 24) "
+        f"FROM {fts} WHERE {fts} MATCH %s ORDER BY bm25({fts}) LIMIT %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_START, _STOP, match, limit])
+        return [(pk, rank, _highlight(snippet)) for pk, rank, snippet in cursor.fetchall()]
+
+
+def search_headline(kind, query):
+    """``ts_headline`` over all searchable columns of a source (PostgreSQL)."""
+    from django.contrib.postgres.search import SearchHeadline
+    from django.db.models import TextField, Value
+    from django.db.models.functions import Concat
+
+    fields = SOURCES[kind]['fields']
+    text = fields[0]
+    if len(fields) > 1:
+        parts = [fields[0]]
+        for field in fields[1:]:
+            parts += [Value(' '), field]
+        text = Concat(*parts, output_field=TextField())
+    return SearchHeadline(
+        text, query, config=SEARCH_CONFIG, start_sel=_START, stop_sel=_STOP, max_words=24, min_words=8,
+    )
+
+
+def _search_postgresql(kind, tokens, limit):
+    from django.contrib.postgres.search import SearchQuery, SearchRank
+
+    model = apps.get_model(SOURCES[kind]['model'])
+    query = SearchQuery(' & '.join(f'{token}:*' for token in tokens), search_type='raw', config=SEARCH_CONFIG)
+    vector = search_vector(kind)
+    rows = (
+        model.objects.annotate(search=vector)
+        .filter(search=query)
+        .annotate(rank=SearchRank(vector, query), headline=search_headline(kind, query))
+        .order_by('-rank')
+        .values_list('pk', 'rank', 'headline')[:limit]
+    )
+    return [(pk, rank, _highlight(headline)) for pk, rank, headline in rows]
+
+
+def _serialize(kind, obj):
+    if kind == 'message':
+        return {
+            'id': str(obj.message_id),
+            'room_id': str(obj.chat_room.room_id),
+            'sender_id': obj.sender_id,
+            'content': obj.content,
+            'created_at': obj.created_at.isoformat(),
+        }
+    return {
+        'id': obj.id,
+        'bin_id': obj.bin_id,
+        'label': obj.label,
+        'address': obj.address,
+        'status': obj.status,
+    }
+
+
+def search(query, kinds=None, limit=20):
+    """
+    Search ``kinds`` (default: all sources) for ``query``. Returns up to
+    ``limit`` hits per source as ``{'type', 'rank', 'highlight', 'object'}``,
+    best first within each source. Raises ``SearchUnavailable`` on
+    databases without a full-text backend.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return []
+    if connection.vendor == 'sqlite':
+        backend = _search_sqlite
+    elif connection.vendor == 'postgresql':
+        backend = _search_postgresql
+    else:
+        raise SearchUnavailable(f'Full-text search is not available on {connection.vendor}')
+
+    results = []
+    for kind in kinds or SOURCES:
+        hits = backend(kind, tokens, limit)
+        queryset = apps.get_model(SOURCES[kind]['model']).objects.all()
+        if kind == 'message':
+            queryset = queryset.select_related('chat_room')
+        objects = queryset.in_bulk([pk for pk, _, _ in hits])
+        results.extend(
+            {'type': kind, 'rank': float(rank), 'highlight': highlight, 'object': _serialize(kind, objects[pk])}
+            for pk, rank, highlight in hits if pk in objects
+        )
+    return results
@@ -0,0 +1,24 @@
+"""Management command to rebuild the full-text search indexes."""
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apps.search import backends
+
+
+class Command(BaseCommand):
+    """Recreate and rebuild the FTS5 tables (SQLite) or reindex the GIN indexes (PostgreSQL)."""
+
+    help = 'Rebuilds the full-text search indexes over chat messages and bins'
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            for kind in backends.SOURCES:
+                if connection.vendor == 'sqlite':
+                    fts = backends.fts_table(kind)
+                    backends.ensure_sqlite_schema()
+                    cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+                    cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('optimize')")
+                elif connection.vendor == 'postgresql':
+                    cursor.execute(f'REINDEX INDEX {backends.index_name(kind)}')
+                self.stdout.write(self.style.SUCCESS(f'✓ Rebuilt {kind} search index'))
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.24 on 2026-10-19 13:00
+
+from django.db import migrations
+
+from apps.search import backends
+
+
+def tsv_index(kind):
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return GinIndex(
+        SearchVector(*backends.SOURCES[kind]['fields'], config=backends.SEARCH_CONFIG),
+        name=backends.index_name(kind),
+    )
+
+
+def create_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for kind, source in backends.SOURCES.items():
+        model = apps.get_model(source['model'])
+        if vendor == 'sqlite':
+            for statement in backends.sqlite_schema(kind, model._meta.db_table, source['fields']):
+                schema_editor.execute(statement)
+        elif vendor == 'postgresql':
+            schema_editor.add_index(model, tsv_index(kind))
+
+
+def drop_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for kind, source in backends.SOURCES.items():
+        model = apps.get_model(source['model'])
+        if vendor == 'sqlite':
+            for statement in backends.sqlite_drop(kind):
+                schema_editor.execute(statement)
+        elif vendor == 'postgresql':
+            schema_editor.remove_index(model, tsv_index(kind))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bins', '0010_pickupproof_verification_queue'),
+        ('chat', '0002_chatreadwatermark'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,46 @@
+"""Support search API."""
+
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .backends import SOURCES, SearchUnavailable, search
+
+MAX_RESULTS = 100
+
+
+class SearchView(APIView):
+    """
+    GET /api/search/?q=&type=message|bin&limit=
+
+    Ranked full-text search over chat messages and bin addresses for
+    support staff. ``highlight`` is HTML-escaped with matches in ``<mark>``.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if not request.user.is_admin_user:
+            return Response({'error': 'Admin access required'}, status=status.HTTP_403_FORBIDDEN)
+
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        kind = request.query_params.get('type')
+        if kind and kind not in SOURCES:
+            return Response(
+                {'error': f"type must be one of: {', '.join(SOURCES)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), MAX_RESULTS))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = search(query, kinds=[kind] if kind else None, limit=limit)
+        except SearchUnavailable as e:
+            return Response({'error': str(e)}, status=status.HTTP_501_NOT_IMPLEMENTED)
+        return Response({'query': query, 'count': len(results), 'results': results})
@@ -0,0 +1,215 @@
+"""
+Bounded, coalescing per-connection send queues for WebSocket consumers.
+
+Group events used to be written to the socket from the event handler, so a
+slow client held up its consumer and its buffered output could grow without
+limit. With ``BoundedSendMixin`` handlers only enqueue frames; a writer task
+per connection drains the queue to the socket.
+
+The queue only fills if the writer learns that the socket is backed up.
+Daphne's ``send`` returns as soon as the frame is handed to Twisted, whose
+write buffer is unbounded. So the writer registers a streaming producer
+with Daphne's protocol. Twisted pauses it once the connection's write
+buffer passes its high-water mark (64 KiB), and the writer waits until it
+resumes. Servers whose ``send`` waits for the socket, such as uvicorn,
+need no producer. Under any other server the queue drains immediately and
+none of the limits below apply.
+
+* The queue holds at most ``WEBSOCKET_SEND_QUEUE_SIZE`` frames.
+* State frames (``send_state``: a pickup's status, a worker's position)
+  carry a coalescing key. A newer frame for the same entity replaces the
+  pending one in place, so a lagging client skips intermediate states
+  instead of queueing them. Delta frames are always relative to the last
+  acknowledged version, so skipping one is safe.
+* A client whose queue fills up with frames that cannot be coalesced, or
+  whose oldest pending frame is older than ``WEBSOCKET_SEND_MAX_LAG``
+  seconds, is disconnected with close code 4008. It reconnects and resumes
+  from its last snapshot version (see ``apps.snapshots``).
+
+``send_queue_stats`` reports queue depth and lag per connection for this
+process.
+"""
+import asyncio
+import functools
+import logging
+import time
+import weakref
+from collections import OrderedDict
+from itertools import count
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSE_CODE_SLOW_CONSUMER = 4008
+
+_connections = weakref.WeakSet()
+_totals = {'coalesced': 0, 'slow_disconnects': 0}
+
+
+class _TransportFlow:
+    """Twisted streaming producer tracking whether the connection's write buffer has room."""
+
+    def __init__(self):
+        self.writable = asyncio.Event()
+        self.writable.set()
+        self.pauses = 0
+
+    # Called by the reactor, which Daphne runs on the application's event loop
+    def pauseProducing(self):
+        self.writable.clear()
+        self.pauses += 1
+
+    def resumeProducing(self):
+        self.writable.set()
+
+    def stopProducing(self):
+        # Connection lost; websocket_disconnect stops the writer
+        self.writable.set()
+
+
+def _server_flow_control(consumer):
+    """
+    Register a ``_TransportFlow`` with the Daphne protocol behind
+    ``consumer``'s ASGI ``send`` (``partial(Server.handle_reply, protocol)``).
+    ``None`` under other servers or if the transport already has a producer.
+    """
+    send = getattr(consumer, 'base_send', None)
+    protocol = send.args[0] if isinstance(send, functools.partial) and send.args else None
+    register = getattr(protocol, 'registerProducer', None)
+    if register is None:
+        return None
+    flow = _TransportFlow()
+    try:
+        register(flow, True)
+    except Exception as e:
+        logger.debug(f"No transport flow control for {consumer.scope.get('path')}: {e}")
+        return None
+    return flow
+
+
+class _SendQueue:
+    __slots__ = ('pending', 'ready', 'writer', 'flow', 'closed', 'sent', 'coalesced', 'max_depth', 'unique')
+
+    def __init__(self):
+        self.pending = OrderedDict()
+        self.ready = asyncio.Event()
+        self.writer = None
+        self.flow = None
+        self.closed = False
+        self.sent = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.unique = count()
+
+
+class BoundedSendMixin:
+    """
+    Mixin for ``CompactFramingMixin`` consumers routing ``send_frame``
+    through a bounded per-connection queue. List it before
+    ``CompactFramingMixin``.
+    """
+
+    def _send_queue(self):
+        queue = self.__dict__.get('_bounded_send_queue')
+        if queue is None:
+            queue = self.__dict__['_bounded_send_queue'] = _SendQueue()
+            _connections.add(self)
+        return queue
+
+    async def send_frame(self, payload, close=False, coalesce_key=None):
+        queue = self._send_queue()
+        if queue.closed:
+            return
+
+        now = time.monotonic()
+        if coalesce_key is not None and coalesce_key in queue.pending:
+            # Keep the original position and enqueue time, carry the newest frame
+            queue.pending[coalesce_key] = (payload, close, queue.pending[coalesce_key][2])
+            queue.coalesced += 1
+            _totals['coalesced'] += 1
+        elif len(queue.pending) >= getattr(settings, 'WEBSOCKET_SEND_QUEUE_SIZE', 256):
+            await self._disconnect_slow_consumer(queue, 'send queue full')
+            return
+        else:
+            key = coalesce_key if coalesce_key is not None else ('frame', next(queue.unique))
+            queue.pending[key] = (payload, close, now)
+            queue.max_depth = max(queue.max_depth, len(queue.pending))
+
+        oldest = next(iter(queue.pending.values()))[2]
+        if now - oldest > getattr(settings, 'WEBSOCKET_SEND_MAX_LAG', 10.0):
+            await self._disconnect_slow_consumer(queue, f'{now - oldest:.1f}s behind')
+            return
+
+        if queue.writer is None:
+            queue.flow = _server_flow_control(self)
+            queue.writer = asyncio.ensure_future(self._drain_send_queue(queue))
+        queue.ready.set()
+
+    async def _drain_send_queue(self, queue):
+        try:
+            while not queue.closed:
+                if not queue.pending:
+                    queue.ready.clear()
+                    await queue.ready.wait()
+                    continue
+                if queue.flow is not None and not queue.flow.writable.is_set():
+                    # Socket backed up: leave frames queued so they coalesce or hit the limits
+                    await queue.flow.writable.wait()
+                    continue
+                _, (payload, close, _) = queue.pending.popitem(last=False)
+                await super().send_frame(payload, close=close)
+                queue.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"WebSocket writer for {self.scope.get('path')} stopped: {e}")
+            queue.closed = True
+
+    async def _disconnect_slow_consumer(self, queue, reason):
+        queue.closed = True
+        queue.pending.clear()
+        _totals['slow_disconnects'] += 1
+        logger.warning(f"Disconnecting slow WebSocket client on {self.scope.get('path')}: {reason}")
+        if queue.writer is not None:
+            queue.writer.cancel()
+        await self.close(code=CLOSE_CODE_SLOW_CONSUMER)
+
+    async def websocket_disconnect(self, message):
+        queue = self.__dict__.get('_bounded_send_queue')
+        if queue is not None:
+            queue.closed = True
+            if queue.writer is not None:
+                queue.writer.cancel()
+            _connections.discard(self)
+        await super().websocket_disconnect(message)
+
+    def send_queue_metrics(self):
+        """Queue depth and lag of this connection."""
+        queue = self._send_queue()
+        oldest = next(iter(queue.pending.values()))[2] if queue.pending else None
+        return {
+            'path': self.scope.get('path'),
+            'depth': len(queue.pending),
+            'max_depth': queue.max_depth,
+            'lag_seconds': round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+            'sent': queue.sent,
+            'coalesced': queue.coalesced,
+            'flow_control': queue.flow is not None,
+            'transport_pauses': queue.flow.pauses if queue.flow is not None else 0,
+        }
+
+
+def send_queue_stats(limit=20):
+    """Totals for this process plus the ``limit`` most backed-up connections."""
+    rows = [consumer.send_queue_metrics() for consumer in list(_connections)]
+    rows.sort(key=lambda row: (row['lag_seconds'], row['depth']), reverse=True)
+    return {
+        'connections': len(rows),
+        'queued_frames': sum(row['depth'] for row in rows),
+        'max_depth': max((row['depth'] for row in rows), default=0),
+        'max_lag_seconds': rows[0]['lag_seconds'] if rows else 0.0,
+        'coalesced': _totals['coalesced'],
+        'slow_disconnects': _totals['slow_disconnects'],
+        'most_lagged': rows[:limit],
+    }
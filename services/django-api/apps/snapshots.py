@@ -0,0 +1,165 @@
+"""
+Versioned snapshot cache for WebSocket initial state.
+
+Every consumer sends the current state of its entity on connect (a pickup's
+status, a worker's dashboard data, a customer's recent notifications).
+After a network blip thousands of clients reconnect at once, and each
+connect used to run its own queries through ``database_sync_to_async``.
+
+Snapshots are now loaded once and shared:
+
+* ``load`` serves the cached state for ``(kind, key)``; concurrent misses
+  for the same entity wait on a single load instead of each occupying a
+  thread-pool slot (single flight).
+* Writes invalidate the entry from model signals, both immediately and when
+  the transaction commits. Entries also expire after ``SNAPSHOT_CACHE_TTL``
+  seconds so other processes converge without the signal.
+* ``record`` versions what was actually sent to a client with a digest of
+  its content, and keeps the last ``SNAPSHOT_HISTORY`` versions per entity.
+  A client that reconnects with ``?since=<version>`` gets nothing new when
+  the state is unchanged, or only the delta from the version it holds (see
+  ``CompactFramingMixin.send_snapshot``).
+
+The cache lives in process memory like ``apps.caching.LRUCache``, and
+versions are content digests, so a client resuming against another process
+still gets a correct (if full) snapshot.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from apps.caching import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def snapshot_version(state):
+    """Short content digest identifying ``state``."""
+    encoded = json.dumps(state, sort_keys=True, cls=DjangoJSONEncoder).encode()
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+
+def requested_since(scope):
+    """The snapshot version a reconnecting client says it holds (``?since=``), if any."""
+    params = parse_qs(scope.get('query_string', b'').decode())
+    return (params.get('since') or [None])[0]
+
+
+class SnapshotCache:
+    """Shared, invalidation-aware cache of consumer initial state."""
+
+    def __init__(self, maxsize=None, ttl=None, history=None):
+        maxsize = maxsize or getattr(settings, 'SNAPSHOT_CACHE_SIZE', 10000)
+        self.history = history or getattr(settings, 'SNAPSHOT_HISTORY', 4)
+        self._states = LRUCache(maxsize=maxsize, ttl=ttl or getattr(settings, 'SNAPSHOT_CACHE_TTL', 30))
+        self._changelog = LRUCache(maxsize=maxsize)
+        # Write sequence per entity; a load only caches if no write happened meanwhile
+        self._writes = LRUCache(maxsize=maxsize)
+        self._sequence = itertools.count(1)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.shared_loads = 0
+
+    @staticmethod
+    def _key(kind, key):
+        return kind, str(key)
+
+    async def load(self, kind, key, loader):
+        """
+        Return the cached state for ``(kind, key)``, calling ``loader(key)``
+        in the database thread on a miss. The returned state is shared and
+        must not be mutated.
+        """
+        cache_key = self._key(kind, key)
+        state = self._states.get(cache_key, _MISSING)
+        if state is not _MISSING:
+            return state
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._inflight.get(cache_key)
+            if task is not None and task.get_loop() is loop:
+                self.shared_loads += 1
+            else:
+                task = self._inflight[cache_key] = loop.create_task(self._fill(cache_key, key, loader))
+        # Shielded so a client disconnecting mid-load does not fail the others
+        return await asyncio.shield(task)
+
+    async def _fill(self, cache_key, key, loader):
+        try:
+            written = self._writes.get(cache_key, 0)
+            state = await database_sync_to_async(loader)(key)
+            self.loads += 1
+            if self._writes.get(cache_key, 0) == written:
+                self._states.set(cache_key, state)
+            return state
+        finally:
+            with self._lock:
+                if self._inflight.get(cache_key) is asyncio.current_task():
+                    del self._inflight[cache_key]
+
+    def invalidate(self, kind, key):
+        """Drop the cached state for ``(kind, key)`` now and again when the transaction commits."""
+        if key is None:
+            return
+        self._drop(kind, key)
+        transaction.on_commit(lambda: self._drop(kind, key))
+
+    def _drop(self, kind, key):
+        cache_key = self._key(kind, key)
+        self._writes.set(cache_key, next(self._sequence))
+        self._states.pop(cache_key)
+
+    def record(self, kind, key, state):
+        """Version ``state`` as sent to a client and remember it for later deltas."""
+        version = snapshot_version(state)
+        cache_key = self._key(kind, key)
+        with self._lock:
+            versions = self._changelog.get(cache_key)
+            if versions is None:
+                versions = OrderedDict()
+                self._changelog.set(cache_key, versions)
+            versions[version] = state
+            versions.move_to_end(version)
+            while len(versions) > self.history:
+                versions.popitem(last=False)
+        return version
+
+    def state_at(self, kind, key, version):
+        """The state previously recorded as ``version``, or ``None`` if it is no longer known."""
+        if not version:
+            return None
+        with self._lock:
+            versions = self._changelog.get(self._key(kind, key))
+            return versions.get(version) if versions else None
+
+    def stats(self):
+        """Counters for monitoring endpoints."""
+        return dict(self._states.stats(), loads=self.loads, shared_loads=self.shared_loads)
+
+
+snapshot_cache = SnapshotCache()
+
+
+async def send_initial_snapshot(consumer, message_type, stream, kind, key, state):
+    """
+    Send ``state`` as the connect-time snapshot of ``(kind, key)`` on a
+    ``CompactFramingMixin`` consumer, resuming from the client's ``?since=``.
+    """
+    version = snapshot_cache.record(kind, key, state)
+    since = requested_since(consumer.scope)
+    since_state = snapshot_cache.state_at(kind, key, since) if since and since != version else None
+    await consumer.send_snapshot(message_type, stream, key, state, version, since=since, since_state=since_state)
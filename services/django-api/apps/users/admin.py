@@ -4,6 +4,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.html import format_html
 from .models import User
+from .principal_cache import principal_cache
 
 
 @admin.register(User)
@@ -71,16 +72,24 @@ class UserAdmin(BaseUserAdmin):
     rating_display.short_description = 'Rating'
 
     # Custom actions
+    def _set_role(self, queryset, role):
+        user_ids = list(queryset.values_list('pk', flat=True))
+        updated = User.objects.filter(pk__in=user_ids).update(role=role)
+        # update() sends no post_save, so cached principals keep the old role otherwise
+        for user_id in user_ids:
+            principal_cache.invalidate_user(user_id)
+        return updated
+
     def make_worker(self, request, queryset):
         """Convert selected users to workers."""
-        queryset.update(role=User.UserRole.WORKER)
-        self.message_user(request, f"Updated {queryset.count()} users to worker role.")
+        updated = self._set_role(queryset, User.UserRole.WORKER)
+        self.message_user(request, f"Updated {updated} users to worker role.")
     make_worker.short_description = "Change role to Worker"
 
     def make_customer(self, request, queryset):
         """Convert selected users to customers."""
-        queryset.update(role=User.UserRole.CUSTOMER)
-        self.message_user(request, f"Updated {queryset.count()} users to customer role.")
+        updated = self._set_role(queryset, User.UserRole.CUSTOMER)
+        self.message_user(request, f"Updated {updated} users to customer role.")
     make_customer.short_description = "Change role to Customer"
 
     actions = ['make_worker', 'make_customer']
@@ -292,7 +292,7 @@ class CustomerProfileViewSet(viewsets.ViewSet):
         if address:
             # You might want to add an address field to User model
             pass
-        user.save()
+        user.save(update_fields=['latitude', 'longitude', 'updated_at', 'last_active'])
 
         return Response({'message': 'Location updated successfully'})
 
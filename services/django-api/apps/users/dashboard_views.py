@@ -85,7 +85,7 @@ def get_kpis(user, start_date, end_date):
     # Pickups data
     pending_pickups = PickupRequest.objects.filter(
         worker=user,
-        status__in=['assigned', 'in_progress']
+        status__in=PickupRequest.ACTIVE_STATUSES
     ).count()
 
     completed_pickups = PickupRequest.objects.filter(
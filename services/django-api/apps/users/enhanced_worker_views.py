@@ -16,6 +16,8 @@ import json
 
 from apps.bins.models import Bin, PickupRequest
 from apps.payments.models import WorkerEarnings, PaymentTransaction
+from apps.chat.history import InvalidCursor, history_page
+from apps.chat.views import MAX_PAGE_SIZE, _bounded_int
 from apps.chat.models import ChatRoom, Message, QuickReply
 from apps.reviews.models import Review
 from .serializers import UserSerializer
@@ -299,12 +301,13 @@ class WorkerDashboardViewSet(viewsets.ViewSet):
         """PATCH /api/users/worker/dashboard/update_status/ - Toggle worker availability."""
         worker = request.user
         is_available = request.data.get('is_available')
+        update_fields = []
 
         if is_available is not None:
             # Update worker availability (you may need to add this field to User model)
             if hasattr(worker, 'is_available'):
                 worker.is_available = bool(is_available)
-                worker.save()
+                update_fields.append('is_available')
 
         # Update location if provided
         latitude = request.data.get('latitude')
@@ -313,7 +316,11 @@ class WorkerDashboardViewSet(viewsets.ViewSet):
         if latitude is not None and longitude is not None:
             worker.latitude = float(latitude)
             worker.longitude = float(longitude)
-            worker.save()
+            update_fields += ['latitude', 'longitude']
+
+        if update_fields:
+            # Only the columns this request changed; the rest of the row may be newer
+            worker.save(update_fields=update_fields + ['updated_at', 'last_active'])
 
         return Response({
             'status': self.get_worker_status(worker),
@@ -626,9 +633,9 @@ class WorkerChatView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, room_id):
-        """GET /api/users/worker/chat/{room_id}/ - Get chat messages."""
+        """GET /api/users/worker/chat/{room_id}/?cursor=&limit= - Get chat messages."""
         try:
-            chat_room = ChatRoom.objects.get(
+            chat_room = ChatRoom.objects.select_related('owner', 'worker').get(
                 id=room_id,
                 worker=request.user,
                 is_active=True
@@ -639,24 +646,32 @@ class WorkerChatView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # Get messages
-        messages = Message.objects.filter(
-            chat_room=chat_room
-        ).select_related('sender').order_by('created_at')
+        # One page of messages, oldest first; ``next_cursor`` pages further back
+        try:
+            entries, next_cursor = history_page(
+                chat_room.pk,
+                cursor=request.query_params.get('cursor'),
+                limit=_bounded_int(request.query_params.get('limit'), 50, MAX_PAGE_SIZE),
+            )
+        except InvalidCursor as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        participants = {user.id: user for user in (chat_room.owner, chat_room.worker)}
 
         messages_data = []
-        for msg in messages:
+        for pk, msg in entries:
+            sender = participants.get(msg['sender_id'])
+            created_at = datetime.fromisoformat(msg['created_at'])
             messages_data.append({
-                'id': msg.id,
+                'id': pk,
                 'sender': {
-                    'id': msg.sender.id,
-                    'name': msg.sender.get_full_name() or msg.sender.username,
-                    'is_worker': msg.sender == request.user
+                    'id': msg['sender_id'],
+                    'name': (sender.get_full_name() or sender.username) if sender else None,
+                    'is_worker': msg['sender_id'] == request.user.id
                 },
-                'message': msg.content,
-                'image_url': msg.image.url if msg.image else None,
-                'created_at': msg.created_at.isoformat(),
-                'formatted_time': msg.created_at.strftime('%I:%M %p')
+                'message': msg['content'],
+                'image_url': msg['image_url'],
+                'created_at': msg['created_at'],
+                'formatted_time': created_at.strftime('%I:%M %p')
             })
 
         # Get quick replies
@@ -669,8 +684,8 @@ class WorkerChatView(APIView):
         return Response({
             'room_id': chat_room.id,
             'customer': {
-                'name': chat_room.customer.get_full_name() or chat_room.customer.username,
-                'phone': getattr(chat_room.customer, 'phone_number', None)
+                'name': chat_room.owner.get_full_name() or chat_room.owner.username,
+                'phone': getattr(chat_room.owner, 'phone_number', None)
             },
             'pickup': {
                 'id': chat_room.pickup_request.id,
@@ -678,6 +693,7 @@ class WorkerChatView(APIView):
                 'location': chat_room.pickup_request.bin.address if chat_room.pickup_request.bin else None
             },
             'messages': messages_data,
+            'next_cursor': next_cursor,
             'quick_replies': quick_replies_data
         })
 
@@ -0,0 +1,237 @@
+"""
+Write-behind store for live worker locations.
+
+GPS pings arrive every few seconds per worker. Saving the ``User`` row for
+each one rewrote every column, bumped ``updated_at``/``last_active`` and
+fired the ``worker_status_changed`` broadcast. Instead, pings update an
+in-process record that serves reads directly, and positions are persisted
+to ``User.latitude``/``longitude`` with a single ``bulk_update``:
+
+* every ``WORKER_LOCATION_PERSIST_INTERVAL`` seconds for workers that moved,
+* sooner when a worker has drifted ``WORKER_LOCATION_PERSIST_DISTANCE_M``
+  from the last persisted position.
+
+``bulk_update`` touches only the two location columns and sends no model
+signals. Location broadcasts to the worker's active pickups are limited to
+meaningful deltas: a move of at least ``WORKER_LOCATION_BROADCAST_DISTANCE_M``
+or a heartbeat every ``WORKER_LOCATION_BROADCAST_INTERVAL`` seconds.
+
+The store is per process; other processes read the persisted position,
+which is at most one persist interval old.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from apps.bins.geo import haversine_m
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WorkerLocation:
+    latitude: float
+    longitude: float
+    recorded_at: object
+    persisted: tuple = None
+    broadcast: tuple = None
+    broadcast_at: float = 0.0
+    dirty: bool = True
+
+    def as_dict(self):
+        return {
+            'lat': self.latitude,
+            'lng': self.longitude,
+            'timestamp': self.recorded_at.isoformat(),
+        }
+
+
+class WorkerLocationStore:
+    """Latest known position per worker, persisted in batches."""
+
+    def __init__(self, persist_interval=None, persist_distance_m=None,
+                 broadcast_distance_m=None, broadcast_interval=None):
+        self.persist_interval = persist_interval or getattr(
+            settings, 'WORKER_LOCATION_PERSIST_INTERVAL', 30.0)
+        self.persist_distance_m = persist_distance_m or getattr(
+            settings, 'WORKER_LOCATION_PERSIST_DISTANCE_M', 250.0)
+        self.broadcast_distance_m = broadcast_distance_m or getattr(
+            settings, 'WORKER_LOCATION_BROADCAST_DISTANCE_M', 15.0)
+        self.broadcast_interval = broadcast_interval or getattr(
+            settings, 'WORKER_LOCATION_BROADCAST_INTERVAL', 30.0)
+        self._locations = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def get(self, worker_id):
+        """Return ``{'lat', 'lng', 'timestamp'}`` for ``worker_id`` or ``None`` if unknown here."""
+        with self._lock:
+            location = self._locations.get(int(worker_id))
+            return location.as_dict() if location else None
+
+    def record(self, worker_id, latitude, longitude):
+        """
+        Store a GPS ping and return ``(location, should_broadcast)``.
+
+        Raises ``ValueError`` for non-numeric or out-of-range coordinates.
+        """
+        latitude, longitude = float(latitude), float(longitude)
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError('Coordinates out of range')
+
+        worker_id = int(worker_id)
+        now = time.monotonic()
+        with self._lock:
+            location = self._locations.get(worker_id)
+            if location is None:
+                location = WorkerLocation(latitude, longitude, timezone.now())
+                self._locations[worker_id] = location
+            else:
+                location.latitude, location.longitude = latitude, longitude
+                location.recorded_at = timezone.now()
+                location.dirty = True
+
+            position = (latitude, longitude)
+            should_broadcast = (
+                location.broadcast is None
+                or now - location.broadcast_at >= self.broadcast_interval
+                or haversine_m(*location.broadcast, *position) >= self.broadcast_distance_m
+            )
+            if should_broadcast:
+                location.broadcast, location.broadcast_at = position, now
+            persist_now = (
+                location.persisted is not None
+                and haversine_m(*location.persisted, *position) >= self.persist_distance_m
+            )
+            snapshot = location.as_dict()
+
+        self._ensure_flusher()
+        if persist_now:
+            self._wakeup.set()
+        return snapshot, should_broadcast
+
+    def flush(self):
+        """Persist every moved worker with one ``bulk_update``. Returns the number of rows written."""
+        from django.contrib.auth import get_user_model
+
+        User = get_user_model()
+        with self._flush_lock:
+            with self._lock:
+                dirty = [
+                    (worker_id, loc, (loc.latitude, loc.longitude))
+                    for worker_id, loc in self._locations.items() if loc.dirty
+                ]
+                for _, location, _ in dirty:
+                    location.dirty = False
+            if not dirty:
+                return 0
+
+            users = [
+                User(
+                    pk=worker_id,
+                    latitude=Decimal(f"{position[0]:.6f}"),
+                    longitude=Decimal(f"{position[1]:.6f}"),
+                )
+                for worker_id, _, position in dirty
+            ]
+            try:
+                User.objects.bulk_update(users, ['latitude', 'longitude'], batch_size=500)
+            except Exception:
+                with self._lock:
+                    for _, location, _ in dirty:
+                        location.dirty = True
+                raise
+            # Only what reached the database counts towards the persist distance
+            with self._lock:
+                for _, location, position in dirty:
+                    location.persisted = position
+            # bulk_update sends no signals; cached principals hold no location columns
+            return len(users)
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='klynaa-location-store', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.persist_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Worker location flush failed")
+
+
+def broadcast_location(worker_id, location):
+    """Send a worker's position to their active pickups and the pickups' owners."""
+    from django.contrib.auth import get_user_model
+    from apps.bins.models import PickupRequest
+    from apps.bins.websocket_signals import broadcast_customer_notification, broadcast_pickup_update
+
+    active_pickups = list(PickupRequest.objects.filter(
+        worker_id=worker_id, status__in=PickupRequest.ACTIVE_STATUSES
+    ).values_list('id', 'owner_id'))
+    if not active_pickups:
+        return
+
+    names = get_user_model().objects.filter(pk=worker_id).values_list('first_name', 'last_name').first()
+    worker_name = ' '.join(names).strip() if names else None
+    worker_location = {'lat': location['lat'], 'lng': location['lng']}
+
+    for pickup_id, owner_id in active_pickups:
+        broadcast_pickup_update(
+            pickup_id=pickup_id,
+            update_type='worker_location_update',
+            data={
+                'worker_id': worker_id,
+                'worker_location': worker_location,
+                'timestamp': location['timestamp'],
+                'worker_name': worker_name
+            }
+        )
+        broadcast_customer_notification(
+            customer_id=owner_id,
+            notification_type='worker_location',
+            data={
+                'pickup_id': pickup_id,
+                'worker_location': worker_location,
+                'message': "Worker location updated",
+                'timestamp': location['timestamp'],
+                'worker_name': worker_name
+            }
+        )
+
+
+def update_worker_location(worker_id, latitude, longitude):
+    """
+    Record a ping for ``worker_id`` and broadcast it if it is a meaningful change.
+
+    Returns ``(location, broadcast)`` where ``location`` is the stored dict.
+    Raises ``ValueError`` for invalid coordinates.
+    """
+    location, should_broadcast = location_store.record(worker_id, latitude, longitude)
+    if should_broadcast:
+        broadcast_location(int(worker_id), location)
+    return location, should_broadcast
+
+
+location_store = WorkerLocationStore()
+atexit.register(location_store.flush)
@@ -19,6 +19,9 @@ class User(AbstractUser):
         WORKER = 'worker', 'Worker'
         CUSTOMER = 'customer', 'Customer'
 
+    # Active pickups a worker can hold before no longer being offered new ones
+    MAX_PENDING_PICKUPS = 3
+
     # Contact and profile
     phone_number = models.CharField(max_length=20, unique=True, null=True, blank=True)
     role = models.CharField(max_length=20, choices=UserRole.choices, default=UserRole.CUSTOMER)
@@ -55,6 +58,13 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
 
+    def refresh_from_db(self, using=None, fields=None):
+        # Principals from apps.users.principal_cache defer every column but
+        # the permission fields; load all of them on the first deferred access
+        if fields is not None and getattr(self, '_load_deferred_together', False):
+            fields = set(fields) | self.get_deferred_fields()
+        super().refresh_from_db(using=using, fields=fields)
+
     @property
     def is_worker(self):
         return self.role == self.UserRole.WORKER
@@ -88,8 +98,8 @@ class User(AbstractUser):
 
     @property
     def can_accept_pickups(self):
-        """Check if worker can accept more pickups (max 3)."""
-        return self.is_worker and self.is_available and self.pending_pickups_count < 3
+        """Check if worker can accept more pickups (max MAX_PENDING_PICKUPS)."""
+        return self.is_worker and self.is_available and self.pending_pickups_count < self.MAX_PENDING_PICKUPS
 
     def update_rating(self):
         """Update user's rating based on all reviews."""
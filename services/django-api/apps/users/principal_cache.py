@@ -0,0 +1,105 @@
+"""
+Cached principal resolution for JWT authentication.
+
+Both the WebSocket ``JWTAuthMiddleware`` and DRF's ``JWTAuthentication``
+loaded the user row for every handshake and request. Principals are now
+cached per ``(user_id, token jti)``:
+
+* an entry holds only ``PRINCIPAL_FIELDS``, what authentication and
+  permission checks read (``role``, ``is_active``, ``is_staff``,
+  ``is_available``, ...). Each request gets its own ``User`` built from it
+  with the other columns deferred; the first access to any of them loads
+  the rest of the row in one query (see ``User.refresh_from_db``). A view
+  that saves ``request.user`` therefore never writes back cached values of
+  columns such as location or counters;
+* entries expire after ``PRINCIPAL_CACHE_TTL`` seconds;
+* saving or deleting a user, or ``invalidate_user`` after a signal-less
+  ``update()``, replaces the user's marker in the Django cache immediately
+  and again on commit. Entries remember the marker they were loaded under
+  and are reloaded once it changes, including a load that overlapped the
+  write. With a shared cache backend (``CACHE_BACKEND=redis``) this
+  reaches every process.
+
+Keying by ``jti`` as well as the user keeps one token's entry from serving
+another, so a token-level check added later is never bypassed.
+"""
+import logging
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.caching import LRUCache
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# Columns kept in the cache; everything else is loaded on first access
+PRINCIPAL_FIELDS = (
+    'id', 'password', 'username', 'role', 'is_active', 'is_staff', 'is_superuser', 'is_available',
+)
+
+
+class PrincipalCache:
+    """Short-lived cache of authenticated users keyed by ``(user_id, jti)``."""
+
+    def __init__(self, maxsize=None, ttl=None):
+        maxsize = maxsize or getattr(settings, 'PRINCIPAL_CACHE_SIZE', 10000)
+        self.ttl = ttl or getattr(settings, 'PRINCIPAL_CACHE_TTL', 60)
+        self._entries = LRUCache(maxsize=maxsize, ttl=self.ttl)
+
+    @staticmethod
+    def _attnames():
+        # Model.from_db expects the loaded values in concrete field order
+        return [field.attname for field in User._meta.concrete_fields if field.attname in PRINCIPAL_FIELDS]
+
+    @staticmethod
+    def _marker_key(user_id):
+        return f'principal-cache:{user_id}'
+
+    def get_user(self, user_id, jti=None):
+        """Return a fresh ``User`` for ``user_id``, or ``None`` if no such user exists."""
+        user_id = str(user_id)
+        attnames = self._attnames()
+        marker = cache.get(self._marker_key(user_id))
+        entry = self._entries.get((user_id, jti))
+        if entry is None or entry[0] != marker:
+            values = User.objects.filter(pk=user_id).values_list(*attnames).first()
+            if values is None:
+                return None
+            entry = (marker, values)
+            self._entries.set((user_id, jti), entry)
+        user = User.from_db(DEFAULT_DB_ALIAS, attnames, entry[1])
+        user._load_deferred_together = True
+        return user
+
+    def invalidate_user(self, user_id):
+        """Outdate every cached principal for ``user_id`` now and when the transaction commits."""
+        self._drop(user_id)
+        transaction.on_commit(lambda: self._drop(user_id))
+
+    def _drop(self, user_id):
+        # A new random marker never matches an entry, and an expired one (None)
+        # only matches entries loaded before any write, which expire first.
+        cache.set(self._marker_key(user_id), uuid.uuid4().hex, self.ttl)
+
+    def stats(self):
+        """Hit/miss counters for monitoring endpoints."""
+        return self._entries.stats()
+
+
+principal_cache = PrincipalCache()
+
+
+@receiver(post_save, sender=User, dispatch_uid='principal_cache_user_saved')
+@receiver(post_delete, sender=User, dispatch_uid='principal_cache_user_deleted')
+def invalidate_principal(sender, instance, update_fields=None, **kwargs):
+    # Saves limited to uncached columns (counters, location) leave entries valid
+    if update_fields is not None and not set(update_fields) & set(PRINCIPAL_FIELDS):
+        return
+    principal_cache.invalidate_user(instance.pk)
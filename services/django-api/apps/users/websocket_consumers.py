@@ -1,4 +1,3 @@
-import json
 import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
@@ -6,17 +5,61 @@ from django.contrib.auth import get_user_model
 from django.contrib.gis.geos import Point
 from apps.bins.models import PickupRequest
 from apps.bins.pickup_scheduling import PickupSchedulingService
+from apps.bins.geo import covering_cells, geohash_encode, haversine_m
+from apps.bins.websocket_signals import geo_group_name, geo_subscription_precisions
+from apps.framing import CompactFramingMixin
+from apps.send_queue import BoundedSendMixin
+from apps.snapshots import send_initial_snapshot, snapshot_cache
+from apps.users.location_store import location_store, update_worker_location
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
 
-class WorkerConsumer(AsyncWebsocketConsumer):
+def load_worker_snapshot(worker_id):
+    """Dashboard payload for ``WorkerConsumer``, or ``None`` if ``worker_id`` is not a worker"""
+    try:
+        worker = User.objects.get(id=worker_id, role='worker')
+    except User.DoesNotExist:
+        return None
+
+    # Get active pickups
+    active_pickups = PickupRequest.objects.filter(
+        worker=worker,
+        status__in=PickupRequest.ACTIVE_STATUSES
+    ).count()
+
+    return {
+        'id': worker.id,
+        'name': f"{worker.first_name} {worker.last_name}",
+        'email': worker.email,
+        'phone': worker.phone_number,
+        'is_active': worker.is_available,
+        'current_location': {
+            'lat': float(worker.latitude),
+            'lng': float(worker.longitude)
+        } if worker.latitude and worker.longitude else None,
+        'active_pickups': active_pickups,
+        'service_radius': worker.service_radius_km
+    }
+
+
+class WorkerConsumer(BoundedSendMixin, CompactFramingMixin, AsyncWebsocketConsumer):
     """
     WebSocket consumer for worker dashboard with real-time updates.
     Handles pickup assignments, route updates, and location tracking.
+
+    The consumer also joins the geohash cell groups covering the worker's
+    service radius so newly opened pickups nearby are pushed to it; the
+    membership follows the worker as they move.
     """
 
+    geo_groups = frozenset()
+    geo_anchor = None
+    location = None
+    service_radius_m = 5000
+    is_available = True
+
     async def connect(self):
         self.worker_id = self.scope['url_route']['kwargs']['worker_id']
         self.room_group_name = f'worker_{self.worker_id}'
@@ -32,10 +75,11 @@ class WorkerConsumer(AsyncWebsocketConsumer):
         # Send initial worker data
         worker_data = await self.get_worker_data()
         if worker_data:
-            await self.send(text_data=json.dumps({
-                'type': 'worker_status',
-                'data': worker_data
-            }))
+            await send_initial_snapshot(self, 'worker_status', 'worker', 'worker', self.worker_id, worker_data)
+            self.service_radius_m = (worker_data.get('service_radius') or 5) * 1000
+            self.is_available = worker_data.get('is_active', True)
+            if worker_data.get('current_location'):
+                await self.update_geo_subscriptions(worker_data['current_location'])
 
         logger.info(f"WebSocket connected for worker {self.worker_id}")
 
@@ -45,22 +89,28 @@ class WorkerConsumer(AsyncWebsocketConsumer):
             self.room_group_name,
             self.channel_name
         )
+        for group in self.geo_groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
         logger.info(f"WebSocket disconnected for worker {self.worker_id}")
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """Handle incoming WebSocket messages"""
         try:
-            text_data_json = json.loads(text_data)
+            text_data_json = self.decode_frame(text_data, bytes_data)
             message_type = text_data_json.get('type')
             data = text_data_json.get('data', {})
 
             if message_type == 'update_location':
                 # Update worker location
-                await self.update_worker_location(data)
+                result = await self.update_worker_location(data)
+                if result:
+                    await self.update_geo_subscriptions(result['location'])
 
             elif message_type == 'update_status':
                 # Update worker availability status
-                await self.update_worker_status(data)
+                result = await self.update_worker_status(data)
+                if result:
+                    self.is_available = result['is_active']
 
             elif message_type == 'accept_pickup':
                 # Accept a pickup assignment
@@ -73,96 +123,103 @@ class WorkerConsumer(AsyncWebsocketConsumer):
             elif message_type == 'get_assignments':
                 # Get current pickup assignments
                 assignments = await self.get_pickup_assignments()
-                await self.send(text_data=json.dumps({
+                await self.send_frame({
                     'type': 'assignments',
                     'data': assignments
-                }))
+                })
 
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON received: {text_data}")
+        except ValueError:
+            logger.error(f"Invalid frame received: {text_data or bytes_data!r}")
         except Exception as e:
             logger.error(f"Error handling worker WebSocket message: {e}")
 
     # Receive message from room group
     async def pickup_assignment(self, event):
         """Send new pickup assignment to worker"""
-        await self.send(text_data=json.dumps({
-            'type': 'new_assignment',
-            'data': event['data']
-        }))
+        data = event['data']
+        if data.get('pickup_id') is not None:
+            await self.send_state('new_assignment', 'assignment', data['pickup_id'], data)
+        else:
+            await self.send_frame({
+                'type': 'new_assignment',
+                'data': data
+            })
 
     async def route_update(self, event):
         """Send route optimization update to worker"""
-        await self.send(text_data=json.dumps({
-            'type': 'route_update',
-            'data': event['data']
-        }))
+        await self.send_state('route_update', 'route', self.worker_id, event['data'])
 
     async def pickup_cancelled(self, event):
         """Notify worker of pickup cancellation"""
-        await self.send(text_data=json.dumps({
+        await self.send_frame({
             'type': 'pickup_cancelled',
             'data': event['data']
-        }))
-
-    @database_sync_to_async
-    def get_worker_data(self):
-        """Get current worker data from database"""
+        })
+
+    async def nearby_pickup(self, event):
+        """Offer a newly opened pickup published to one of the worker's cells"""
+        data = event['data']
+        if not self.is_available or self.location is None:
+            return
+        # Cells cover the radius' bounding box; apply the exact distance here
+        distance = haversine_m(self.location['lat'], self.location['lng'], data['lat'], data['lng'])
+        if distance > self.service_radius_m:
+            return
+        await self.send_frame({
+            'type': 'nearby_pickup',
+            'data': {**data, 'distance_m': round(distance)}
+        })
+
+    async def update_geo_subscriptions(self, location):
+        """Join the cells covering the service radius around ``location``, leaving stale ones"""
+        self.location = {'lat': float(location['lat']), 'lng': float(location['lng'])}
+        precisions = geo_subscription_precisions()
+        # Membership only changes when the worker crosses into another fine cell
+        anchor = geohash_encode(self.location['lat'], self.location['lng'], max(precisions))
+        if anchor == self.geo_anchor:
+            return
+        self.geo_anchor = anchor
+
+        _, cells = covering_cells(
+            self.location['lat'], self.location['lng'], self.service_radius_m, precisions=precisions
+        )
+        groups = {geo_group_name(cell) for cell in cells}
+        for group in groups - self.geo_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        for group in self.geo_groups - groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        self.geo_groups = frozenset(groups)
+
+    async def get_worker_data(self):
+        """Current worker data from the shared snapshot cache, with the live position"""
         try:
-            worker = User.objects.get(id=self.worker_id, role='worker')
-
-            # Get active pickups
-            active_pickups = PickupRequest.objects.filter(
-                worker=worker,
-                status__in=['assigned', 'in_progress']
-            ).count()
-
-            return {
-                'id': worker.id,
-                'name': f"{worker.first_name} {worker.last_name}",
-                'email': worker.email,
-                'phone': worker.phone_number,
-                'is_active': worker.is_available,
-                'current_location': {
-                    'lat': worker.latitude,
-                    'lng': worker.longitude
-                } if worker.latitude and worker.longitude else None,
-                'active_pickups': active_pickups,
-                'service_radius': worker.service_radius_km
-            }
-        except User.DoesNotExist:
-            return None
+            worker_data = await snapshot_cache.load('worker', self.worker_id, load_worker_snapshot)
         except Exception as e:
             logger.error(f"Error getting worker data: {e}")
             return None
 
+        live_location = worker_data and location_store.get(worker_data['id'])
+        if live_location:
+            worker_data = {**worker_data, 'current_location': live_location}
+        return worker_data
+
     @database_sync_to_async
     def update_worker_location(self, location_data):
-        """Update worker's current location"""
+        """Record the worker's current location in the write-behind store"""
         try:
-            worker = User.objects.get(id=self.worker_id, role='worker')
-            lat = float(location_data.get('lat', 0))
-            lng = float(location_data.get('lng', 0))
-
-            worker.latitude = lat
-            worker.longitude = lng
-            worker.save()
-
-            # Broadcast location update to relevant pickup consumers
-            active_pickups = PickupRequest.objects.filter(
-                worker=worker,
-                status__in=['assigned', 'in_progress']
+            # Role is checked once per connection rather than on every ping
+            if not hasattr(self, '_is_worker'):
+                self._is_worker = User.objects.filter(id=self.worker_id, role='worker').exists()
+            if not self._is_worker:
+                return None
+
+            location, _ = update_worker_location(
+                self.worker_id, location_data.get('lat', 0), location_data.get('lng', 0)
             )
-
-            for pickup in active_pickups:
-                # Send location update to pickup consumers
-                pickup_group = f'pickup_{pickup.id}'
-                # Note: This would be handled by the group send in a real implementation
-
             return {
-                'worker_id': worker.id,
-                'location': {'lat': lat, 'lng': lng},
-                'timestamp': worker.updated_at.isoformat()
+                'worker_id': int(self.worker_id),
+                'location': {'lat': location['lat'], 'lng': location['lng']},
+                'timestamp': location['timestamp']
             }
         except Exception as e:
             logger.error(f"Error updating worker location: {e}")
@@ -192,7 +249,7 @@ class WorkerConsumer(AsyncWebsocketConsumer):
             pickup_id = assignment_data.get('pickup_id')
             pickup = PickupRequest.objects.get(id=pickup_id)
 
-            if pickup.worker_id == self.worker_id and pickup.status == 'assigned':
+            if pickup.worker_id == self.worker_id and pickup.status == PickupRequest.PickupStatus.ACCEPTED:
                 pickup.status = 'in_progress'
                 pickup.save()
 
@@ -232,7 +289,7 @@ class WorkerConsumer(AsyncWebsocketConsumer):
         try:
             assignments = PickupRequest.objects.filter(
                 worker_id=self.worker_id,
-                status__in=['assigned', 'in_progress']
+                status__in=PickupRequest.ACTIVE_STATUSES
             ).select_related('customer', 'bin').order_by('scheduled_time')
 
             assignment_list = []
@@ -4,6 +4,7 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from apps.bins.models import PickupRequest, PickupProof, Bin
 from apps.payments.models import WorkerEarnings, PaymentTransaction
+from apps.chat import read_state
 from apps.chat.models import ChatRoom, Message, QuickReply
 from apps.reviews.models import Review
 
@@ -78,7 +79,8 @@ class PickupTaskDetailSerializer(PickupTaskSerializer):
         return [{
             'id': proof.id,
             'type': proof.type,
-            'image_url': proof.image.url if proof.image else None,
+            'image_url': (proof.display_image or proof.image).url if proof.image else None,
+            'thumbnail_url': (proof.thumbnail or proof.image).url if proof.image else None,
             'status': proof.status,
             'created_at': proof.created_at.isoformat()
         } for proof in proofs]
@@ -134,6 +136,7 @@ class MessageSerializer(serializers.ModelSerializer):
 
     sender_name = serializers.CharField(source='sender.get_full_name', read_only=True)
     is_own_message = serializers.SerializerMethodField()
+    is_read = serializers.SerializerMethodField()
 
     class Meta:
         model = Message
@@ -148,6 +151,14 @@ class MessageSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         return request and obj.sender == request.user
 
+    def get_is_read(self, obj):
+        """Derived from the recipient's read watermark (``read_watermarks`` in the context)."""
+        watermarks = self.context.get('read_watermarks')
+        if not watermarks:
+            return False
+        room = {'owner_id': obj.chat_room.owner_id, 'worker_id': obj.chat_room.worker_id}
+        return read_state.message_is_read(room, watermarks, obj.sender_id, obj.created_at, obj.pk)
+
     def create(self, validated_data):
         """Create message with sender from request."""
         validated_data['sender'] = self.context['request'].user
@@ -12,6 +12,7 @@ from decimal import Decimal
 
 from apps.bins.models import PickupRequest, PickupProof
 from apps.payments.models import WorkerEarnings
+from apps.chat import read_state
 from apps.chat.models import ChatRoom, Message, QuickReply
 from .worker_serializers import (
     WorkerProfileSerializer, PickupTaskSerializer, PickupTaskDetailSerializer,
@@ -355,10 +356,18 @@ class ChatMessageView(generics.ListCreateAPIView):
             if user not in [chat_room.owner, chat_room.worker]:
                 return Message.objects.none()
 
-            return chat_room.messages.all().order_by('created_at')
+            self.chat_room = chat_room
+            return chat_room.messages.select_related('chat_room', 'sender').order_by('created_at')
         except (PickupRequest.DoesNotExist, ChatRoom.DoesNotExist):
             return Message.objects.none()
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        chat_room = getattr(self, 'chat_room', None)
+        if chat_room is not None:
+            context['read_watermarks'] = read_state.room_watermarks(chat_room.pk)
+        return context
+
     def perform_create(self, serializer):
         task_id = self.kwargs['task_id']
         pickup = PickupRequest.objects.get(id=task_id)
@@ -0,0 +1,387 @@
+"""
+In-process WebSocket benchmark harness.
+
+Drives ``config.asgi.application`` through channels'
+``WebsocketCommunicator`` - the full routing, JWT middleware and consumers,
+on whatever ``CHANNEL_LAYERS`` is configured - without a running server.
+It simulates workers, customers (each with a pickup stream) and chat pairs,
+then measures per consumer:
+
+* connect latency (handshake until the socket is accepted);
+* fan-out latency from ``group_send`` (or the chat sender) to each client
+  receiving the frame, as p50/p95/p99;
+* delivered frames per wall second and per CPU second of this process,
+  i.e. messages per second per core;
+* average frame size, to compare JSON and msgpack framing.
+
+Benchmark messages carry ``bench_seq``/``bench_sent`` markers so clients
+can pick them out of the other traffic the consumers produce. With
+``ack=True`` clients acknowledge state frames, so streams switch to delta
+encoding after the first round.
+
+Fixture users, bins, pickups and chat rooms are created with
+``bulk_create`` (no model signals fire) under a per-run username prefix and
+removed afterwards.
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from decimal import Decimal
+
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from apps.bins.geo import geohash_encode
+from apps.framing import SUBPROTOCOL_MSGPACK
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack ships with channels_redis
+    msgpack = None
+
+logger = logging.getLogger(__name__)
+
+CENTER = (40.7128, -74.0060)
+# Workers are spread within ~1 km of CENTER, inside their 5 km service radius
+WORKER_SPREAD_DEG = 0.008
+
+
+def percentiles(samples):
+    """Summary of latency ``samples`` (seconds) in milliseconds, nearest-rank percentiles."""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+        'p50_ms': round(rank(50), 3),
+        'p95_ms': round(rank(95), 3),
+        'p99_ms': round(rank(99), 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def bench_marker(frame):
+    """Return ``(seq, sent)`` for a benchmark frame, or ``None`` for other traffic."""
+    for payload in (frame.get('data'), (frame.get('delta') or {}).get('set')):
+        if isinstance(payload, dict) and 'bench_seq' in payload:
+            return payload['bench_seq'], payload.get('bench_sent')
+    # Chat messages carry the sequence number in their text
+    content = (frame.get('message') or {}).get('content') if isinstance(frame.get('message'), dict) else None
+    if isinstance(content, str) and content.startswith('bench '):
+        return int(content[6:]), None
+    return None
+
+
+class Client:
+    """One simulated WebSocket connection."""
+
+    def __init__(self, kind, path, group, subprotocols, ack):
+        self.kind = kind
+        self.group = group
+        self.ack = ack
+        self.communicator = None
+        self._path = path
+        self._subprotocols = subprotocols
+        self.connected = False
+        self.frames = 0
+        self.bytes = 0
+
+    async def connect(self, application, timeout):
+        self.communicator = WebsocketCommunicator(application, self._path, subprotocols=self._subprotocols)
+        started = time.perf_counter()
+        self.connected, _ = await self.communicator.connect(timeout=timeout)
+        return time.perf_counter() - started
+
+    async def disconnect(self):
+        if self.connected:
+            self.connected = False
+            await self.communicator.disconnect()
+
+    async def send(self, payload):
+        if self._subprotocols:
+            await self.communicator.send_to(bytes_data=msgpack.packb(payload, use_bin_type=True))
+        else:
+            await self.communicator.send_to(text_data=json.dumps(payload))
+
+    async def receive(self, timeout):
+        raw = await self.communicator.receive_from(timeout=timeout)
+        self.frames += 1
+        self.bytes += len(raw)
+        frame = msgpack.unpackb(raw, raw=False) if isinstance(raw, bytes) else json.loads(raw)
+        if self.ack and 'stream' in frame and 'v' in frame:
+            await self.send({'type': 'ack', 'stream': frame['stream'], 'key': frame['key'], 'v': frame['v']})
+        return frame
+
+    async def drain(self):
+        """Discard queued frames without waiting on an empty queue (a timeout closes the socket)."""
+        while self.connected and not await self.communicator.receive_nothing(timeout=0.05):
+            await self.receive(timeout=1)
+
+    async def wait_for(self, seq, timeout):
+        """Wait for benchmark frame ``seq``; returns its receive time or ``None`` if it never came."""
+        try:
+            while True:
+                frame = await self.receive(timeout)
+                marker = bench_marker(frame)
+                if marker is not None and marker[0] == seq:
+                    return time.perf_counter(), marker[1]
+        except (asyncio.TimeoutError, AssertionError):
+            # The communicator cancels the application on timeout; a close frame fails the assertion
+            self.connected = False
+            return None
+
+
+class WebSocketBenchmark:
+    """Build fixtures, run every scenario and return the results as a dict."""
+
+    def __init__(self, workers=50, customers=50, chat_pairs=25, rounds=20,
+                 framing='json', ack=False, timeout=5.0, application=None):
+        if framing == 'msgpack' and msgpack is None:
+            raise ValueError('msgpack framing needs the msgpack package')
+        self.workers = workers
+        self.customers = customers
+        self.chat_pairs = chat_pairs
+        self.rounds = rounds
+        self.framing = framing
+        self.ack = ack
+        self.timeout = timeout
+        self.application = application
+        self.prefix = f'wsbench-{uuid.uuid4().hex[:8]}'
+        self.fixtures = {}
+
+    # Fixtures
+
+    def create_fixtures(self):
+        from apps.bins.models import Bin, PickupRequest
+        from apps.chat.models import ChatRoom
+
+        User = get_user_model()
+        customer_count = max(self.customers, self.chat_pairs)
+        worker_count = max(self.workers, self.chat_pairs)
+
+        users = []
+        for i in range(worker_count):
+            offset = WORKER_SPREAD_DEG * ((i % 17) / 8 - 1)
+            users.append(User(
+                username=f'{self.prefix}-w{i}', email=f'{self.prefix}-w{i}@klynaa.test',
+                role=User.UserRole.WORKER, is_available=True, service_radius_km=5,
+                latitude=Decimal(f'{CENTER[0] + offset:.6f}'),
+                longitude=Decimal(f'{CENTER[1] - offset:.6f}'),
+            ))
+        users.extend(
+            User(username=f'{self.prefix}-c{i}', email=f'{self.prefix}-c{i}@klynaa.test',
+                 role=User.UserRole.CUSTOMER)
+            for i in range(customer_count)
+        )
+        User.objects.bulk_create(users, batch_size=500)
+        by_name = dict(User.objects.filter(username__startswith=f'{self.prefix}-').values_list('username', 'pk'))
+        workers = [by_name[f'{self.prefix}-w{i}'] for i in range(worker_count)]
+        customers = [by_name[f'{self.prefix}-c{i}'] for i in range(customer_count)]
+
+        Bin.objects.bulk_create([
+            Bin(owner_id=customer_id, bin_id=f'{self.prefix[-8:]}-{i}',
+                latitude=Decimal(f'{CENTER[0]:.6f}'), longitude=Decimal(f'{CENTER[1]:.6f}'))
+            for i, customer_id in enumerate(customers)
+        ], batch_size=500)
+        bins = dict(Bin.objects.filter(owner_id__in=customers).values_list('owner_id', 'pk'))
+        PickupRequest.objects.bulk_create([
+            PickupRequest(
+                bin_id=bins[customer_id], owner_id=customer_id,
+                worker_id=workers[i] if i < self.chat_pairs else None,
+                status=PickupRequest.PickupStatus.ACCEPTED if i < self.chat_pairs else PickupRequest.PickupStatus.OPEN,
+            )
+            for i, customer_id in enumerate(customers)
+        ], batch_size=500)
+        pickups = dict(PickupRequest.objects.filter(owner_id__in=customers).values_list('owner_id', 'pk'))
+        ChatRoom.objects.bulk_create([
+            ChatRoom(pickup_request_id=pickups[customers[i]], owner_id=customers[i], worker_id=workers[i])
+            for i in range(self.chat_pairs)
+        ], batch_size=500)
+        rooms = dict(ChatRoom.objects.filter(owner_id__in=customers).values_list('owner_id', 'room_id'))
+
+        self.fixtures = {
+            'workers': workers,
+            'customers': customers,
+            'pickups': [pickups[customer_id] for customer_id in customers],
+            'rooms': [(rooms[customers[i]], customers[i], workers[i]) for i in range(self.chat_pairs)],
+        }
+
+    def delete_fixtures(self):
+        # Bins, pickups, chat rooms and messages cascade from their owners
+        get_user_model().objects.filter(username__startswith=f'{self.prefix}-').delete()
+
+    def _token(self, user_id):
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        User = get_user_model()
+        return str(AccessToken.for_user(User(pk=user_id)))
+
+    def build_clients(self):
+        subprotocols = [SUBPROTOCOL_MSGPACK] if self.framing == 'msgpack' else None
+        fixtures = self.fixtures
+        clients = {'worker': [], 'customer': [], 'pickup': [], 'chat': []}
+
+        for worker_id in fixtures['workers'][:self.workers]:
+            clients['worker'].append(Client(
+                'worker', f'/ws/worker/{worker_id}/', f'worker_{worker_id}', subprotocols, self.ack))
+        for customer_id, pickup_id in list(zip(fixtures['customers'], fixtures['pickups']))[:self.customers]:
+            clients['customer'].append(Client(
+                'customer', f'/ws/customer/{customer_id}/', f'customer_{customer_id}', subprotocols, self.ack))
+            clients['pickup'].append(Client(
+                'pickup', f'/ws/pickup/{pickup_id}/?token={self._token(customer_id)}',
+                f'pickup_{pickup_id}', subprotocols, self.ack))
+        for room_id, customer_id, worker_id in fixtures['rooms']:
+            for user_id in (customer_id, worker_id):
+                clients['chat'].append(Client(
+                    'chat', f'/ws/chat/{room_id}/?token={self._token(user_id)}',
+                    f'chat_{room_id}', subprotocols, self.ack))
+        return clients
+
+    # Scenarios
+
+    async def connect_all(self, clients):
+        results = {}
+        for kind, group in clients.items():
+            latencies = await asyncio.gather(*(c.connect(self.application, self.timeout) for c in group))
+            results[kind] = {
+                'connections': len(group),
+                'failed': sum(not c.connected for c in group),
+                'latency': percentiles([lat for c, lat in zip(group, latencies) if c.connected]),
+            }
+        # Initial state and presence frames are not part of the measurement
+        await asyncio.gather(*(c.drain() for group in clients.values() for c in group))
+        return results
+
+    async def group_rounds(self, clients, event_type, build_data, groups=None):
+        """
+        Send ``rounds`` events to each client's group (or to ``groups``) and
+        time delivery to every client.
+        """
+        layer = get_channel_layer()
+        targets = groups if groups is not None else sorted({c.group for c in clients})
+        samples, missed = [], 0
+        frames_before = sum(c.frames for c in clients)
+        bytes_before = sum(c.bytes for c in clients)
+        wall, cpu = time.perf_counter(), time.process_time()
+
+        for seq in range(self.rounds):
+            live = [c for c in clients if c.connected]
+            waiters = asyncio.gather(*(c.wait_for(seq, self.timeout) for c in live))
+            sent = time.perf_counter()
+            data = {**build_data(seq), 'bench_seq': seq, 'bench_sent': sent}
+            await asyncio.gather(*(layer.group_send(group, {'type': event_type, 'data': data}) for group in targets))
+            for result in await waiters:
+                if result is None:
+                    missed += 1
+                else:
+                    samples.append(result[0] - sent)
+
+        return self._summary(clients, samples, missed, frames_before, bytes_before, wall, cpu)
+
+    async def chat_rounds(self, clients):
+        """Each pair's first client sends a message per round; time delivery to the peer."""
+        samples, missed = [], 0
+        pairs = [(clients[i], clients[i + 1]) for i in range(0, len(clients), 2)]
+        frames_before = sum(c.frames for c in clients)
+        bytes_before = sum(c.bytes for c in clients)
+        wall, cpu = time.perf_counter(), time.process_time()
+
+        for seq in range(self.rounds):
+            live = [(sender, peer) for sender, peer in pairs if sender.connected and peer.connected]
+            sent = time.perf_counter()
+            results = await asyncio.gather(*(
+                self._chat_exchange(sender, peer, seq) for sender, peer in live
+            ))
+            for result in results:
+                if result is None:
+                    missed += 1
+                else:
+                    samples.append(result[0] - sent)
+            # The sender also receives its own message; keep its queue short
+            await asyncio.gather(*(sender.drain() for sender, _ in live))
+
+        return self._summary(clients, samples, missed, frames_before, bytes_before, wall, cpu)
+
+    async def _chat_exchange(self, sender, peer, seq):
+        waiter = asyncio.ensure_future(peer.wait_for(seq, self.timeout))
+        await sender.send({'action': 'send_message', 'message': f'bench {seq}',
+                           'client_message_id': f'{self.prefix}-{seq}'})
+        return await waiter
+
+    def _summary(self, clients, samples, missed, frames_before, bytes_before, wall, cpu):
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        frames = sum(c.frames for c in clients) - frames_before
+        size = sum(c.bytes for c in clients) - bytes_before
+        return {
+            'clients': len(clients),
+            'delivered': len(samples),
+            'missed': missed,
+            'latency': percentiles(samples),
+            'frames': frames,
+            'avg_frame_bytes': round(size / frames, 1) if frames else None,
+            'wall_seconds': round(wall, 3),
+            'cpu_seconds': round(cpu, 3),
+            'messages_per_second': round(frames / wall, 1) if wall else None,
+            'messages_per_cpu_second': round(frames / cpu, 1) if cpu else None,
+        }
+
+    async def run_scenarios(self):
+        if self.application is None:
+            from config.asgi import application
+            self.application = application
+
+        clients = self.build_clients()
+        results = {'connect': await self.connect_all(clients), 'fanout': {}}
+        fanout = results['fanout']
+
+        if clients['worker']:
+            fanout['worker'] = await self.group_rounds(clients['worker'], 'route_update', lambda seq: {})
+            # One event per geohash precision reaches every worker around CENTER
+            from apps.bins.websocket_signals import geo_group_name, geo_subscription_precisions
+
+            cells = [geo_group_name(geohash_encode(*CENTER, precision)) for precision in geo_subscription_precisions()]
+            fanout['worker_nearby'] = await self.group_rounds(
+                clients['worker'], 'nearby_pickup',
+                lambda seq: {'pickup_id': seq, 'lat': CENTER[0], 'lng': CENTER[1]},
+                groups=cells,
+            )
+        if clients['customer']:
+            fanout['customer'] = await self.group_rounds(
+                clients['customer'], 'pickup_notification',
+                lambda seq: {'notification_type': 'worker_location', 'pickup_id': 0,
+                             'worker_location': {'lat': CENTER[0], 'lng': CENTER[1] + seq / 1e5}},
+            )
+            fanout['pickup'] = await self.group_rounds(
+                clients['pickup'], 'pickup_update',
+                lambda seq: {'update_type': 'worker_location_update', 'worker_id': 0,
+                             'worker_location': {'lat': CENTER[0], 'lng': CENTER[1] + seq / 1e5}},
+            )
+        if clients['chat']:
+            fanout['chat'] = await self.chat_rounds(clients['chat'])
+
+        await asyncio.gather(*(c.disconnect() for group in clients.values() for c in group))
+        return results
+
+    def environment(self):
+        layer = settings.CHANNEL_LAYERS.get('default', {}).get('BACKEND')
+        return {
+            'channel_layer': layer,
+            'framing': self.framing,
+            'delta_acks': self.ack,
+            'workers': self.workers,
+            'customers': self.customers,
+            'chat_pairs': self.chat_pairs,
+            'rounds': self.rounds,
+            'cpu_count': os.cpu_count(),
+        }
@@ -55,6 +55,7 @@ LOCAL_APPS = [
     'apps.payments',
     'apps.notifications',
     'apps.chat',
+    'apps.search',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -200,7 +201,7 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "apps.users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": int(os.getenv("DRF_PAGE_SIZE", 25)),
@@ -231,3 +232,114 @@ else:
             'BACKEND': 'channels.layers.InMemoryChannelLayer'
         }
     }
+
+# Django cache. Per-process by default; redis shares invalidation markers
+# (e.g. apps/users/principal_cache.py) across processes
+if os.getenv('CACHE_BACKEND', 'locmem') == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+
+# Background jobs (see apps/background.py)
+BACKGROUND_JOBS_EAGER = os.getenv('BACKGROUND_JOBS_EAGER', '0') == '1'
+BACKGROUND_POOL_SIZES = {
+    'qr_codes': int(os.getenv('QR_CODE_WORKERS', 2)),
+    'proofs': int(os.getenv('PROOF_PROCESSING_WORKERS', 2)),
+    # One pool per notification channel; its size is that provider's concurrency limit
+    'notify_push': int(os.getenv('NOTIFICATION_PUSH_WORKERS', 2)),
+    'notify_email': int(os.getenv('NOTIFICATION_EMAIL_WORKERS', 2)),
+    'notify_sms': int(os.getenv('NOTIFICATION_SMS_WORKERS', 1)),
+    'notify_in_app': int(os.getenv('NOTIFICATION_IN_APP_WORKERS', 2)),
+}
+
+# Pickup proof processing (see apps/bins/proof_processing.py)
+PROOF_THUMBNAIL_SIZE = int(os.getenv('PROOF_THUMBNAIL_SIZE', 320))
+PROOF_DISPLAY_SIZE = int(os.getenv('PROOF_DISPLAY_SIZE', 1280))
+PROOF_GEOFENCE_RADIUS_M = float(os.getenv('PROOF_GEOFENCE_RADIUS_M', 100))
+# Max Hamming distance (of 64 bits) at which two proof photos count as duplicates
+PROOF_DUPLICATE_MAX_DISTANCE = int(os.getenv('PROOF_DUPLICATE_MAX_DISTANCE', 6))
+# How long an admin's claim on a proof in the verification queue lasts
+PROOF_CLAIM_LEASE_SECONDS = int(os.getenv('PROOF_CLAIM_LEASE_SECONDS', 300))
+
+# QR scan resolution cache (see apps/bins/qr_cache.py)
+QR_RESOLUTION_CACHE_SIZE = int(os.getenv('QR_RESOLUTION_CACHE_SIZE', 10000))
+QR_RESOLUTION_CACHE_TTL = int(os.getenv('QR_RESOLUTION_CACHE_TTL', 300))
+
+# Serverless log retention (see apps/bins/retention.py)
+LOG_RETENTION_CHUNK_SIZE = int(os.getenv('LOG_RETENTION_CHUNK_SIZE', 1000))
+LOG_ARCHIVE_ROOT = os.getenv('LOG_ARCHIVE_ROOT', (BASE_DIR / 'archives').as_posix())
+
+# Buffered serverless log writes (see apps/bins/log_writer.py); 0 disables buffering
+SERVERLESS_LOG_BATCH_SIZE = int(os.getenv('SERVERLESS_LOG_BATCH_SIZE', 500))
+SERVERLESS_LOG_FLUSH_INTERVAL = float(os.getenv('SERVERLESS_LOG_FLUSH_INTERVAL', 2.0))
+
+# Coalescing WebSocket broadcaster (see apps/broadcaster.py)
+WEBSOCKET_BROADCAST_WINDOW = float(os.getenv('WEBSOCKET_BROADCAST_WINDOW', 0.1))
+WEBSOCKET_BROADCAST_BATCH_SIZE = int(os.getenv('WEBSOCKET_BROADCAST_BATCH_SIZE', 100))
+
+# Write-behind worker location store (see apps/users/location_store.py)
+WORKER_LOCATION_PERSIST_INTERVAL = float(os.getenv('WORKER_LOCATION_PERSIST_INTERVAL', 30))
+WORKER_LOCATION_PERSIST_DISTANCE_M = float(os.getenv('WORKER_LOCATION_PERSIST_DISTANCE_M', 250))
+WORKER_LOCATION_BROADCAST_DISTANCE_M = float(os.getenv('WORKER_LOCATION_BROADCAST_DISTANCE_M', 15))
+WORKER_LOCATION_BROADCAST_INTERVAL = float(os.getenv('WORKER_LOCATION_BROADCAST_INTERVAL', 30))
+
+# Geohash precisions for "pickups near me" WebSocket subscriptions
+GEO_SUBSCRIPTION_PRECISIONS = tuple(
+    int(precision) for precision in os.getenv('GEO_SUBSCRIPTION_PRECISIONS', '4,5,6').split(',')
+)
+
+# Connect-time WebSocket snapshots (see apps/snapshots.py)
+SNAPSHOT_CACHE_SIZE = int(os.getenv('SNAPSHOT_CACHE_SIZE', 10000))
+SNAPSHOT_CACHE_TTL = int(os.getenv('SNAPSHOT_CACHE_TTL', 30))
+SNAPSHOT_HISTORY = int(os.getenv('SNAPSHOT_HISTORY', 4))
+
+# Authenticated principal cache for JWT auth (see apps/users/principal_cache.py)
+PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', 10000))
+PRINCIPAL_CACHE_TTL = int(os.getenv('PRINCIPAL_CACHE_TTL', 60))
+
+# Per-connection WebSocket send queues (see apps/send_queue.py)
+WEBSOCKET_SEND_QUEUE_SIZE = int(os.getenv('WEBSOCKET_SEND_QUEUE_SIZE', 256))
+WEBSOCKET_SEND_MAX_LAG = float(os.getenv('WEBSOCKET_SEND_MAX_LAG', 10.0))
+
+# Recent chat messages kept in memory per active room (see apps/chat/history.py)
+CHAT_RECENT_MESSAGES = int(os.getenv('CHAT_RECENT_MESSAGES', 50))
+CHAT_RECENT_ROOMS = int(os.getenv('CHAT_RECENT_ROOMS', 2000))
+CHAT_RECENT_TTL = int(os.getenv('CHAT_RECENT_TTL', 300))
+
+# Chat read state is kept as per-user watermarks; per-message receipts are an
+# optional audit trail (see apps/chat/read_state.py)
+CHAT_READ_RECEIPT_AUDIT = os.getenv('CHAT_READ_RECEIPT_AUDIT', '0') == '1'
+
+# Chat typing debounce and presence registry (see apps/chat/presence.py)
+CHAT_TYPING_INTERVAL = float(os.getenv('CHAT_TYPING_INTERVAL', 2.0))
+CHAT_TYPING_TIMEOUT = float(os.getenv('CHAT_TYPING_TIMEOUT', 6.0))
+CHAT_PRESENCE_TTL = int(os.getenv('CHAT_PRESENCE_TTL', 86400))
+
+# Offline chat sync limits (see apps/chat/sync.py)
+CHAT_SYNC_MAX_ROOMS = int(os.getenv('CHAT_SYNC_MAX_ROOMS', 50))
+CHAT_SYNC_MAX_OUTGOING = int(os.getenv('CHAT_SYNC_MAX_OUTGOING', 100))
+CHAT_SYNC_PAGE_SIZE = int(os.getenv('CHAT_SYNC_PAGE_SIZE', 100))
+CHAT_SYNC_SAFETY_WINDOW = float(os.getenv('CHAT_SYNC_SAFETY_WINDOW', 5.0))
+
+# Bulk notification fan-out (see apps/notifications/fanout.py)
+NOTIFICATION_FANOUT_MAX_RADIUS_KM = float(os.getenv('NOTIFICATION_FANOUT_MAX_RADIUS_KM', 15))
+NOTIFICATION_FANOUT_MAX_RECIPIENTS = int(os.getenv('NOTIFICATION_FANOUT_MAX_RECIPIENTS', 200))
+NOTIFICATION_FANOUT_BATCH_SIZE = int(os.getenv('NOTIFICATION_FANOUT_BATCH_SIZE', 500))
+
+# Notification delivery pipeline (see apps/notifications/delivery.py)
+NOTIFICATION_PUSH_BATCH_SIZE = int(os.getenv('NOTIFICATION_PUSH_BATCH_SIZE', 500))
+NOTIFICATION_EMAIL_BATCH_SIZE = int(os.getenv('NOTIFICATION_EMAIL_BATCH_SIZE', 100))
+NOTIFICATION_SMS_BATCH_SIZE = int(os.getenv('NOTIFICATION_SMS_BATCH_SIZE', 50))
+NOTIFICATION_IN_APP_BATCH_SIZE = int(os.getenv('NOTIFICATION_IN_APP_BATCH_SIZE', 500))
+NOTIFICATION_DELIVERY_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_DELIVERY_MAX_ATTEMPTS', 5))
+NOTIFICATION_RETRY_BASE_DELAY = float(os.getenv('NOTIFICATION_RETRY_BASE_DELAY', 30))
+NOTIFICATION_RETRY_MAX_DELAY = float(os.getenv('NOTIFICATION_RETRY_MAX_DELAY', 3600))
+# Seconds a worker holds claimed deliveries before others may take them over
+NOTIFICATION_DELIVERY_LEASE = int(os.getenv('NOTIFICATION_DELIVERY_LEASE', 300))
+
+# Compiled notification template cache (see apps/notifications/template_cache.py)
+NOTIFICATION_TEMPLATE_CACHE_SIZE = int(os.getenv('NOTIFICATION_TEMPLATE_CACHE_SIZE', 256))
+NOTIFICATION_TEMPLATE_CACHE_TTL = int(os.getenv('NOTIFICATION_TEMPLATE_CACHE_TTL', 300))
@@ -20,6 +20,10 @@ def api_root(_request):
             "auth": "/api/users/token/",
             "user_profile": "/api/users/me/",
             "bins": "/api/bins/",
+            "chat_inbox": "/api/chat/inbox/",
+            "chat_history": "/api/chat/rooms/{room_id}/messages/",
+            "chat_sync": "/api/chat/sync/",
+            "search": "/api/search/?q=",
             "pickups": "/api/pickups/",
             "worker_dashboard": "/api/v1/workers/me/",
             "worker_pickups": "/api/v1/pickups/",
@@ -41,6 +45,8 @@ urlpatterns = [
     path("api/status/", api_status),
     path("api/users/", include("apps.users.urls")),
     path("api/v1/", include("apps.users.worker_urls")),
+    path("api/chat/", include("apps.chat.urls")),
+    path("api/search/", include("apps.search.urls")),
     path("api/", include("apps.bins.urls")),
 ]
 
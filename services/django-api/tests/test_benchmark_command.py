@@ -0,0 +1,45 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from apps.bins.models import Bin, PickupRequest
+from apps.chat.models import ChatRoom
+from apps.ws_benchmark import WebSocketBenchmark
+
+User = get_user_model()
+
+SMALL_RUN = ['--workers', '1', '--customers', '1', '--chat-pairs', '1', '--rounds', '1']
+
+
+@override_settings(DEBUG=False)
+class BenchmarkWebsocketsCommandTest(TestCase):
+    def test_refuses_to_write_to_a_real_database(self):
+        with mock.patch.dict(connection.settings_dict, {'NAME': 'klynaa', 'TEST': {}}), \
+                mock.patch.object(WebSocketBenchmark, 'create_fixtures') as create_fixtures:
+            with self.assertRaisesMessage(CommandError, '--allow-db-writes'):
+                call_command('benchmark_websockets', *SMALL_RUN)
+            create_fixtures.assert_not_called()
+
+            with mock.patch.object(WebSocketBenchmark, 'run_scenarios', return_value={}), \
+                    mock.patch.object(WebSocketBenchmark, 'environment', return_value={}):
+                call_command('benchmark_websockets', *SMALL_RUN, '--allow-db-writes', stdout=mock.Mock())
+            create_fixtures.assert_called_once()
+
+    def test_fixtures_removed_when_a_scenario_fails(self):
+        with mock.patch.object(WebSocketBenchmark, 'run_scenarios', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                call_command('benchmark_websockets', *SMALL_RUN)
+        self.assertFalse(User.objects.filter(username__startswith='wsbench').exists())
+        self.assertFalse(Bin.objects.exists())
+        self.assertFalse(PickupRequest.objects.exists())
+        self.assertFalse(ChatRoom.objects.exists())
+
+    def test_fixtures_removed_when_creation_fails_halfway(self):
+        with mock.patch.object(ChatRoom.objects, 'bulk_create', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                call_command('benchmark_websockets', *SMALL_RUN)
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Bin.objects.exists())
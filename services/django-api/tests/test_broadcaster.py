@@ -0,0 +1,88 @@
+import asyncio
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import InMemoryChannelLayer
+from django.db import transaction
+from django.test import TestCase
+
+from apps.broadcaster import Broadcaster
+
+
+def _joined(layer, group):
+    channel = async_to_sync(layer.new_channel)()
+    async_to_sync(layer.group_add)(group, channel)
+    return channel
+
+
+def _drain(layer, channel):
+    async def receive_all():
+        messages = []
+        while True:
+            try:
+                messages.append(await asyncio.wait_for(layer.receive(channel), 0.05))
+            except asyncio.TimeoutError:
+                return messages
+    return async_to_sync(receive_all)()
+
+
+def test_in_memory_layer_is_not_sent_from_the_flusher_thread():
+    assert not Broadcaster(layer=InMemoryChannelLayer()).threaded
+
+
+def test_pending_events_coalesce_by_key():
+    layer = InMemoryChannelLayer()
+    channel = _joined(layer, 'pickups')
+    # Long window: the flusher thread stays asleep and the test flushes by hand
+    broadcaster = Broadcaster(window=60, layer=layer, threaded=True)
+
+    for status in ('accepted', 'in_progress', 'completed'):
+        broadcaster.publish('pickups', {'type': 'pickup_update', 'status': status}, coalesce_key=1)
+    broadcaster.publish('pickups', {'type': 'pickup_update', 'status': 'open'}, coalesce_key=2)
+    broadcaster.publish('pickups', {'type': 'pickup_update', 'status': 'completed'}, coalesce_key=1)
+    assert broadcaster.pending() == 2
+    assert broadcaster.stats()['coalesced'] == 3
+
+    assert broadcaster.flush() == 2
+    # Newest payload, original queue position
+    assert [m['status'] for m in _drain(layer, channel)] == ['completed', 'open']
+
+
+def test_events_reach_a_consumer_waiting_on_its_own_loop():
+    layer = InMemoryChannelLayer()
+    broadcaster = Broadcaster(layer=layer)
+
+    async def consumer():
+        channel = await layer.new_channel()
+        await layer.group_add('chat_1', channel)
+        waiting = asyncio.ensure_future(layer.receive(channel))
+        await asyncio.sleep(0)
+        # As a view or database_sync_to_async handler would publish
+        await sync_to_async(broadcaster.publish)('chat_1', {'type': 'chat_message'})
+        return await asyncio.wait_for(waiting, 1)
+
+    assert asyncio.run(consumer()) == {'type': 'chat_message'}
+
+
+class BroadcastOnCommitTest(TestCase):
+    def setUp(self):
+        self.layer = InMemoryChannelLayer()
+        self.channel = _joined(self.layer, 'pickups')
+        self.broadcaster = Broadcaster(layer=self.layer)
+
+    def test_sent_only_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.broadcaster.publish_on_commit('pickups', {'type': 'pickup_update', 'id': 1})
+                self.assertEqual(_drain(self.layer, self.channel), [])
+        self.assertEqual(_drain(self.layer, self.channel), [{'type': 'pickup_update', 'id': 1}])
+        self.assertEqual(self.broadcaster.stats()['sent'], 1)
+
+    def test_nothing_sent_on_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.broadcaster.publish_on_commit('pickups', {'type': 'pickup_update', 'id': 1})
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(_drain(self.layer, self.channel), [])
@@ -0,0 +1,140 @@
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.bins.models import Bin, PickupRequest
+from apps.caching import LRUCache
+from apps.chat import history
+from apps.chat.models import ChatRoom, Message
+
+User = get_user_model()
+
+
+def test_cursor_round_trip():
+    created_at = timezone.now()
+    cursor = history.encode_cursor(created_at, 42)
+    assert history.decode_cursor(cursor) == (created_at, 42)
+    # Serialized timestamps encode to the same cursor
+    assert history.encode_cursor(created_at.isoformat(), 42) == cursor
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-base64!', history.encode_cursor('yesterday', 1), 'WzFd'])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(history.InvalidCursor):
+        history.decode_cursor(cursor)
+
+
+class ChatHistoryTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.worker = User.objects.create_user(username='worker', password='pass', role=User.UserRole.WORKER)
+        bin_obj = Bin.objects.create(bin_id='BIN-1', owner=self.owner)
+        pickup = PickupRequest.objects.create(bin=bin_obj, owner=self.owner, worker=self.worker)
+        self.room = ChatRoom.objects.create(pickup_request=pickup, owner=self.owner, worker=self.worker)
+        self.buffer = history.RecentMessages(size=3, rooms=10, ttl=60)
+
+    def _message(self, content, sender=None):
+        return Message.objects.create(
+            chat_room=self.room, sender=sender or self.owner, content=content, client_message_id=content
+        )
+
+    def test_pages_break_created_at_ties_by_id(self):
+        messages = [self._message(f'm{i}') for i in range(7)]
+        same_time = timezone.now() - timedelta(minutes=5)
+        Message.objects.filter(pk__in=[m.pk for m in messages[1:6]]).update(created_at=same_time)
+        Message.objects.filter(pk=messages[0].pk).update(created_at=same_time - timedelta(seconds=1))
+
+        seen, cursor = [], None
+        with mock.patch.object(history, 'recent_messages', self.buffer):
+            while True:
+                entries, cursor = history.history_page(self.room.pk, cursor=cursor, limit=2)
+                seen[:0] = [entry['content'] for _, entry in entries]
+                if cursor is None:
+                    break
+        self.assertEqual(seen, [f'm{i}' for i in range(7)])
+
+    def test_latest_page_served_from_buffer(self):
+        for i in range(4):
+            self._message(f'm{i}')
+        entries, has_more = self.buffer.latest(self.room.pk, 2)
+        self.assertEqual(([e['content'] for _, e in entries], has_more), (['m2', 'm3'], True))
+
+        newest = self._message('m4')
+        self.buffer.add(newest)
+        with self.assertNumQueries(0):
+            entries, _ = self.buffer.latest(self.room.pk, 3)
+        self.assertEqual([e['content'] for _, e in entries], ['m2', 'm3', 'm4'])
+
+    def test_fill_racing_an_add_is_not_cached(self):
+        self._message('m0')
+        late = self._message('m1')
+        real_filter = Message.objects.filter
+
+        def filter_then_commit_elsewhere(*args, **kwargs):
+            # Another request commits a message while this fill is reading
+            self.buffer.add(late)
+            return real_filter(*args, **kwargs)
+
+        with mock.patch.object(Message.objects, 'filter', side_effect=filter_then_commit_elsewhere):
+            self.buffer.latest(self.room.pk, 3)
+        self.assertIsNone(self.buffer._buffers.get(self.room.pk))
+
+        # The next read fills normally
+        self.buffer.latest(self.room.pk, 3)
+        self.assertIsNotNone(self.buffer._buffers.get(self.room.pk))
+
+    def test_writes_through_another_process_are_not_hidden(self):
+        self._message('m0')
+        self.buffer.latest(self.room.pk, 3)
+
+        # Another replica saves a message; only its own buffer sees the signal
+        other_process = history.RecentMessages(size=3, rooms=10, ttl=60)
+        other = Message.objects.bulk_create([Message(
+            chat_room=self.room, sender=self.worker, content='m1', client_message_id='m1'
+        )])[0]
+        other_process.add(Message.objects.get(pk=other.pk))
+
+        entries, _ = self.buffer.latest(self.room.pk, 3)
+        self.assertEqual([e['content'] for _, e in entries], ['m0', 'm1'])
+        # Back in step: a local write moves the buffer forward without a reload
+        self.buffer.add(self._message('m2'))
+        with self.assertNumQueries(0):
+            entries, _ = self.buffer.latest(self.room.pk, 3)
+        self.assertEqual([e['content'] for _, e in entries], ['m0', 'm1', 'm2'])
+
+    def test_room_changes_on_another_process_are_not_hidden(self):
+        room_id = str(self.room.room_id)
+        self.assertTrue(history.is_participant(history.get_room(room_id), self.worker.pk))
+
+        with mock.patch.object(history, 'room_cache', LRUCache(ttl=60)), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.room.is_active = False
+            self.room.save()
+        self.assertFalse(history.is_participant(history.get_room(room_id), self.worker.pk))
+
+    def test_worker_chat_view_pages(self):
+        for i in range(4):
+            self._message(f'm{i}')
+        client = APIClient()
+        client.force_authenticate(self.worker)
+        url = f'/api/users/worker/chat/{self.room.pk}/'
+        patcher = mock.patch.object(history, 'recent_messages', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        resp = client.get(url, {'limit': 'lots'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([m['message'] for m in resp.data['messages']], ['m0', 'm1', 'm2', 'm3'])
+        self.assertIsNone(resp.data['next_cursor'])
+
+        resp = client.get(url, {'limit': 3})
+        self.assertEqual([m['message'] for m in resp.data['messages']], ['m1', 'm2', 'm3'])
+        resp = client.get(url, {'limit': 3, 'cursor': resp.data['next_cursor']})
+        self.assertEqual([m['message'] for m in resp.data['messages']], ['m0'])
+
+        self.assertEqual(client.get(url, {'cursor': 'bogus'}).status_code, 400)
@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.bins.models import Bin, PickupRequest
+from apps.chat import read_state
+from apps.chat.models import ChatRoom, Message
+
+User = get_user_model()
+
+
+class ChatInboxTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.worker = User.objects.create_user(username='worker', password='pass', role=User.UserRole.WORKER)
+        self.client = APIClient()
+        self.client.force_authenticate(self.owner)
+        self.now = timezone.now()
+
+    def _room(self, name):
+        bin_obj = Bin.objects.create(bin_id=f'BIN-{name}', owner=self.owner)
+        pickup = PickupRequest.objects.create(bin=bin_obj, owner=self.owner, worker=self.worker)
+        return ChatRoom.objects.create(pickup_request=pickup, owner=self.owner, worker=self.worker)
+
+    def _message(self, room, content, sender, seconds_ago):
+        message = Message.objects.create(chat_room=room, sender=sender, content=content, client_message_id=content)
+        Message.objects.filter(pk=message.pk).update(created_at=self.now - timedelta(seconds=seconds_ago))
+        return message
+
+    def _inbox(self, **params):
+        resp = self.client.get('/api/chat/inbox/', params)
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_rooms_are_ordered_by_latest_activity(self):
+        quiet, busy, empty = self._room('quiet'), self._room('busy'), self._room('empty')
+        self._message(quiet, 'q1', self.worker, 60)
+        self._message(busy, 'b1', self.worker, 50)
+        self._message(busy, 'b2', self.owner, 10)
+
+        results = self._inbox()['results']
+        self.assertEqual([r['room_id'] for r in results], [str(busy.room_id), str(quiet.room_id), str(empty.room_id)])
+        self.assertEqual(results[0]['last_message']['preview'], 'b2')
+        self.assertIsNone(results[2]['last_message'])
+
+    def test_unread_counts_skip_own_messages_and_cover_never_read_rooms(self):
+        room = self._room('read')
+        first = self._message(room, 'm1', self.worker, 40)
+        self._message(room, 'm2', self.worker, 30)
+        self._message(room, 'mine', self.owner, 20)
+        self._message(room, 'm3', self.worker, 10)
+        never_read = self._room('never')
+        self._message(never_read, 'n1', self.worker, 5)
+        self._message(never_read, 'n2', self.owner, 4)
+
+        read_state.mark_read(room.pk, self.owner.pk, [first.message_id])
+        counts = {r['room_id']: r['unread_count'] for r in self._inbox()['results']}
+        self.assertEqual(counts, {str(room.room_id): 2, str(never_read.room_id): 1})
+
+    def test_total_unread_counts_rooms_beyond_the_page(self):
+        for name, seconds_ago in (('old', 30), ('mid', 20), ('new', 10)):
+            self._message(self._room(name), name, self.worker, seconds_ago)
+
+        data = self._inbox(limit=1)
+        self.assertEqual(len(data['results']), 1)
+        self.assertEqual(data['total_unread'], 3)
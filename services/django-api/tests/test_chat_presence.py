@@ -0,0 +1,166 @@
+import asyncio
+from unittest import mock
+
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.test import TransactionTestCase
+
+from apps.bins.models import Bin, PickupRequest
+from apps.chat.consumers import ChatConsumer
+from apps.chat.models import ChatRoom
+from apps.chat.presence import PresenceRegistry, TypingThrottle
+
+User = get_user_model()
+
+
+def test_presence_registry_reports_only_transitions():
+    registry = PresenceRegistry()
+    assert registry.join('room-a', 1) is True
+    assert registry.join('room-a', 1) is False
+    assert registry.leave('room-a', 1) is False
+    assert registry.leave('room-a', 1) is True
+    assert registry.leave('room-a', 1) is False
+    assert registry.online('room-a') == []
+
+
+def test_presence_counts_are_shared_between_processes():
+    # Two registries stand in for two replicas sharing the cache
+    first, second = PresenceRegistry(), PresenceRegistry()
+    assert first.join('room-b', 1) is True
+    assert second.join('room-b', 1) is False
+    assert first.leave('room-b', 1) is False
+    # A connection this process never had cannot leave
+    assert first.leave('room-b', 1) is False
+    assert second.leave('room-b', 1) is True
+
+
+class _ManualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop whose clock only moves when the test advances it."""
+
+    now = 0.0
+
+    def time(self):
+        return self.now
+
+
+def test_typing_throttle_debounces_and_expires():
+    published = []
+
+    async def publish(is_typing):
+        published.append(is_typing)
+
+    loop = _ManualClockLoop()
+
+    async def advance(seconds):
+        loop.now += seconds
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+    async def scenario():
+        throttle = TypingThrottle(publish, interval=2, timeout=6)
+        for _ in range(10):
+            throttle.update(True)
+        await advance(0)
+        assert published == [True]
+
+        throttle.update(False)
+        throttle.update(True)
+        throttle.update(False)
+        await advance(1.9)
+        assert published == [True]
+        # The stop waits for the end of the interval
+        await advance(0.1)
+        assert published == [True, False]
+
+        # Requested at t=2, published once the interval since the stop is over
+        throttle.update(True)
+        await advance(1.9)
+        assert published == [True, False]
+        await advance(0.1)
+        assert published == [True, False, True]
+        await advance(3.9)
+        assert published == [True, False, True]
+        # No fresh typing action within the timeout
+        await advance(0.1)
+        assert published == [True, False, True, False]
+
+    try:
+        loop.run_until_complete(scenario())
+    finally:
+        loop.close()
+
+
+class ChatConsumerPresenceTest(TransactionTestCase):
+    def setUp(self):
+        # Committed bins would render QR codes into MEDIA_ROOT
+        patcher = mock.patch('apps.bins.models.submit_on_commit')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.worker = User.objects.create_user(username='worker', password='pass', role=User.UserRole.WORKER)
+        self.outsider = User.objects.create_user(username='outsider', password='pass')
+        bin_obj = Bin.objects.create(bin_id='BIN-1', owner=self.owner)
+        pickup = PickupRequest.objects.create(bin=bin_obj, owner=self.owner, worker=self.worker)
+        self.room = ChatRoom.objects.create(pickup_request=pickup, owner=self.owner, worker=self.worker)
+
+    def _communicator(self, user, room=None):
+        room = room or self.room
+        communicator = WebsocketCommunicator(ChatConsumer.as_asgi(), f'/ws/chat/{room.room_id}/')
+        communicator.scope['user'] = user
+        communicator.scope['url_route'] = {'kwargs': {'room_id': str(room.room_id)}}
+        return communicator
+
+    async def _events(self, communicator):
+        events = []
+        while not await communicator.receive_nothing(timeout=0.2):
+            event = await communicator.receive_json_from()
+            events.append((event['event'], event['user_id'], event.get('status', event.get('is_typing'))))
+        return events
+
+    async def test_only_first_and_last_connection_change_presence(self):
+        owner = self._communicator(self.owner)
+        self.assertTrue((await owner.connect())[0])
+        self.assertEqual(await self._events(owner), [('presence', self.owner.pk, 'online')])
+
+        phone, laptop = self._communicator(self.worker), self._communicator(self.worker)
+        await phone.connect()
+        await laptop.connect()
+        self.assertEqual(await self._events(owner), [('presence', self.worker.pk, 'online')])
+
+        await phone.disconnect()
+        self.assertEqual(await self._events(owner), [])
+        await laptop.disconnect()
+        self.assertEqual(await self._events(owner), [('presence', self.worker.pk, 'offline')])
+        await owner.disconnect()
+
+    async def test_disconnect_stops_typing(self):
+        owner, worker = self._communicator(self.owner), self._communicator(self.worker)
+        await owner.connect()
+        await worker.connect()
+        await self._events(owner)
+
+        await worker.send_json_to({'action': 'typing', 'is_typing': True})
+        self.assertEqual(await self._events(owner), [('typing', self.worker.pk, True)])
+        await worker.disconnect()
+        self.assertEqual(await self._events(owner), [
+            ('typing', self.worker.pk, False), ('presence', self.worker.pk, 'offline'),
+        ])
+        await owner.disconnect()
+
+    async def test_rejected_connections_announce_nothing(self):
+        owner = self._communicator(self.owner)
+        await owner.connect()
+        await self._events(owner)
+
+        for user in (AnonymousUser(), self.outsider):
+            communicator = self._communicator(user)
+            connected, _ = await communicator.connect()
+            self.assertFalse(connected)
+        self.assertEqual(await self._events(owner), [])
+        await owner.disconnect()
+
+    async def test_inactive_rooms_are_rejected(self):
+        await ChatRoom.objects.filter(pk=self.room.pk).aupdate(is_active=False)
+        connected, _ = await self._communicator(self.worker).connect()
+        self.assertFalse(connected)
@@ -0,0 +1,105 @@
+import importlib
+from datetime import timedelta
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.bins.models import Bin, PickupRequest
+from apps.chat import history, read_state
+from apps.chat.models import ChatReadWatermark, ChatRoom, Message, MessageReadReceipt
+from apps.users.worker_views import ChatMessageView
+
+User = get_user_model()
+
+seed_migration = importlib.import_module('apps.chat.migrations.0002_chatreadwatermark')
+
+
+class ReadStateTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.worker = User.objects.create_user(username='worker', password='pass', role=User.UserRole.WORKER)
+        bin_obj = Bin.objects.create(bin_id='BIN-1', owner=self.owner)
+        self.pickup = PickupRequest.objects.create(bin=bin_obj, owner=self.owner, worker=self.worker)
+        self.room = ChatRoom.objects.create(pickup_request=self.pickup, owner=self.owner, worker=self.worker)
+        self.room_dict = {'pk': self.room.pk, 'owner_id': self.owner.pk, 'worker_id': self.worker.pk}
+
+    def _message(self, content, sender):
+        return Message.objects.create(chat_room=self.room, sender=sender, content=content, client_message_id=content)
+
+    def _watermark(self, user):
+        return read_state.room_watermarks(self.room.pk).get(user.pk)
+
+    def test_watermark_only_moves_forward(self):
+        first = self._message('m1', self.owner)
+        second = self._message('m2', self.owner)
+
+        moved = read_state.mark_read(self.room.pk, self.worker.pk, [first.message_id, second.message_id])
+        self.assertEqual(moved['message_id'], str(second.message_id))
+        self.assertEqual(self._watermark(self.worker)[1], second.pk)
+
+        # A late ack from another device must not move it back
+        self.assertIsNone(read_state.mark_read(self.room.pk, self.worker.pk, [first.message_id]))
+        self.assertIsNone(read_state.mark_read(self.room.pk, self.worker.pk, [second.message_id]))
+        self.assertEqual(self._watermark(self.worker)[1], second.pk)
+
+    def test_unknown_ids_do_not_move_the_watermark(self):
+        self._message('m1', self.owner)
+        self.assertIsNone(read_state.mark_read(self.room.pk, self.worker.pk, ['not-a-uuid', Message().message_id]))
+        self.assertIsNone(self._watermark(self.worker))
+
+    def test_own_messages_cannot_be_marked_read(self):
+        theirs = self._message('m1', self.owner)
+        mine = self._message('m2', self.worker)
+        moved = read_state.mark_read(self.room.pk, self.worker.pk, [theirs.message_id, mine.message_id])
+        self.assertEqual(moved['message_id'], str(theirs.message_id))
+        self.assertIsNone(read_state.mark_read(self.room.pk, self.worker.pk, [mine.message_id]))
+        self.assertEqual(read_state.unread_count(self.room.pk, self.worker.pk), 0)
+
+    def test_history_derives_is_read_from_the_recipients_watermark(self):
+        first = self._message('m1', self.owner)
+        self._message('m2', self.owner)
+        reply = self._message('m3', self.worker)
+        read_state.mark_read(self.room.pk, self.worker.pk, [first.message_id])
+
+        entries, _ = history.history_page(self.room.pk, cursor=history.encode_cursor(timezone.now(), 0))
+        flags = {
+            message['content']: message['is_read']
+            for _, message in read_state.with_read_state(
+                entries, self.room_dict, read_state.room_watermarks(self.room.pk)
+            )
+        }
+        self.assertEqual(flags, {'m1': True, 'm2': False, 'm3': False})
+        self.assertNotIn('is_read', dict(entries)[reply.pk])
+
+    def test_chat_message_view_derives_is_read(self):
+        first = self._message('m1', self.owner)
+        self._message('m2', self.owner)
+        read_state.mark_read(self.room.pk, self.worker.pk, [first.message_id])
+
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, self.worker)
+        resp = ChatMessageView.as_view()(request, task_id=self.pickup.pk)
+        results = resp.data['results'] if isinstance(resp.data, dict) else resp.data
+        self.assertEqual([(m['content'], m['is_read']) for m in results], [('m1', True), ('m2', False)])
+
+    def test_seed_migration_uses_newest_receipt(self):
+        older = self._message('m1', self.owner)
+        newest = self._message('m2', self.owner)
+        tied = self._message('m3', self.worker)
+        Message.objects.filter(pk=older.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+        Message.objects.filter(pk=newest.pk).update(created_at=timezone.now() - timedelta(minutes=1))
+        Message.objects.filter(pk=tied.pk).update(created_at=timezone.now() - timedelta(minutes=1))
+        MessageReadReceipt.objects.bulk_create([
+            MessageReadReceipt(message=newest, user=self.worker),
+            MessageReadReceipt(message=older, user=self.worker),
+            MessageReadReceipt(message=tied, user=self.owner),
+        ])
+
+        seed_migration.backfill_watermarks(apps, None)
+        newest.refresh_from_db()
+        self.assertEqual(self._watermark(self.worker), (newest.created_at, newest.pk))
+        self.assertEqual(self._watermark(self.owner)[1], tied.pk)
+        self.assertEqual(ChatReadWatermark.objects.count(), 2)
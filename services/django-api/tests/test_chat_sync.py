@@ -0,0 +1,92 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.bins.models import Bin, PickupRequest
+from apps.chat import history, sync
+from apps.chat.models import ChatRoom, Message
+
+User = get_user_model()
+
+
+@override_settings(CHAT_SYNC_SAFETY_WINDOW=5, CHAT_SYNC_PAGE_SIZE=2)
+class ChatSyncTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.worker = User.objects.create_user(username='worker', password='pass', role=User.UserRole.WORKER)
+        bin_obj = Bin.objects.create(bin_id='BIN-1', owner=self.owner)
+        pickup = PickupRequest.objects.create(bin=bin_obj, owner=self.owner, worker=self.worker)
+        self.room = ChatRoom.objects.create(pickup_request=pickup, owner=self.owner, worker=self.worker)
+        self.room_id = str(self.room.room_id)
+        patcher = mock.patch.object(history, 'recent_messages', history.RecentMessages())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.now = timezone.now()
+
+    def _message(self, content, sender, seconds_ago):
+        message = Message.objects.create(chat_room=self.room, sender=sender, content=content, client_message_id=content)
+        Message.objects.filter(pk=message.pk).update(created_at=self.now - timedelta(seconds=seconds_ago))
+        return Message.objects.get(pk=message.pk)
+
+    def _sync(self, user, since=None, outgoing=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return sync.sync_rooms(user.pk, [{'room_id': self.room_id, 'since': since, 'outgoing': outgoing}])[0]
+
+    def _contents(self, result):
+        return [message['content'] for message in result['messages']]
+
+    def test_late_committed_message_inside_the_window_is_resent(self):
+        self._message('m1', self.owner, 60)
+        seen = self._message('m2', self.owner, 10)
+        cursor = history.encode_cursor(seen.created_at, seen.pk)
+
+        # Saved before m2 but committed after the client synced past it
+        self._message('late', self.owner, 12)
+        result = self._sync(self.worker, since=cursor)
+        self.assertEqual(self._contents(result), ['late', 'm2'])
+        # Re-sent messages never move the cursor back or forward
+        self.assertEqual(result['cursor'], cursor)
+        self.assertFalse(result['has_more'])
+
+    def test_paging_progresses_past_the_window(self):
+        first = self._message('m1', self.owner, 4)
+        for content, seconds_ago in (('m2', 3), ('m3', 2), ('m4', 1)):
+            self._message(content, self.owner, seconds_ago)
+
+        result = self._sync(self.worker, since=history.encode_cursor(first.created_at, first.pk))
+        self.assertEqual(self._contents(result), ['m1', 'm2', 'm3'])
+        self.assertTrue(result['has_more'])
+
+        result = self._sync(self.worker, since=result['cursor'])
+        self.assertEqual(self._contents(result)[-1], 'm4')
+        self.assertFalse(result['has_more'])
+
+    def test_first_sync_returns_the_latest_page_and_its_cursor(self):
+        for content, seconds_ago in (('m1', 30), ('m2', 20), ('m3', 10)):
+            self._message(content, self.owner, seconds_ago)
+        result = self._sync(self.worker)
+        self.assertEqual(self._contents(result), ['m2', 'm3'])
+        latest = Message.objects.get(content='m3')
+        self.assertEqual(result['cursor'], history.encode_cursor(latest.created_at, latest.pk))
+
+    def test_retried_send_is_acked_once(self):
+        outgoing = [{'client_message_id': 'c1', 'content': 'On my way'}]
+        first = self._sync(self.worker, outgoing=outgoing)
+        again = self._sync(self.worker, outgoing=outgoing)
+        self.assertEqual(first['acked'], again['acked'])
+        self.assertEqual(Message.objects.filter(chat_room=self.room).count(), 1)
+        self.assertEqual(again['rejected'], [])
+
+    def test_other_senders_client_id_is_rejected_not_acked(self):
+        theirs = self._message('c1', self.owner, 1)
+        result = self._sync(self.worker, outgoing=[
+            {'client_message_id': 'c1', 'content': 'Mine'},
+            {'client_message_id': 'c2', 'content': 'Also mine'},
+        ])
+        self.assertEqual(result['rejected'], ['c1'])
+        self.assertEqual([ack['client_message_id'] for ack in result['acked']], ['c2'])
+        self.assertNotIn(str(theirs.message_id), [ack['id'] for ack in result['acked']])
+        self.assertEqual(Message.objects.filter(sender=self.worker).count(), 1)
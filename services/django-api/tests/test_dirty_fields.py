@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from apps.bins.models import Bin
+
+User = get_user_model()
+
+
+class DirtyFieldsMixinTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.bin = Bin.objects.create(bin_id='BIN-1', owner=self.owner)
+
+    def test_loaded_instance_tracks_changes(self):
+        bin_obj = Bin.objects.get(pk=self.bin.pk)
+        self.assertTrue(bin_obj.has_snapshot)
+        self.assertEqual(bin_obj.changed_fields, set())
+        bin_obj.status = Bin.BinStatus.FULL
+        bin_obj.fill_level = 90
+        self.assertEqual(bin_obj.changed_fields, {'status', 'fill_level'})
+        self.assertEqual(bin_obj.previous('status'), Bin.BinStatus.EMPTY)
+
+    def test_save_takes_a_new_snapshot(self):
+        bin_obj = Bin.objects.get(pk=self.bin.pk)
+        bin_obj.status = Bin.BinStatus.FULL
+        bin_obj.save()
+        self.assertEqual(bin_obj.changed_fields, set())
+        self.assertEqual(bin_obj.previous('status'), Bin.BinStatus.FULL)
+
+        bin_obj.label = 'Kitchen'
+        bin_obj.save(update_fields=['label'])
+        self.assertEqual(bin_obj.previous('label'), 'Kitchen')
+
+    def test_save_changed_writes_only_changed_columns(self):
+        bin_obj = Bin.objects.get(pk=self.bin.pk)
+        bin_obj.status = Bin.BinStatus.FULL
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(bin_obj.save_changed())
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"status"', updates[0])
+        self.assertIn('"updated_at"', updates[0])
+        self.assertNotIn('"label"', updates[0])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(bin_obj.save_changed())
+        self.assertEqual(len(queries), 0)
+
+    def test_refresh_from_db_resets_snapshot(self):
+        bin_obj = Bin.objects.get(pk=self.bin.pk)
+        Bin.objects.filter(pk=self.bin.pk).update(status=Bin.BinStatus.FULL, fill_level=100)
+        bin_obj.refresh_from_db(fields=['fill_level'])
+        self.assertEqual(bin_obj.previous('fill_level'), 100)
+        self.assertEqual(bin_obj.previous('status'), Bin.BinStatus.EMPTY)
+
+        bin_obj.refresh_from_db()
+        self.assertEqual(bin_obj.changed_fields, set())
+        self.assertEqual(bin_obj.previous('status'), Bin.BinStatus.FULL)
+
+    def test_deferred_fields_are_snapshotted_when_loaded(self):
+        bin_obj = Bin.objects.only('id', 'status').get(pk=self.bin.pk)
+        self.assertEqual(bin_obj.changed_fields, set())
+        self.assertIsNone(bin_obj.previous('label'))
+
+        self.assertEqual(bin_obj.label, 'Smart Bin')  # deferred load
+        self.assertEqual(bin_obj.previous('label'), 'Smart Bin')
+        bin_obj.label = 'Garage'
+        self.assertEqual(bin_obj.changed_fields, {'label'})
+
+    def test_unsaved_instance_reports_all_fields_changed(self):
+        bin_obj = Bin(bin_id='BIN-2')
+        self.assertFalse(bin_obj.has_snapshot)
+        self.assertIsNone(bin_obj.previous('status'))
+        self.assertIn('bin_id', bin_obj.changed_fields)
+        self.assertNotIn('id', bin_obj.changed_fields)
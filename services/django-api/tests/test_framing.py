@@ -0,0 +1,162 @@
+import asyncio
+import datetime
+import decimal
+import json
+import uuid
+
+import msgpack
+import pytest
+
+from apps.framing import MAX_UNACKED_VERSIONS, SUBPROTOCOL_MSGPACK, CompactFramingMixin, diff_state
+
+
+class _RecordingSocket:
+    """Stands in for ``AsyncWebsocketConsumer``: records what would go on the wire."""
+
+    def __init__(self, subprotocols=()):
+        self.scope = {'subprotocols': list(subprotocols)}
+        self.accepted = None
+        self.sent = []
+
+    async def accept(self, subprotocol=None, headers=None):
+        self.accepted = subprotocol
+
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        self.sent.append(json.loads(text_data) if text_data is not None else msgpack.unpackb(bytes_data))
+
+
+class Consumer(CompactFramingMixin, _RecordingSocket):
+    pass
+
+
+def _connected(subprotocols=()):
+    consumer = Consumer(subprotocols)
+    asyncio.run(consumer.accept())
+    return consumer
+
+
+def _ack(consumer, version, stream='pickup', key='42'):
+    consumer.decode_frame(text_data=json.dumps({'type': 'ack', 'stream': stream, 'key': key, 'v': version}))
+
+
+def _send_state(consumer, state, stream='pickup', key=42, version=None):
+    asyncio.run(consumer.send_state('pickup_status', stream, key, state, version=version))
+    return consumer.sent[-1]
+
+
+def test_diff_state_sends_only_changed_and_removed_keys():
+    base = {'status': 'open', 'worker_id': 7, 'eta': 12}
+    state = {'status': 'accepted', 'worker_id': 7, 'note': 'gate code 12'}
+    assert diff_state(base, state) == {
+        'set': {'status': 'accepted', 'note': 'gate code 12'},
+        'unset': ['eta'],
+    }
+
+
+def test_accept_negotiates_msgpack_only_when_offered():
+    compact = _connected(['other', SUBPROTOCOL_MSGPACK])
+    assert (compact.accepted, compact.compact) == (SUBPROTOCOL_MSGPACK, True)
+
+    plain = _connected(['other'])
+    assert (plain.accepted, plain.compact) == (None, False)
+
+    chosen = Consumer([SUBPROTOCOL_MSGPACK])
+    asyncio.run(chosen.accept(subprotocol='other'))
+    assert (chosen.accepted, chosen.compact) == ('other', False)
+
+
+def test_frames_round_trip_in_the_negotiated_encoding():
+    payload = {
+        'type': 'location', 'lat': decimal.Decimal('4.05'), 'id': uuid.UUID(int=1),
+        'at': datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc),
+    }
+    expected = {'type': 'location', 'lat': 4.05, 'id': str(uuid.UUID(int=1)), 'at': '2026-01-01T00:00:00+00:00'}
+
+    compact = _connected([SUBPROTOCOL_MSGPACK])
+    text_data, bytes_data = compact.encode_frame(payload)
+    assert text_data is None
+    assert compact.decode_frame(bytes_data=bytes_data) == expected
+
+    plain = _connected()
+    text_data, bytes_data = plain.encode_frame(payload)
+    assert bytes_data is None
+    decoded = plain.decode_frame(text_data=text_data)
+    assert decoded == dict(expected, lat='4.05', at='2026-01-01T00:00:00Z')
+
+
+def test_invalid_and_non_object_frames_are_rejected():
+    consumer = _connected([SUBPROTOCOL_MSGPACK])
+    with pytest.raises(ValueError, match='Invalid msgpack'):
+        consumer.decode_frame(bytes_data=b'\xc1')
+    with pytest.raises(ValueError, match='object'):
+        consumer.decode_frame(bytes_data=msgpack.packb([1, 2]))
+    with pytest.raises(ValueError):
+        consumer.decode_frame(text_data='{not json')
+    with pytest.raises(ValueError, match='object'):
+        consumer.decode_frame(text_data='"ping"')
+
+
+def test_state_is_sent_whole_until_acknowledged_then_as_delta():
+    consumer = _connected()
+    first = _send_state(consumer, {'status': 'accepted', 'eta': 12})
+    assert (first['v'], first['data']) == (1, {'status': 'accepted', 'eta': 12})
+    assert 'base' not in _send_state(consumer, {'status': 'accepted', 'eta': 10})
+
+    _ack(consumer, 1)
+    third = _send_state(consumer, {'status': 'in_progress'})
+    assert (third['v'], third['base']) == (3, 1)
+    assert third['delta'] == {'set': {'status': 'in_progress'}, 'unset': ['eta']}
+    # Other streams are independent
+    assert 'data' in _send_state(consumer, {'status': 'open'}, key=43)
+
+
+def test_ack_moves_the_base_forward_only():
+    consumer = _connected()
+    for eta in (12, 10, 8):
+        _send_state(consumer, {'eta': eta})
+    _ack(consumer, 2)
+    entry = consumer._stream('pickup', 42)
+    # Versions before the acknowledged one can no longer be a base
+    assert sorted(entry.sent) == [2, 3]
+
+    _ack(consumer, 1)
+    _ack(consumer, 'junk')
+    _ack(consumer, 99)
+    frame = _send_state(consumer, {'eta': 6})
+    assert (frame['base'], frame['delta']['set']) == (2, {'eta': 6})
+
+
+def test_unacknowledged_versions_are_bounded_and_keep_the_base():
+    consumer = _connected()
+    _send_state(consumer, {'eta': 0})
+    _ack(consumer, 1)
+    for eta in range(1, MAX_UNACKED_VERSIONS * 2):
+        frame = _send_state(consumer, {'eta': eta})
+    entry = consumer._stream('pickup', 42)
+    assert len(entry.sent) == MAX_UNACKED_VERSIONS
+    assert 1 in entry.sent
+    assert frame['base'] == 1
+
+
+def test_snapshot_seeds_the_stream_as_acknowledged():
+    consumer = _connected()
+    asyncio.run(consumer.send_snapshot('pickup_status', 'pickup', 42, {'status': 'open'}, version='v2',
+                                       since='v1', since_state={'status': 'accepted', 'eta': 5}))
+    snapshot = consumer.sent[-1]
+    assert (snapshot['since'], snapshot['version']) == ('v1', 'v2')
+    assert snapshot['delta'] == {'set': {'status': 'open'}, 'unset': ['eta']}
+
+    frame = _send_state(consumer, {'status': 'accepted'})
+    assert (frame['base'], frame['delta']['set']) == (snapshot['v'], {'status': 'accepted'})
+
+
+def test_snapshot_variants():
+    consumer = _connected()
+    asyncio.run(consumer.send_snapshot('pickup_status', 'pickup', 42, {'status': 'open'}, version='v2', since='v2'))
+    assert consumer.sent[-1]['unchanged'] is True
+    assert 'data' not in consumer.sent[-1]
+
+    fresh = _connected()
+    asyncio.run(fresh.send_snapshot('pickup_status', 'pickup', 42, {'status': 'open'}, version='v2'))
+    assert fresh.sent[-1]['data'] == {'status': 'open'}
+    assert fresh.sent[-1]['version'] == 'v2'
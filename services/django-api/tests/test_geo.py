@@ -0,0 +1,61 @@
+import math
+
+import pytest
+
+from apps.bins.geo import covering_cells, geohash_cell_size, geohash_encode, haversine_m
+
+
+@pytest.mark.parametrize('latitude, longitude, precision, expected', [
+    (57.64911, 10.40744, 11, 'u4pruydqqvj'),
+    (42.6, -5.6, 5, 'ezs42'),
+    (-33.8688, 151.2093, 7, 'r3gx2f7'),
+    (0.0, 0.0, 4, 's000'),
+])
+def test_geohash_known_vectors(latitude, longitude, precision, expected):
+    assert geohash_encode(latitude, longitude, precision) == expected
+
+
+def test_geohash_prefixes_nest():
+    full = geohash_encode(4.0511, 9.7679, 8)
+    for precision in range(1, 8):
+        assert geohash_encode(4.0511, 9.7679, precision) == full[:precision]
+
+
+def test_cell_size():
+    assert geohash_cell_size(1) == (45.0, 45.0)
+    assert geohash_cell_size(5) == (180.0 / 2 ** 12, 360.0 / 2 ** 13)
+
+
+def _points_within(latitude, longitude, radius_m, steps=24):
+    for ring in (0.25, 0.5, 0.75, 0.999):
+        for step in range(steps):
+            bearing = 2 * math.pi * step / steps
+            dlat = ring * radius_m * math.cos(bearing) / 111320.0
+            dlng = ring * radius_m * math.sin(bearing) / (111320.0 * math.cos(math.radians(latitude)))
+            yield latitude + dlat, longitude + dlng
+
+
+@pytest.mark.parametrize('latitude, longitude, radius_m', [
+    (4.0511, 9.7679, 500),
+    (4.0511, 9.7679, 5000),
+    (4.0511, 9.7679, 50000),
+    (60.17, 24.94, 3000),
+    (-0.0001, 179.999, 2000),   # straddles the equator and the antimeridian
+])
+def test_covering_cells_contain_every_point_in_radius(latitude, longitude, radius_m):
+    precision, cells = covering_cells(latitude, longitude, radius_m)
+    assert precision in (4, 5, 6)
+    for lat, lng in _points_within(latitude, longitude, radius_m):
+        assert haversine_m(latitude, longitude, lat, lng) <= radius_m
+        wrapped = ((lng + 180.0) % 360.0) - 180.0
+        assert geohash_encode(lat, wrapped, precision) in cells
+
+
+def test_covering_cells_picks_finest_precision_within_limit():
+    precision, cells = covering_cells(4.0511, 9.7679, 500)
+    assert precision == 6
+    assert len(cells) <= 16
+    # A huge radius falls back to the coarsest precision, whatever the count
+    precision, cells = covering_cells(4.0511, 9.7679, 200000)
+    assert precision == 4
+    assert len(cells) > 16
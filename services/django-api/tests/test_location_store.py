@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import OperationalError
+from django.test import TestCase
+
+from apps.bins.models import Bin, PickupRequest
+from apps.users.location_store import WorkerLocationStore, broadcast_location
+from apps.users.websocket_consumers import load_worker_snapshot
+
+User = get_user_model()
+
+
+class WorkerLocationStoreTest(TestCase):
+    def setUp(self):
+        self.worker = User.objects.create_user(username='worker', password='pass', role=User.UserRole.WORKER)
+        self.store = WorkerLocationStore(persist_interval=60, persist_distance_m=250)
+        self.store._ensure_flusher = lambda: None
+
+    def test_flush_persists_latest_position(self):
+        self.store.record(self.worker.pk, 4.05, 9.7)
+        self.store.record(self.worker.pk, 4.0512, 9.7034)
+        self.assertEqual(self.store.flush(), 1)
+        self.worker.refresh_from_db()
+        self.assertEqual((float(self.worker.latitude), float(self.worker.longitude)), (4.0512, 9.7034))
+        # Nothing moved since
+        self.assertEqual(self.store.flush(), 0)
+
+    def test_failed_flush_does_not_count_as_persisted(self):
+        self.store.record(self.worker.pk, 4.05, 9.7)
+        with mock.patch.object(User.objects, 'bulk_update', side_effect=OperationalError('down')):
+            with self.assertRaises(OperationalError):
+                self.store.flush()
+        self.assertIsNone(self.store._locations[self.worker.pk].persisted)
+
+        # A far move must not be measured from a position that was never written
+        with mock.patch.object(self.store._wakeup, 'set') as wakeup:
+            self.store.record(self.worker.pk, 4.06, 9.71)
+        wakeup.assert_not_called()
+
+        self.assertEqual(self.store.flush(), 1)
+        self.assertEqual(self.store._locations[self.worker.pk].persisted, (4.06, 9.71))
+        with mock.patch.object(self.store._wakeup, 'set') as wakeup:
+            self.store.record(self.worker.pk, 4.08, 9.71)
+        wakeup.assert_called_once()
+
+    def test_small_moves_broadcast_only_on_heartbeat(self):
+        _, first = self.store.record(self.worker.pk, 4.05, 9.7)
+        _, nudge = self.store.record(self.worker.pk, 4.05001, 9.7)
+        _, moved = self.store.record(self.worker.pk, 4.0503, 9.7)
+        self.assertEqual((first, nudge, moved), (True, False, True))
+
+
+class ActivePickupStatusesTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.worker = User.objects.create_user(username='worker', password='pass', role=User.UserRole.WORKER)
+        self.pickups = {}
+        for status in ('open', 'accepted', 'in_progress', 'completed'):
+            bin_obj = Bin.objects.create(bin_id=f'BIN-{status}', owner=self.owner)
+            self.pickups[status] = PickupRequest.objects.create(
+                bin=bin_obj, owner=self.owner, worker=self.worker, status=status
+            )
+
+    def test_location_broadcasts_and_snapshot_agree(self):
+        location = {'lat': 4.05, 'lng': 9.7, 'timestamp': '2026-01-01T00:00:00+00:00'}
+        with mock.patch('apps.bins.websocket_signals.broadcast_pickup_update') as pickup_update, \
+                mock.patch('apps.bins.websocket_signals.broadcast_customer_notification'):
+            broadcast_location(self.worker.pk, location)
+
+        notified = {c.kwargs['pickup_id'] for c in pickup_update.call_args_list}
+        expected = {self.pickups[s].pk for s in PickupRequest.ACTIVE_STATUSES}
+        self.assertEqual(notified, expected)
+        self.assertEqual(load_worker_snapshot(self.worker.pk)['active_pickups'], len(expected))
@@ -0,0 +1,83 @@
+import time
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TransactionTestCase
+
+from apps.bins.log_writer import BufferedLogWriter
+from apps.bins.models import NotificationLog
+
+
+def _log(title='log', **kwargs):
+    return NotificationLog(notification_type='test', title=title, body='', **kwargs)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class BufferedLogWriterTest(TransactionTestCase):
+    def _writer(self, **kwargs):
+        writer = BufferedLogWriter(**kwargs)
+        self.addCleanup(writer.close)
+        return writer
+
+    def test_flushes_when_batch_is_full(self):
+        writer = self._writer(batch_size=3, flush_interval=60)
+        with mock.patch('apps.bins.log_writer.atexit.register'):
+            writer.write(_log())
+            writer.write(_log())
+            self.assertEqual(writer.pending(), {NotificationLog._meta.db_table: 2})
+            writer.write(_log())
+        self.assertTrue(_wait_for(lambda: NotificationLog.objects.count() == 3))
+        self.assertEqual(writer.pending(), {})
+
+    def test_flushes_on_interval(self):
+        writer = self._writer(batch_size=100, flush_interval=0.05)
+        with mock.patch('apps.bins.log_writer.atexit.register'):
+            writer.write(_log())
+        self.assertTrue(_wait_for(lambda: NotificationLog.objects.count() == 1))
+
+    def test_registers_exit_flush_once(self):
+        writer = self._writer(batch_size=100, flush_interval=60)
+        with mock.patch('apps.bins.log_writer.atexit.register') as register:
+            writer.write(_log())
+            writer.write(_log())
+        register.assert_called_once_with(writer.flush)
+
+        # What runs at exit writes whatever is still buffered
+        self.assertEqual(register.call_args[0][0](), 2)
+        self.assertEqual(NotificationLog.objects.count(), 2)
+
+    def test_bad_rows_are_dropped_alone(self):
+        writer = self._writer(batch_size=100, flush_interval=60)
+        with mock.patch('apps.bins.log_writer.atexit.register'):
+            writer.write(_log('good'))
+            writer.write(_log('orphan', pickup_id=999999))
+            writer.write(_log('also good'))
+        self.assertEqual(writer.flush(), 2)
+        self.assertEqual(sorted(NotificationLog.objects.values_list('title', flat=True)), ['also good', 'good'])
+        self.assertEqual(writer.pending(), {})
+
+    def test_rows_are_rebuffered_while_database_is_down(self):
+        writer = self._writer(batch_size=100, flush_interval=60)
+        with mock.patch('apps.bins.log_writer.atexit.register'):
+            for i in range(3):
+                writer.write(_log(f'log {i}'))
+
+        down = OperationalError('connection refused')
+        with mock.patch.object(NotificationLog.objects, 'bulk_create', side_effect=down), \
+                mock.patch.object(NotificationLog, 'save', side_effect=down):
+            self.assertEqual(writer.flush(), 0)
+        self.assertEqual(writer.pending(), {NotificationLog._meta.db_table: 3})
+
+        self.assertEqual(writer.flush(), 3)
+        self.assertEqual(
+            list(NotificationLog.objects.order_by('pk').values_list('title', flat=True)),
+            ['log 0', 'log 1', 'log 2'],
+        )
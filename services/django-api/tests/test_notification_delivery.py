@@ -0,0 +1,106 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.notifications import delivery
+from apps.notifications.delivery import DeliveryResult
+from apps.notifications.models import Notification, NotificationChannel, NotificationDelivery
+
+User = get_user_model()
+
+
+@override_settings(NOTIFICATION_RETRY_BASE_DELAY=30, NOTIFICATION_RETRY_MAX_DELAY=3600)
+def test_backoff_doubles_with_jitter_up_to_the_cap():
+    with mock.patch('random.uniform', side_effect=lambda low, high: high):
+        assert [delivery.retry_delay(attempt) for attempt in (1, 2, 3)] == [30, 60, 120]
+        assert delivery.retry_delay(20) == 3600
+    with mock.patch('random.uniform', side_effect=lambda low, high: low):
+        assert delivery.retry_delay(1) == 15
+        assert delivery.retry_delay(20) == 1800
+
+
+@override_settings(NOTIFICATION_DELIVERY_MAX_ATTEMPTS=2, NOTIFICATION_DELIVERY_LEASE=300)
+class NotificationDeliveryTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.push = NotificationChannel.objects.create(user=self.user, channel_type='push', identifier='token')
+        self.email = NotificationChannel.objects.create(user=self.user, channel_type='email', identifier='u@x.cm')
+        patcher = mock.patch.object(delivery, '_schedule_retry')
+        self.schedule_retry = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _notification(self, *channels):
+        notification = Notification.objects.create(
+            recipient=self.user, notification_type='system_alert', title='Alert', message='Body'
+        )
+        return notification, [
+            NotificationDelivery.objects.create(notification=notification, channel=channel) for channel in channels
+        ]
+
+    def _record(self, channel_type, deliveries, result):
+        claimed = delivery.claim([d.pk for d in deliveries])
+        return delivery.record(channel_type, claimed, [result] * len(claimed))
+
+    def _status(self, notification):
+        notification.refresh_from_db()
+        return notification.status
+
+    def test_claim_is_exclusive_until_the_lease_expires(self):
+        _, (queued,) = self._notification(self.push)
+        self.assertEqual([d.pk for d in delivery.claim([queued.pk])], [queued.pk])
+        self.assertEqual(delivery.claim([queued.pk]), [])
+
+        NotificationDelivery.objects.filter(pk=queued.pk).update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([d.pk for d in delivery.claim([queued.pk])], [queued.pk])
+
+        NotificationDelivery.objects.filter(pk=queued.pk).update(
+            next_attempt_at=None, delivered_at=timezone.now()
+        )
+        self.assertEqual(delivery.claim([queued.pk]), [])
+
+    def test_sent_as_soon_as_one_channel_delivers(self):
+        notification, (push, email) = self._notification(self.push, self.email)
+        self.assertEqual(self._record('push', [push], DeliveryResult(False, error='gone', retryable=False)), 0)
+        # The email batch has not run yet
+        self.assertEqual(self._status(notification), Notification.Status.PENDING)
+
+        self.assertEqual(self._record('email', [email], DeliveryResult(True, provider_id='b1')), 1)
+        self.assertEqual(self._status(notification), Notification.Status.SENT)
+        self.assertIsNotNone(notification.sent_at)
+
+    def test_failed_once_every_channel_gave_up(self):
+        notification, (push, email) = self._notification(self.push, self.email)
+        self._record('push', [push], DeliveryResult(False, error='gone', retryable=False))
+        self._record('email', [email], DeliveryResult(False, error='bounced', retryable=False))
+        self.assertEqual(self._status(notification), Notification.Status.FAILED)
+
+    def test_retryable_failures_are_retried_up_to_the_limit(self):
+        notification, (push,) = self._notification(self.push)
+        self._record('push', [push], DeliveryResult(False, error='timeout'))
+        push.refresh_from_db()
+        self.assertEqual(push.attempts, 1)
+        self.assertIsNone(push.failed_at)
+        self.assertGreater(push.next_attempt_at, timezone.now())
+        self.assertEqual(self._status(notification), Notification.Status.PENDING)
+        self.schedule_retry.assert_called_once()
+
+        NotificationDelivery.objects.filter(pk=push.pk).update(next_attempt_at=timezone.now())
+        self._record('push', [push], DeliveryResult(False, error='timeout'))
+        push.refresh_from_db()
+        self.assertEqual((push.attempts, push.next_attempt_at), (2, None))
+        self.assertIsNotNone(push.failed_at)
+        self.assertEqual(self._status(notification), Notification.Status.FAILED)
+
+    def test_due_deliveries(self):
+        now = timezone.now()
+        _, (fresh, lost, retry, waiting, done) = self._notification(*[self.push] * 5)
+        NotificationDelivery.objects.filter(pk=lost.pk).update(attempted_at=now - timedelta(seconds=301))
+        NotificationDelivery.objects.filter(pk=retry.pk).update(next_attempt_at=now - timedelta(seconds=1))
+        NotificationDelivery.objects.filter(pk=waiting.pk).update(next_attempt_at=now + timedelta(seconds=60))
+        NotificationDelivery.objects.filter(pk=done.pk).update(
+            attempted_at=now - timedelta(seconds=301), delivered_at=now
+        )
+        self.assertEqual(list(delivery.due_deliveries(now)), [(lost.pk, 'push'), (retry.pk, 'push')])
@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from apps.notifications.fanout import fan_out, nearby_workers
+from apps.notifications.models import (
+    Notification, NotificationChannel, NotificationDelivery, NotificationPreference, NotificationTemplate,
+)
+from apps.notifications.template_cache import NotificationTemplateCache
+
+User = get_user_model()
+
+BIN = (4.05, 9.7)
+
+
+@override_settings(NOTIFICATION_FANOUT_MAX_RADIUS_KM=15)
+class NearbyWorkersTest(TestCase):
+    def _worker(self, name, latitude, longitude=BIN[1], **fields):
+        return User.objects.create_user(
+            username=name, password='pass', role=User.UserRole.WORKER,
+            latitude=latitude, longitude=longitude, **fields
+        )
+
+    def _nearby(self):
+        return [worker.username for worker, _ in nearby_workers(*BIN)]
+
+    def test_workers_are_matched_by_their_own_radius_nearest_first(self):
+        self._worker('wide', 4.10, service_radius_km=10)    # ~5.6 km
+        self._worker('close', 4.06)                         # ~1.1 km
+        self._worker('narrow', 4.10, service_radius_km=5)
+        self._worker('far', 4.30, service_radius_km=50)     # ~28 km, beyond the fan-out radius
+        self._worker('unlocated', None, None)
+        self.assertEqual(self._nearby(), ['close', 'wide'])
+
+    def test_unavailable_busy_and_opted_out_workers_are_skipped(self):
+        self._worker('available', 4.06)
+        self._worker('off_duty', 4.06, is_available=False)
+        self._worker('busy', 4.06, pending_pickups_count=User.MAX_PENDING_PICKUPS)
+        self._worker('spare', 4.06, pending_pickups_count=User.MAX_PENDING_PICKUPS - 1)
+        muted = self._worker('muted', 4.06)
+        NotificationPreference.objects.create(user=muted, pickup_notifications=False)
+        User.objects.create_user(username='customer', password='pass', latitude=4.06, longitude=BIN[1])
+        self.assertEqual(sorted(self._nearby()), ['available', 'spare'])
+
+    def test_recipients_are_capped(self):
+        for index in range(3):
+            self._worker(f'worker{index}', 4.05 + index / 1000)
+        self.assertEqual(len(nearby_workers(*BIN, limit=2)), 2)
+
+
+class FanOutTest(TestCase):
+    def setUp(self):
+        patcher = mock.patch('apps.notifications.fanout.get_template', NotificationTemplateCache().get)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        NotificationTemplate.objects.create(
+            notification_type='pickup_request', title_template='Pickup at {{ address }}',
+            message_template='Earn {{ price }} XAF', default_priority='high',
+        )
+
+    def _recipients(self, prefix, count, channels=(NotificationChannel.ChannelType.PUSH,)):
+        users = []
+        for index in range(count):
+            user = User.objects.create_user(username=f'{prefix}{index}', password='pass')
+            for channel_type in channels:
+                NotificationChannel.objects.create(user=user, channel_type=channel_type, identifier=f'{prefix}{index}')
+            users.append(user)
+        return users
+
+    def _fan_out(self, recipients):
+        queued = []
+        with mock.patch('apps.notifications.delivery.enqueue', side_effect=lambda pairs: queued.extend(pairs)):
+            notifications = fan_out(recipients, 'pickup_request', {'address': 'Rue 1', 'price': 500})
+        return notifications, queued
+
+    def test_one_row_per_recipient_and_active_channel(self):
+        both = self._recipients('both', 2, channels=(NotificationChannel.ChannelType.PUSH,
+                                                     NotificationChannel.ChannelType.EMAIL))
+        silent = self._recipients('silent', 1, channels=())
+        NotificationChannel.objects.create(user=silent[0], channel_type='sms', identifier='x', is_active=False)
+
+        notifications, queued = self._fan_out(both + silent)
+        self.assertEqual(len(notifications), 3)
+        self.assertEqual(NotificationDelivery.objects.count(), 4)
+        self.assertEqual(sorted(channel for _, channel in queued), ['email', 'email', 'push', 'push'])
+        self.assertEqual(
+            {n.recipient_id: n.status for n in Notification.objects.all()},
+            {both[0].pk: 'pending', both[1].pk: 'pending', silent[0].pk: 'failed'},
+        )
+        notification = Notification.objects.get(recipient=both[0])
+        self.assertEqual((notification.title, notification.message, notification.priority),
+                         ('Pickup at Rue 1', 'Earn 500 XAF', 'high'))
+
+    def test_query_count_does_not_grow_with_recipients(self):
+        self._fan_out(self._recipients('warm', 1))
+        few, many = self._recipients('few', 2), self._recipients('many', 20)
+
+        with CaptureQueriesContext(connection) as few_queries:
+            self._fan_out(few)
+        with CaptureQueriesContext(connection) as many_queries:
+            self._fan_out(many)
+        self.assertEqual(len(many_queries), len(few_queries))
+        self.assertEqual(NotificationDelivery.objects.filter(notification__recipient__in=many).count(), 20)
@@ -0,0 +1,51 @@
+import time
+from unittest import mock
+
+from django.template import Context
+from django.test import TestCase
+
+from apps.notifications import template_cache as cache_module
+from apps.notifications.models import NotificationTemplate
+from apps.notifications.template_cache import NotificationTemplateCache
+
+
+class NotificationTemplateCacheTest(TestCase):
+    def setUp(self):
+        self.cache = NotificationTemplateCache(ttl=60)
+        patcher = mock.patch.object(cache_module, 'template_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _title(self, notification_type, **context):
+        return self.cache.get(notification_type).title.render(Context(context))
+
+    def test_edits_are_served_immediately(self):
+        template = NotificationTemplate.objects.create(
+            notification_type='bin_full', title_template='Bin {{ bin }} is full', message_template='Empty it',
+        )
+        self.assertEqual(self._title('bin_full', bin='B1'), 'Bin B1 is full')
+        with self.assertNumQueries(0):
+            self.cache.get('bin_full')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            template.title_template = 'Bin {{ bin }} needs a pickup'
+            template.save()
+        self.assertEqual(self._title('bin_full', bin='B1'), 'Bin B1 needs a pickup')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            template.enabled = False
+            template.save()
+        self.assertIsNone(self.cache.get('bin_full'))
+
+    def test_missing_template_is_cached_until_the_ttl(self):
+        self.assertIsNone(self.cache.get('system_alert'))
+        # Written without signals, as another process's edit looks to this one
+        NotificationTemplate.objects.bulk_create([NotificationTemplate(
+            notification_type='system_alert', title_template='Maintenance', message_template='Tonight',
+        )])
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.cache.get('system_alert'))
+
+        later = time.monotonic() + 61
+        with mock.patch('time.monotonic', return_value=later):
+            self.assertEqual(self._title('system_alert'), 'Maintenance')
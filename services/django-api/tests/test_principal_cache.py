@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from django.contrib.admin.sites import AdminSite
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.users.admin import UserAdmin
+from apps.users.authentication import CachedJWTAuthentication
+from apps.users.principal_cache import PrincipalCache
+
+User = get_user_model()
+
+
+class PrincipalCacheTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='worker', password='pass', email='worker@klynaa.test', role=User.UserRole.WORKER,
+            latitude=Decimal('4.050000'), longitude=Decimal('9.700000'),
+        )
+        self.cache = PrincipalCache(maxsize=100, ttl=60)
+
+    def test_hits_are_served_without_a_query(self):
+        with self.assertNumQueries(1):
+            first = self.cache.get_user(self.user.pk, 'jti-1')
+        with self.assertNumQueries(0):
+            second = self.cache.get_user(self.user.pk, 'jti-1')
+            self.assertEqual((second.role, second.is_active, second.username), ('worker', True, 'worker'))
+        self.assertIsNot(first, second)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertIsNone(self.cache.get_user(999999, 'jti-1'))
+
+    def test_tokens_have_separate_entries(self):
+        self.cache.get_user(self.user.pk, 'jti-1')
+        with self.assertNumQueries(1):
+            self.cache.get_user(self.user.pk, 'jti-2')
+
+    def test_other_columns_load_together_on_first_access(self):
+        user = self.cache.get_user(self.user.pk, 'jti-1')
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'worker@klynaa.test')
+            self.assertEqual(user.latitude, Decimal('4.050000'))
+            self.assertEqual(user.pending_pickups_count, 0)
+
+    def test_saving_a_principal_keeps_newer_columns(self):
+        user = self.cache.get_user(self.user.pk, 'jti-1')
+        # Written elsewhere (location store, another request) after the entry was cached
+        User.objects.filter(pk=self.user.pk).update(latitude=Decimal('4.060000'), pending_pickups_count=2)
+
+        user.is_available = False
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.is_available, self.user.latitude, self.user.pending_pickups_count),
+                         (False, Decimal('4.060000'), 2))
+
+    def test_save_invalidates(self):
+        self.cache.get_user(self.user.pk, 'jti-1')
+        self.user.role = User.UserRole.CUSTOMER
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.cache.get_user(self.user.pk, 'jti-1').role, 'customer')
+
+    def test_saving_uncached_columns_keeps_entries(self):
+        self.cache.get_user(self.user.pk, 'jti-1')
+        self.user.pending_pickups_count = 1
+        self.user.save(update_fields=['pending_pickups_count'])
+        with self.assertNumQueries(0):
+            self.cache.get_user(self.user.pk, 'jti-1')
+
+    def test_deactivated_user_is_rejected(self):
+        token = AccessToken.for_user(self.user)
+        auth = CachedJWTAuthentication()
+        self.assertEqual(auth.get_user(token).pk, self.user.pk)
+
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+        with self.assertRaises(AuthenticationFailed):
+            auth.get_user(token)
+
+    def test_admin_role_change_invalidates(self):
+        self.cache.get_user(self.user.pk, 'jti-1')
+        admin = UserAdmin(User, AdminSite())
+        admin.message_user = lambda *args, **kwargs: None
+        admin.make_customer(None, User.objects.filter(pk=self.user.pk))
+        self.assertEqual(self.cache.get_user(self.user.pk, 'jti-1').role, 'customer')
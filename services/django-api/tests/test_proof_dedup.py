@@ -0,0 +1,66 @@
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from apps.bins.models import Bin, PickupProof, PickupRequest
+from apps.bins.proof_dedup import band_fields, duplicate_review
+from apps.bins.proof_processing import process_pickup_proof
+
+User = get_user_model()
+
+PHASH = 0x0F0F_F0F0_3C3C_C3C3
+
+
+class ProofDedupTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.worker = User.objects.create_user(username='worker', password='pass')
+
+    def _pickup(self):
+        bin_obj = Bin.objects.create(bin_id=f'BIN-{Bin.objects.count() + 1}', owner=self.owner)
+        return PickupRequest.objects.create(bin=bin_obj, owner=self.owner, worker=self.worker)
+
+    def _proof(self, pickup, proof_type, phash=None, image='pickup_proofs/proof.jpg'):
+        fields = band_fields(phash) if phash is not None else {}
+        return PickupProof.objects.create(
+            pickup=pickup, type=proof_type, image=image, captured_by=self.worker, **fields
+        )
+
+    def test_photos_of_the_same_pickup_are_not_duplicates(self):
+        pickup = self._pickup()
+        self._proof(pickup, PickupProof.ProofType.BEFORE, PHASH)
+        after = self._proof(pickup, PickupProof.ProofType.AFTER, PHASH ^ 0b1)
+        self.assertEqual(duplicate_review(PHASH ^ 0b1, after), {})
+
+    def test_photos_of_other_pickups_are_flagged(self):
+        earlier = self._proof(self._pickup(), PickupProof.ProofType.AFTER, PHASH)
+        proof = self._proof(self._pickup(), PickupProof.ProofType.AFTER, PHASH ^ 0b11)
+        review = duplicate_review(PHASH ^ 0b11, proof)
+        self.assertTrue(review['needs_manual_review'])
+        self.assertEqual(review['ai_verification_result']['duplicate_check']['duplicate_of'], earlier.pk)
+        self.assertEqual(review['ai_verification_result']['duplicate_check']['distance'], 2)
+
+    def test_failed_processing_is_recorded_and_not_retried(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            os.makedirs(os.path.join(media_root, 'pickup_proofs'))
+            with open(os.path.join(media_root, 'pickup_proofs', 'corrupt.jpg'), 'wb') as corrupt:
+                corrupt.write(b'not an image')
+            proof = self._proof(self._pickup(), PickupProof.ProofType.AFTER, image='pickup_proofs/corrupt.jpg')
+
+            process_pickup_proof(proof.pk)
+            proof.refresh_from_db()
+            self.assertTrue(proof.processing_error)
+            self.assertTrue(proof.needs_manual_review)
+            self.assertIsNone(proof.perceptual_hash)
+
+            with mock.patch('apps.bins.proof_processing.render_proof_variants') as render:
+                process_pickup_proof(proof.pk)
+                out = io.StringIO()
+                call_command('process_pickup_proofs', stdout=out)
+            render.assert_not_called()
+            self.assertIn('All pickup proofs are processed', out.getvalue())
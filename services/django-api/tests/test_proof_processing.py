@@ -0,0 +1,63 @@
+import io
+
+from PIL import ExifTags, Image
+
+from apps.bins.geo import haversine_m
+from apps.bins.proof_dedup import band_fields, dhash, hamming, to_unsigned
+from apps.bins.proof_processing import extract_gps, render_proof_variants
+
+
+def _jpeg_with_gps(size=(2400, 1600)):
+    image = Image.new('RGB', size, 'green')
+    exif = Image.Exif()
+    exif[ExifTags.Base.Make] = 'TestCam'
+    exif[ExifTags.IFD.GPSInfo] = {
+        ExifTags.GPS.GPSLatitudeRef: 'N',
+        ExifTags.GPS.GPSLatitude: (4.0, 3.0, 36.0),
+        ExifTags.GPS.GPSLongitudeRef: 'E',
+        ExifTags.GPS.GPSLongitude: (9.0, 42.0, 0.0),
+    }
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', exif=exif)
+    buffer.seek(0)
+    return buffer
+
+
+def test_extract_gps_reads_exif_position():
+    with Image.open(_jpeg_with_gps()) as image:
+        latitude, longitude = extract_gps(image)
+    assert round(latitude, 4) == 4.06
+    assert round(longitude, 4) == 9.7
+
+
+def test_variants_are_resized_and_stripped_of_exif():
+    variants, gps, phash = render_proof_variants(
+        _jpeg_with_gps(), sizes={'thumbnail': 320, 'display_image': 1280}
+    )
+    assert gps is not None
+    assert 0 <= phash < 2 ** 64
+    for data in variants.values():
+        with Image.open(io.BytesIO(data)) as variant:
+            assert not variant.getexif()
+    with Image.open(io.BytesIO(variants['thumbnail'])) as thumbnail:
+        assert max(thumbnail.size) <= 320
+
+
+def test_haversine_m():
+    assert haversine_m(4.05, 9.7, 4.05, 9.7) == 0
+    assert 1100 < haversine_m(4.05, 9.7, 4.06, 9.7) < 1120
+
+
+def test_recompressed_photo_hashes_close_and_bands_round_trip():
+    original = Image.radial_gradient('L').resize((800, 600)).convert('RGB')
+    buffer = io.BytesIO()
+    original.resize((400, 300)).save(buffer, format='JPEG', quality=40)
+    buffer.seek(0)
+    with Image.open(buffer) as recompressed:
+        assert hamming(dhash(original), dhash(recompressed)) <= 6
+
+    value = dhash(original)
+    fields = band_fields(value)
+    assert to_unsigned(fields['perceptual_hash']) == value
+    bands = [fields[f'phash_band_{i}'] for i in range(4)]
+    assert sum(band << (16 * (3 - i)) for i, band in enumerate(bands)) == value
@@ -0,0 +1,65 @@
+import uuid
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from apps.bins.models import Bin
+from apps.bins.qr import qr_payload, qr_storage_name, render_qr_png
+from apps.bins.qr_cache import qr_resolution_cache, resolve_qr
+
+User = get_user_model()
+
+
+def test_render_qr_png_returns_png_bytes():
+    png = render_qr_png(qr_payload('3f1c7a52-6f55-4a8e-9b7c-0d6f7f3f2a10'))
+    assert png.startswith(b'\x89PNG')
+
+
+def test_identical_payloads_share_rendered_content():
+    payload = qr_payload('3f1c7a52-6f55-4a8e-9b7c-0d6f7f3f2a10')
+    assert render_qr_png(payload) is render_qr_png(payload)
+    assert qr_storage_name(payload) == qr_storage_name(payload)
+    assert qr_storage_name(payload) != qr_storage_name(qr_payload('other'))
+
+
+class ResolveQrTest(TestCase):
+    def setUp(self):
+        patcher = mock.patch('apps.bins.models.submit_on_commit')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.bin = Bin.objects.create(bin_id='BIN-1', label='Mokolo', owner=self.owner, latitude=4.05, longitude=9.7)
+        qr_resolution_cache.clear()
+
+    def test_scans_are_served_from_the_cache(self):
+        self.assertEqual(resolve_qr(self.bin.qr_code_uuid)['label'], 'Mokolo')
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_qr(self.bin.qr_code_uuid)['id'], self.bin.pk)
+
+    def test_unknown_codes_are_cached_as_not_found(self):
+        unknown = uuid.uuid4()
+        self.assertIsNone(resolve_qr(unknown))
+        with self.assertNumQueries(0):
+            self.assertIsNone(resolve_qr(unknown))
+
+    def test_saving_or_deleting_the_bin_invalidates(self):
+        resolve_qr(self.bin.qr_code_uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bin.label = 'Bastos'
+            self.bin.save()
+        self.assertEqual(resolve_qr(self.bin.qr_code_uuid)['label'], 'Bastos')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bin.delete()
+        self.assertIsNone(resolve_qr(self.bin.qr_code_uuid))
+
+    def test_scan_between_save_and_commit_is_dropped_on_commit(self):
+        qr_uuid = self.bin.qr_code_uuid
+        stale = resolve_qr(qr_uuid)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bin.label = 'Bastos'
+            self.bin.save()
+            # Another request read the old row before this transaction committed
+            qr_resolution_cache.set(str(qr_uuid), stale)
+        self.assertEqual(resolve_qr(qr_uuid)['label'], 'Bastos')
@@ -0,0 +1,81 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.bins.models import NotificationLog
+from apps.bins.retention import RetentionEngine
+
+
+class RetentionEngineTest(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.cutoff = self.now - timedelta(days=30)
+        logs = NotificationLog.objects.bulk_create(
+            [NotificationLog(notification_type='test', title=f'log {i}', body='') for i in range(7)]
+        )
+        self.old_ids = [log.pk for log in logs[:5]]
+        self.new_ids = [log.pk for log in logs[5:]]
+        NotificationLog.objects.filter(pk__in=self.old_ids).update(created_at=self.cutoff - timedelta(days=1))
+        # Exactly at the cutoff is kept
+        NotificationLog.objects.filter(pk=self.new_ids[0]).update(created_at=self.cutoff)
+
+    def test_purge_deletes_only_rows_before_cutoff(self):
+        stats = RetentionEngine(NotificationLog, chunk_size=100).purge(self.cutoff)
+        self.assertEqual(stats['deleted_count'], 5)
+        self.assertEqual(stats['chunks'], 1)
+        self.assertEqual(sorted(NotificationLog.objects.values_list('pk', flat=True)), self.new_ids)
+
+    def test_purge_walks_chunks(self):
+        stats = RetentionEngine(NotificationLog, chunk_size=2).purge(self.cutoff)
+        self.assertEqual((stats['deleted_count'], stats['chunks']), (5, 3))
+
+        NotificationLog.objects.filter(pk__in=self.new_ids).update(created_at=self.cutoff - timedelta(days=1))
+        stats = RetentionEngine(NotificationLog, chunk_size=2).purge(self.cutoff)
+        self.assertEqual((stats['deleted_count'], stats['chunks']), (2, 1))
+        self.assertFalse(NotificationLog.objects.exists())
+
+    def test_purge_archives_rows_before_deleting(self):
+        with tempfile.TemporaryDirectory() as root:
+            stats = RetentionEngine(NotificationLog, chunk_size=2, archive=True, archive_root=root).purge(self.cutoff)
+            self.assertEqual(stats['archived_count'], 5)
+            with gzip.open(stats['archive_path'], 'rt', encoding='utf-8') as archive:
+                rows = [json.loads(line) for line in archive]
+            self.assertEqual([row['id'] for row in rows], self.old_ids)
+            self.assertEqual(rows[0]['title'], 'log 0')
+
+            # Nothing left to purge: no empty archive is kept
+            stats = RetentionEngine(NotificationLog, archive=True, archive_root=root).purge(self.cutoff)
+            self.assertIsNone(stats['archive_path'])
+            self.assertEqual(len(os.listdir(os.path.join(root, NotificationLog._meta.db_table))), 1)
+
+
+@override_settings(LOG_RETENTION_CHUNK_SIZE=2)
+class CleanupEndpointTest(TestCase):
+    def setUp(self):
+        logs = NotificationLog.objects.bulk_create(
+            [NotificationLog(notification_type='test', title='log', body='') for _ in range(3)]
+        )
+        NotificationLog.objects.filter(pk__in=[log.pk for log in logs]).update(
+            created_at=timezone.now() - timedelta(days=60)
+        )
+
+    def test_chunk_size_is_capped_and_archive_ignored(self):
+        resp = self.client.post('/api/cleanup/cleanup/', {
+            'data_type': 'notification_logs', 'chunk_size': 100000, 'archive': 'true',
+        })
+        self.assertEqual(resp.status_code, 200)
+        stats = resp.json()['stats']
+        self.assertEqual((stats['chunk_size'], stats['chunks'], stats['deleted_count']), (2, 2, 3))
+        self.assertEqual(stats['archived_count'], 0)
+
+    def test_non_numeric_parameters_are_rejected(self):
+        resp = self.client.post('/api/cleanup/cleanup/', {'data_type': 'notification_logs', 'chunk_size': 'lots'})
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post('/api/cleanup/cleanup/', {'data_type': 'notification_logs', 'retention_days': 'x'})
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(NotificationLog.objects.count(), 3)
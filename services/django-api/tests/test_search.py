@@ -0,0 +1,122 @@
+import sqlite3
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from apps.bins.models import Bin, PickupRequest
+from apps.chat.models import ChatRoom, Message
+from apps.search.backends import (
+    SearchUnavailable, fts_table, index_name, search, search_headline, search_index, sqlite_schema, tokenize,
+)
+
+User = get_user_model()
+
+
+def test_tokenize_strips_query_syntax():
+    assert tokenize('Marché "Mokolo" OR NEAR(*)') == ['marché', 'mokolo', 'or', 'near']
+    assert tokenize('***') == []
+
+
+def test_sqlite_triggers_keep_fts_index_in_sync():
+    db = sqlite3.connect(':memory:')
+    db.execute('CREATE TABLE bins_bin (id INTEGER PRIMARY KEY, label TEXT, address TEXT)')
+    db.execute("INSERT INTO bins_bin VALUES (1, 'Mokolo market', 'Rue 1.234, Yaoundé')")
+    for statement in sqlite_schema('bin', 'bins_bin', ['label', 'address']):
+        db.execute(statement)
+    fts = fts_table('bin')
+
+    def matches(query):
+        return [row[0] for row in db.execute(f'SELECT rowid FROM {fts} WHERE {fts} MATCH ? ORDER BY rowid', [query])]
+
+    db.execute("INSERT INTO bins_bin VALUES (2, 'Bastos', 'Avenue Mokolo')")
+    assert matches('"mokolo"*') == [1, 2]
+    assert matches('"yaounde"') == [1]
+    db.execute("UPDATE bins_bin SET address = 'Avenue Kennedy' WHERE id = 2")
+    db.execute('DELETE FROM bins_bin WHERE id = 1')
+    assert matches('"mokolo"*') == []
+    assert matches('"kennedy"') == [2]
+
+
+def _postgresql():
+    from django.db import connections
+    from django.db.backends.postgresql.base import DatabaseWrapper
+
+    # Only used to compile SQL; no PostgreSQL server is contacted
+    return DatabaseWrapper(connections['default'].settings_dict, 'postgresql')
+
+
+def test_postgresql_index_is_gin():
+    postgresql = _postgresql()
+    schema_editor = postgresql.schema_editor(collect_sql=True, atomic=False)
+    sql = str(search_index('message').create_sql(Message, schema_editor))
+    assert sql.startswith(f'CREATE INDEX "{index_name("message")}" ON "chat_message" USING gin (')
+    assert "to_tsvector('simple'::regconfig" in sql
+
+
+def test_postgresql_headline_covers_every_searchable_column():
+    from django.contrib.postgres.search import SearchQuery
+
+    headline = search_headline('bin', SearchQuery('mokolo:*', search_type='raw'))
+    columns = {expression.name for expression in headline.flatten() if isinstance(expression, F)}
+    assert columns == {'label', 'address'}
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='pass', role=User.UserRole.ADMIN)
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.worker = User.objects.create_user(username='worker', password='pass', role=User.UserRole.WORKER)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def _bin(self, bin_id, label, address):
+        return Bin.objects.create(bin_id=bin_id, label=label, address=address, owner=self.owner)
+
+    def _message(self, content):
+        bin_obj = self._bin(f'BIN-{content[:8]}', 'Chat bin', 'Rue 1')
+        pickup = PickupRequest.objects.create(bin=bin_obj, owner=self.owner, worker=self.worker)
+        room = ChatRoom.objects.create(pickup_request=pickup, owner=self.owner, worker=self.worker)
+        return Message.objects.create(chat_room=room, sender=self.owner, content=content, client_message_id='c1')
+
+    def test_results_are_ranked_per_source(self):
+        weak = self._bin('BIN-1', 'Bastos school', 'Avenue Kennedy near the old Mokolo bus stop, Yaoundé')
+        strong = self._bin('BIN-2', 'Mokolo market', 'Rue Mokolo')
+        self._bin('BIN-3', 'Bastos', 'Avenue Kennedy')
+
+        hits = search('mokolo', kinds=['bin'])
+        self.assertEqual([hit['object']['id'] for hit in hits], [strong.pk, weak.pk])
+        self.assertGreater(hits[0]['rank'], hits[1]['rank'])
+        # Prefix matching across both columns
+        self.assertEqual([hit['object']['id'] for hit in search('moko kenn')], [weak.pk])
+
+    def test_highlights_mark_matches_and_escape_html(self):
+        message = self._message('<b>Gate</b> code & Mokolo entrance')
+        [hit] = search('mokolo', kinds=['message'])
+        self.assertEqual(hit['object']['id'], str(message.message_id))
+        self.assertEqual(hit['highlight'], '&lt;b&gt;Gate&lt;/b&gt; code &amp; <mark>Mokolo</mark> entrance')
+
+    def test_view_validates_input(self):
+        self._bin('BIN-1', 'Mokolo market', 'Rue 1')
+        self._bin('BIN-2', 'Mokolo school', 'Rue 2')
+        for params in ({}, {'q': 'mokolo', 'type': 'pickup'}, {'q': 'mokolo', 'limit': 'all'}):
+            self.assertEqual(self.client.get('/api/search/', params).status_code, 400)
+
+        resp = self.client.get('/api/search/', {'q': 'mokolo', 'type': 'bin', 'limit': 1})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['count'], 1)
+        self.assertEqual(resp.data['results'][0]['type'], 'bin')
+        # Limits are clamped per source
+        self.assertEqual(self.client.get('/api/search/', {'q': 'mokolo', 'limit': 0}).data['count'], 1)
+
+    def test_view_is_admin_only(self):
+        self.client.force_authenticate(self.worker)
+        self.assertEqual(self.client.get('/api/search/', {'q': 'mokolo'}).status_code, 403)
+
+    def test_unsupported_database_is_reported(self):
+        with mock.patch('apps.search.backends.connection', mock.Mock(vendor='mysql')):
+            with self.assertRaises(SearchUnavailable):
+                search('mokolo')
+            self.assertEqual(self.client.get('/api/search/', {'q': 'mokolo'}).status_code, 501)
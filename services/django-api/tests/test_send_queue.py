@@ -0,0 +1,132 @@
+import asyncio
+import functools
+
+from django.test import override_settings
+
+from apps.send_queue import CLOSE_CODE_SLOW_CONSUMER, BoundedSendMixin
+
+
+class _Socket:
+    """Stands in for CompactFramingMixin and the ASGI server below it."""
+
+    def __init__(self, base_send=None):
+        self.scope = {'path': '/ws/test/'}
+        self.base_send = base_send
+        self.written = []
+        self.closed_with = None
+        self.open = asyncio.Event()
+        self.open.set()
+
+    async def send_frame(self, payload, close=False):
+        await self.open.wait()
+        self.written.append(payload)
+
+    async def close(self, code=None):
+        self.closed_with = code
+
+
+class _Consumer(BoundedSendMixin, _Socket):
+    pass
+
+
+class _DaphneProtocol:
+    def __init__(self):
+        self.producer = None
+
+    def registerProducer(self, producer, streaming):
+        if self.producer is not None:
+            raise RuntimeError('Cannot register producer, because one is already registered.')
+        self.producer = producer
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_frames_coalesce_behind_a_slow_send():
+    async def scenario():
+        consumer = _Consumer()
+        consumer.open.clear()
+        await consumer.send_frame({'n': 0})
+        await _settle()  # the writer is now blocked sending frame 0
+        for n in (1, 2, 3):
+            await consumer.send_frame({'pickup': 1, 'n': n}, coalesce_key=('pickup', 1))
+        await consumer.send_frame({'chat': 'hi'})
+        assert consumer.send_queue_metrics()['depth'] == 2
+
+        consumer.open.set()
+        await _settle()
+        return consumer
+
+    consumer = asyncio.run(scenario())
+    assert consumer.written == [{'n': 0}, {'pickup': 1, 'n': 3}, {'chat': 'hi'}]
+    assert consumer.send_queue_metrics()['coalesced'] == 2
+
+
+@override_settings(WEBSOCKET_SEND_QUEUE_SIZE=3)
+def test_full_queue_disconnects():
+    async def scenario():
+        consumer = _Consumer()
+        consumer.open.clear()
+        for n in range(5):
+            await consumer.send_frame({'n': n})
+            await _settle()
+        return consumer
+
+    consumer = asyncio.run(scenario())
+    assert consumer.closed_with == CLOSE_CODE_SLOW_CONSUMER
+    assert consumer.send_queue_metrics()['depth'] == 0
+
+
+@override_settings(WEBSOCKET_SEND_MAX_LAG=0.05)
+def test_lagging_queue_disconnects():
+    async def scenario():
+        consumer = _Consumer()
+        consumer.open.clear()
+        await consumer.send_frame({'n': 0})
+        await _settle()
+        await consumer.send_frame({'n': 1})
+        await asyncio.sleep(0.1)
+        await consumer.send_frame({'n': 2})
+        return consumer
+
+    assert asyncio.run(scenario()).closed_with == CLOSE_CODE_SLOW_CONSUMER
+
+
+def test_daphne_transport_pauses_hold_frames_in_the_queue():
+    async def scenario():
+        protocol = _DaphneProtocol()
+        consumer = _Consumer(base_send=functools.partial(lambda protocol, message: None, protocol))
+        await consumer.send_frame({'n': 0})
+        await _settle()
+        assert consumer.written == [{'n': 0}]
+        assert consumer.send_queue_metrics()['flow_control']
+
+        # Twisted's write buffer passed its high-water mark
+        protocol.producer.pauseProducing()
+        for n in (1, 2, 3):
+            await consumer.send_frame({'n': n}, coalesce_key='state')
+        await _settle()
+        assert consumer.written == [{'n': 0}]
+        assert consumer.send_queue_metrics()['depth'] == 1
+
+        protocol.producer.resumeProducing()
+        await _settle()
+        return consumer
+
+    consumer = asyncio.run(scenario())
+    assert consumer.written == [{'n': 0}, {'n': 3}]
+    assert consumer.send_queue_metrics()['transport_pauses'] == 1
+
+
+def test_send_without_a_server_protocol_has_no_flow_control():
+    async def scenario():
+        consumer = _Consumer(base_send=lambda message: None)
+        await consumer.send_frame({'n': 0})
+        await _settle()
+        return consumer
+
+    consumer = asyncio.run(scenario())
+    assert consumer.written == [{'n': 0}]
+    assert not consumer.send_queue_metrics()['flow_control']
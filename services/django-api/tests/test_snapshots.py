@@ -0,0 +1,131 @@
+import asyncio
+import threading
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from apps.bins.models import Bin, PickupRequest
+from apps.snapshots import SnapshotCache, send_initial_snapshot, snapshot_cache, snapshot_version
+
+User = get_user_model()
+
+
+def test_concurrent_misses_share_one_load():
+    cache = SnapshotCache(maxsize=10, ttl=60, history=2)
+    calls, release = [], threading.Event()
+
+    def loader(key):
+        calls.append(key)
+        release.wait(2)
+        return {'id': key}
+
+    async def reconnect_storm():
+        loads = [asyncio.ensure_future(cache.load('pickup', 1, loader)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        release.set()
+        states = await asyncio.gather(*loads)
+        return states, await cache.load('pickup', 1, loader)
+
+    states, cached = asyncio.run(reconnect_storm())
+    assert calls == [1]
+    assert all(state is states[0] for state in states) and cached is states[0]
+    assert (cache.loads, cache.shared_loads) == (1, 4)
+
+
+def test_write_during_load_is_not_cached():
+    cache = SnapshotCache(maxsize=10, ttl=60, history=2)
+    calls = []
+
+    def loader(key):
+        calls.append(key)
+        if len(calls) == 1:
+            # What invalidate() does immediately; the on-commit repeat needs a database
+            cache._drop('worker', key)
+        return {'calls': len(calls)}
+
+    async def load_twice():
+        return await cache.load('worker', 7, loader), await cache.load('worker', 7, loader)
+
+    assert asyncio.run(load_twice()) == ({'calls': 1}, {'calls': 2})
+
+
+def test_recorded_versions_are_bounded():
+    cache = SnapshotCache(maxsize=10, ttl=60, history=2)
+    states = [{'status': status} for status in ('open', 'accepted', 'in_progress')]
+    versions = [cache.record('pickup', 1, state) for state in states]
+
+    assert versions[0] == snapshot_version({'status': 'open'})
+    assert cache.state_at('pickup', 1, versions[0]) is None
+    assert cache.state_at('pickup', 1, versions[1]) == states[1]
+    assert cache.state_at('pickup', '1', versions[2]) == states[2]
+    assert cache.state_at('pickup', 1, None) is None
+
+
+class _Consumer:
+    def __init__(self, query_string=b''):
+        self.scope = {'query_string': query_string}
+        self.sent = []
+
+    async def send_snapshot(self, *args, **kwargs):
+        self.sent.append((args, kwargs))
+
+
+def test_initial_snapshot_resumes_from_since():
+    old, new = {'status': 'open', 'n': 1}, {'status': 'accepted', 'n': 1}
+    old_version = snapshot_cache.record('pickup', 'since-test', old)
+
+    consumer = _Consumer(f'since={old_version}'.encode())
+    asyncio.run(send_initial_snapshot(consumer, 'pickup_status', 'pickup', 'pickup', 'since-test', new))
+    (args, kwargs), = consumer.sent
+    assert args[4] == snapshot_version(new)
+    assert kwargs == {'since': old_version, 'since_state': old}
+
+    # Client already holds the current version: no state needed for a delta
+    consumer = _Consumer(f'since={snapshot_version(new)}'.encode())
+    asyncio.run(send_initial_snapshot(consumer, 'pickup_status', 'pickup', 'pickup', 'since-test', new))
+    assert consumer.sent[0][1] == {'since': snapshot_version(new), 'since_state': None}
+
+    consumer = _Consumer(b'since=unknown')
+    asyncio.run(send_initial_snapshot(consumer, 'pickup_status', 'pickup', 'pickup', 'since-test', new))
+    assert consumer.sent[0][1] == {'since': 'unknown', 'since_state': None}
+
+
+class SnapshotInvalidationTest(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username='owner', password='pass')
+        self.worker = User.objects.create_user(username='worker', password='pass', role=User.UserRole.WORKER)
+        self.other_worker = User.objects.create_user(username='worker2', password='pass', role=User.UserRole.WORKER)
+        bin_obj = Bin.objects.create(bin_id='BIN-1', owner=self.owner)
+        self.pickup = PickupRequest.objects.create(bin=bin_obj, owner=self.owner, worker=self.worker)
+
+    def _seed(self, kind, key):
+        snapshot_cache._states.set(snapshot_cache._key(kind, key), {'seeded': True})
+
+    def _cached(self, kind, key):
+        return snapshot_cache._states.get(snapshot_cache._key(kind, key)) is not None
+
+    def test_pickup_save_drops_pickup_owner_and_both_workers(self):
+        entries = [('pickup', self.pickup.pk), ('customer_notifications', self.owner.pk),
+                   ('worker', self.worker.pk), ('worker', self.other_worker.pk)]
+        for kind, key in entries:
+            self._seed(kind, key)
+
+        pickup = PickupRequest.objects.get(pk=self.pickup.pk)
+        pickup.worker = self.other_worker
+        with self.captureOnCommitCallbacks(execute=True):
+            pickup.save()
+        self.assertEqual([entry for entry in entries if self._cached(*entry)], [])
+
+    def test_pickup_delete_drops_its_snapshot(self):
+        pickup_id = self.pickup.pk
+        self._seed('pickup', pickup_id)
+        self.pickup.delete()
+        self.assertFalse(self._cached('pickup', pickup_id))
+
+    def test_user_save_drops_worker_snapshot(self):
+        self._seed('worker', self.worker.pk)
+        self._seed('worker', self.other_worker.pk)
+        self.worker.first_name = 'Ada'
+        self.worker.save()
+        self.assertFalse(self._cached('worker', self.worker.pk))
+        self.assertTrue(self._cached('worker', self.other_worker.pk))
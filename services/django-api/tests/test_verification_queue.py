@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.bins import verification_queue as queue
+from apps.bins.models import Bin, PickupProof, PickupRequest
+
+User = get_user_model()
+
+
+class VerificationQueueTest(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='pass', role=User.UserRole.ADMIN)
+        self.other_admin = User.objects.create_user(username='admin2', password='pass', role=User.UserRole.ADMIN)
+        owner = User.objects.create_user(username='owner', password='pass')
+        self.worker = User.objects.create_user(username='worker', password='pass', role=User.UserRole.WORKER)
+        bin_obj = Bin.objects.create(bin_id='BIN-1', owner=owner)
+        self.pickup = PickupRequest.objects.create(bin=bin_obj, owner=owner, worker=self.worker)
+
+    def _proof(self, needs_manual_review=False, confidence_score=None):
+        return PickupProof.objects.create(
+            pickup=self.pickup, type=PickupProof.ProofType.AFTER, image='pickup_proofs/proof.jpg',
+            captured_by=self.worker, needs_manual_review=needs_manual_review, confidence_score=confidence_score,
+        )
+
+    def test_pages_follow_priority_order(self):
+        expected = [
+            self._proof(True, 0.2), self._proof(True, 0.2), self._proof(True, None),
+            self._proof(False, 0.1), self._proof(False, 0.9), self._proof(False, None),
+        ]
+        # Created out of order so ids alone would not give the expected order
+        expected.insert(0, self._proof(True, 0.1))
+
+        seen, cursor = [], None
+        while True:
+            proofs, cursor = queue.queue_page(cursor=cursor, limit=2)
+            seen.extend(proof.pk for proof in proofs)
+            if cursor is None:
+                break
+        self.assertEqual(seen, [proof.pk for proof in expected])
+
+    def test_invalid_cursor_is_rejected(self):
+        with self.assertRaises(queue.InvalidCursor):
+            queue.queue_page(cursor='not-a-cursor')
+
+    def test_claims_are_exclusive_until_the_lease_expires(self):
+        proof = self._proof()
+        self.assertEqual([p.pk for p in queue.claim(self.admin, proof_ids=[proof.pk])], [proof.pk])
+        self.assertEqual(queue.claim(self.other_admin, proof_ids=[proof.pk]), [])
+        self.assertIsNone(queue.decide(self.other_admin, proof.pk, 'approve'))
+        self.assertEqual(queue.queue_page(user=self.other_admin)[0], [])
+
+        PickupProof.objects.filter(pk=proof.pk).update(claim_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual([p.pk for p in queue.claim(self.other_admin, proof_ids=[proof.pk])], [proof.pk])
+        self.assertFalse(queue.renew(self.admin, proof.pk))
+        decided = queue.decide(self.other_admin, proof.pk, 'reject', 'blurry')
+        self.assertEqual((decided.status, decided.verified_by_id), (PickupProof.VerificationStatus.REJECTED,
+                                                                    self.other_admin.pk))
+
+    def test_verify_proof_respects_other_reviewers_lease(self):
+        proof = self._proof()
+        queue.claim(self.admin, proof_ids=[proof.pk])
+
+        client = APIClient()
+        client.force_authenticate(self.other_admin)
+        url = f'/api/pickups/{self.pickup.pk}/verify_proof/'
+        resp = client.post(url, {'proof_id': proof.pk, 'decision': 'approve'}, format='json')
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(PickupProof.objects.get(pk=proof.pk).status, PickupProof.VerificationStatus.PENDING)
+
+        client.force_authenticate(self.admin)
+        resp = client.post(url, {'proof_id': proof.pk, 'decision': 'approve'}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        proof.refresh_from_db()
+        self.assertEqual(proof.status, PickupProof.VerificationStatus.APPROVED)
+        self.assertIsNone(proof.claimed_by_id)
@@ -0,0 +1,14 @@
+from apps.ws_benchmark import bench_marker, percentiles
+
+
+def test_percentiles_use_nearest_rank_in_milliseconds():
+    summary = percentiles([i / 1000 for i in range(1, 101)])
+    assert (summary['p50_ms'], summary['p95_ms'], summary['p99_ms']) == (50.0, 95.0, 99.0)
+    assert percentiles([]) == {'count': 0}
+
+
+def test_bench_marker_reads_full_delta_and_chat_frames():
+    assert bench_marker({'data': {'bench_seq': 2, 'bench_sent': 1.5}}) == (2, 1.5)
+    assert bench_marker({'base': 1, 'delta': {'set': {'bench_seq': 3, 'bench_sent': 2.5}, 'unset': []}}) == (3, 2.5)
+    assert bench_marker({'event': 'message', 'message': {'content': 'bench 4'}}) == (4, None)
+    assert bench_marker({'event': 'presence', 'status': 'online'}) is None
@@ -3,6 +3,10 @@ WebSocket Load Testing Suite for Klynaa Real-time System
 
 Tests concurrent WebSocket connections, message broadcasting,
 and system performance under load.
+
+Requires a live server on ws://localhost:8003. For repeatable numbers
+without a server, use ``python manage.py benchmark_websockets``, which
+drives config.asgi.application in-process and emits JSON.
 """
 
 import asyncio